@@ -0,0 +1,68 @@
+"""인물 매칭 벤치마크: DeepFace.find 식 질의별 선형 탐색 vs 정규화 행렬곱 (합성 임베딩)
+
+임베딩 모델은 빼고 매칭 단계만 비교한다. 기존 방식은 질의마다 갤러리 표현 목록을 돌며
+코사인 거리를 하나씩 계산하고, 새 방식은 IdentityIndex.search 한 번으로 처리한다.
+
+사용법:
+    python bench_face_identity.py [--identities 2] [--per-identity 7] [--queries 1100] [--ann]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from face_identity import IdentityIndex
+
+
+def linear_find(query, representations):
+    """Per-query scan over gallery dicts (same shape of work as DeepFace.find)."""
+    best_name, best_dist = None, np.inf
+    for rep in representations:
+        emb = np.asarray(rep["embedding"])
+        dist = 1 - np.dot(query, emb) / (np.linalg.norm(query) * np.linalg.norm(emb))
+        if dist < best_dist:
+            best_name, best_dist = rep["name"], dist
+    return best_name, best_dist
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--identities", type=int, default=2)
+    parser.add_argument("--per-identity", type=int, default=7)
+    parser.add_argument("--queries", type=int, default=1100)
+    parser.add_argument("--dim", type=int, default=512)
+    parser.add_argument("--ann", action="store_true")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(args.identities, args.dim)).astype(np.float32)
+    labels = np.repeat(np.arange(args.identities), args.per_identity)
+    gallery = centers[labels] + rng.normal(scale=0.5, size=(len(labels), args.dim)).astype(np.float32)
+    names = [f"actor_{i}" for i in labels]
+    truth = rng.integers(0, args.identities, args.queries)
+    queries = centers[truth] + rng.normal(scale=0.5, size=(args.queries, args.dim)).astype(np.float32)
+    representations = [{"name": name, "embedding": emb.tolist()} for name, emb in zip(names, gallery)]
+
+    n_linear = min(args.queries, 200)
+    t0 = time.perf_counter()
+    linear = [linear_find(q, representations) for q in queries[:n_linear]]
+    t_linear = (time.perf_counter() - t0) / n_linear * args.queries
+
+    t0 = time.perf_counter()
+    index = IdentityIndex(gallery, names, ann=args.ann)
+    found, dist, _ = index.search(queries)
+    t_index = time.perf_counter() - t0
+
+    agree = np.mean([name == found[i] for i, (name, _) in enumerate(linear)])
+    accuracy = np.mean(found == np.asarray([f"actor_{i}" for i in truth]))
+    print(f"갤러리 {len(names)}개 / 질의 {args.queries}개")
+    print(f"선형 탐색 (추정): {t_linear:.3f}초")
+    print(f"IdentityIndex{' (faiss)' if args.ann else ''}: {t_index:.4f}초 ({t_linear / t_index:.0f}배)")
+    print(f"선형 탐색과 일치율 {agree:.3f}, 정답률 {accuracy:.3f}")
+
+
+if __name__ == "__main__":
+    main()
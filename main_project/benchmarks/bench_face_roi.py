@@ -0,0 +1,81 @@
+"""얼굴 검출 입력 픽셀/시간 비교: 프레임 전체 vs 추적 박스 ROI 모자이크
+
+추적 CSV 의 실제 인물 박스를 쓰고, 영상이 없으면 같은 크기의 합성 프레임을 쓴다.
+검출기는 OpenCV Haar cascade 가 있으면 그것, 없으면 이미지 피라미드를 훑는 대체 연산
+(비용이 픽셀 수에 비례)으로 시간을 잰다. RetinaFace 도 비용이 입력 픽셀에 비례하므로
+픽셀 비율이 곧 검출 시간 비율의 근사다.
+
+사용법:
+    python bench_face_roi.py [--tracking ../data/output/results/brighter_bbx_tracking.csv]
+        [--video 영상] [--frames 200] [--max-side 320]
+"""
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from face_roi import MAX_SIDE, RoiFaceDetector, haar_detector, read_tracking
+from frame_source import iter_frames
+
+
+def pyramid_scan(img):
+    """Stand-in detector whose cost scales with the pixel count (Sobel over a 1.25x pyramid)."""
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    while min(gray.shape) >= 24:
+        cv2.Sobel(gray, cv2.CV_32F, 1, 1)
+        gray = cv2.resize(gray, (int(gray.shape[1] / 1.25), int(gray.shape[0] / 1.25)))
+    return []
+
+
+def main():
+    here = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tracking", default=os.path.join(here, "..", "data", "output", "results",
+                                                           "brighter_bbx_tracking.csv"))
+    parser.add_argument("--video", default=None)
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--max-side", type=int, default=MAX_SIDE)
+    parser.add_argument("--size", type=int, nargs=2, default=(1920, 1024), help="합성 프레임 크기 (너비 높이)")
+    args = parser.parse_args()
+
+    tracks = read_tracking(args.tracking)
+    times = list(tracks)
+    times = times[::max(1, len(times) // args.frames)][:args.frames]
+    if args.video:
+        frames = [(t, frame) for t, _, frame in iter_frames(args.video, times)]
+    else:
+        rng = np.random.default_rng(0)
+        frame = cv2.GaussianBlur(rng.integers(0, 256, (args.size[1], args.size[0], 3), dtype=np.uint8), (5, 5), 0)
+        frames = [(t, frame) for t in times]
+
+    try:
+        detect, name = haar_detector(), "haar"
+    except AttributeError:
+        detect, name = pyramid_scan, "pyramid-scan"
+
+    start = time.perf_counter()
+    for _, frame in frames:
+        detect(frame)
+    full_sec = time.perf_counter() - start
+
+    roi = RoiFaceDetector(detect, max_side=args.max_side)
+    start = time.perf_counter()
+    for t, frame in frames:
+        roi.detect(frame, *tracks[t])
+    roi_sec = time.perf_counter() - start
+
+    s = roi.stats
+    print(f"프레임 {len(frames)}개, ROI {s['rois']}개 (검출기: {name}, max_side={args.max_side})")
+    print(f"  검출기 입력 픽셀: 전체 {s['frame_pixels'] / 1e6:.0f}M → ROI 모자이크 {s['detector_pixels'] / 1e6:.0f}M "
+          f"({roi.pixel_ratio() * 100:.1f}%)")
+    print(f"  전체 프레임: {full_sec / len(frames) * 1000:.1f} ms/frame")
+    print(f"  ROI 모자이크: {roi_sec / len(frames) * 1000:.1f} ms/frame (모자이크 구성 포함, "
+          f"{full_sec / roi_sec:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""기존 초 단위 seek 루프와 frame_source.iter_frames 비교 벤치마크
+
+사용법:
+    python bench_frame_source.py [영상 경로] [--start 109] [--end 349] [--step 1]
+
+영상 경로를 주지 않으면 임시 합성 영상(640x360, 24fps)을 만들어 측정한다.
+합성 영상(mp4v)은 GOP가 12프레임으로 짧아 seek 비용이 작게 나오므로, 실제 비교는
+긴 GOP H.264 원본 영화로 해야 한다.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from frame_source import iter_frames, video_info
+
+
+def make_synthetic_video(path, seconds=120, fps=24, size=(640, 360)):
+    """Write a small test video with a moving rectangle."""
+    w, h = size
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, size)
+    for i in range(seconds * fps):
+        frame = np.full((h, w, 3), (i * 3) % 255, dtype=np.uint8)
+        x = (i * 4) % (w - 60)
+        cv2.rectangle(frame, (x, 100), (x + 60, 220), (0, 0, 255), -1)
+        writer.write(frame)
+    writer.release()
+    return path
+
+
+def seek_loop(video_path, secs):
+    """The per-second seek loop used before frame_source existed."""
+    cap = cv2.VideoCapture(video_path)
+    frames = []
+    for sec in secs:
+        cap.set(cv2.CAP_PROP_POS_MSEC, sec * 1000)
+        success, frame = cap.read()
+        if not success:
+            break
+        frames.append((sec, frame))
+    cap.release()
+    return frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("video", nargs="?")
+    parser.add_argument("--start", type=float, default=0)
+    parser.add_argument("--end", type=float, default=None)
+    parser.add_argument("--step", type=float, default=1.0)
+    args = parser.parse_args()
+
+    tmp_dir = None
+    video_path = args.video
+    if video_path is None:
+        tmp_dir = tempfile.TemporaryDirectory()
+        video_path = make_synthetic_video(os.path.join(tmp_dir.name, "synthetic.mp4"))
+
+    info = video_info(video_path)
+    end = args.end if args.end is not None else int(info["duration"]) - 1
+    secs = list(np.arange(args.start, end, args.step))
+    print(f"영상: {video_path} | FPS: {info['fps']:.3f}, 길이: {info['duration']:.1f}초, 샘플: {len(secs)}개")
+
+    t0 = time.perf_counter()
+    old = seek_loop(video_path, secs)
+    t_old = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    new = [(sec, frame) for sec, _, frame in iter_frames(video_path, secs)]
+    t_new = time.perf_counter() - t0
+
+    mismatched = sum(
+        1 for (_, a), (_, b) in zip(old, new)
+        if a.shape != b.shape or np.abs(a.astype(np.int16) - b).mean() > 1.0
+    )
+    print(f"seek 루프     : {t_old:8.2f}초 ({len(old) / t_old:7.1f} frames/sec, {len(old)}프레임)")
+    print(f"iter_frames   : {t_new:8.2f}초 ({len(new) / t_new:7.1f} frames/sec, {len(new)}프레임)")
+    print(f"속도 향상     : x{t_old / t_new:.2f}, 픽셀 불일치 프레임: {mismatched}")
+
+    if tmp_dir is not None:
+        tmp_dir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
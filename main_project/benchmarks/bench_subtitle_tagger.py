@@ -0,0 +1,59 @@
+"""자막 태깅 엔진 벤치마크 (로컬 스텁 서버 대상)
+
+스텁 서버를 띄우고 합성 자막 N줄을 비동기 엔진으로 태깅해 소요 시간, 요청 수,
+429 횟수를 출력한다. 기존 방식(요청 + time.sleep(2.1))의 예상 시간과 함께 보여준다.
+
+사용법:
+    python bench_subtitle_tagger.py [--lines 120] [--stub-rpm 120] [--rpm 120] [--latency 0.2] [--batch-size 10] [--cache labels.sqlite]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from label_cache import LabelCache
+from stub_openai_server import start_stub_server
+from subtitle_tagger import AsyncSubtitleTagger, make_client, suggest_batch_size
+
+EMOTIONS = ["happiness", "surprise", "neutral", "contempt", "disgust", "sadness", "anger", "fear"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, default=120)
+    parser.add_argument("--stub-rpm", type=int, default=120, help="스텁 서버가 허용하는 분당 요청 수")
+    parser.add_argument("--rpm", type=int, default=120, help="태깅 엔진에 설정할 분당 요청 수")
+    parser.add_argument("--tpm", type=int, default=None)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--malformed", type=float, default=0.0)
+    parser.add_argument("--batch-size", type=int, default=1, help="요청당 자막 줄 수 (0이면 자동 추천)")
+    parser.add_argument("--cache", default=None, help="라벨 캐시 SQLite 경로 (두 번 실행하면 두 번째는 캐시 적중)")
+    args = parser.parse_args()
+
+    server, url, state = start_stub_server(rpm=args.stub_rpm, latency=args.latency, malformed=args.malformed)
+    tagger = AsyncSubtitleTagger(make_client("stub", url), EMOTIONS, rpm=args.rpm, tpm=args.tpm,
+                                 concurrency=args.concurrency, base_delay=0.2,
+                                 cache=LabelCache(args.cache) if args.cache else None)
+    texts = [f"Synthetic subtitle line number {i}." for i in range(args.lines)]
+    batch_size = args.batch_size or suggest_batch_size(texts, EMOTIONS, tpm=args.tpm)
+    print(f"배치 크기: {batch_size}")
+
+    t0 = time.perf_counter()
+    results = asyncio.run(tagger.tag_all(texts, batch_size=batch_size))
+    elapsed = time.perf_counter() - t0
+    server.shutdown()
+
+    tagged = sum(1 for r in results if r.get("emotions"))
+    print(f"태깅 {tagged}/{len(texts)}줄: {elapsed:.1f}초 ({len(texts) / elapsed * 60:.0f}줄/분)")
+    print(f"엔진 통계: {tagger.stats}")
+    print(f"스텁 통계: {state.stats}")
+    if tagger.cache is not None:
+        print(f"캐시 통계: {tagger.cache.stats}")
+    print(f"기존 순차 방식 예상: {len(texts) * (args.latency + 2.1):.1f}초")
+
+
+if __name__ == "__main__":
+    main()
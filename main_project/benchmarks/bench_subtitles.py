@@ -0,0 +1,125 @@
+"""자막 파싱/조회 벤치마크: srt 라이브러리 + 선형 필터 vs subtitles.load_srt
+
+실제 SRT(A.Brighter.Summer.Day.srt)와 합성 대용량 SRT(기본 10만 줄)에 대해
+- 파싱: srt.parse 로 전체 읽기 + timedelta 변환 vs 스트리밍 파서 vs .index.pkl 캐시 재로드
+- 조회: 리스트를 훑는 시각/구간 필터 vs 이분 탐색 active_at/window
+을 비교한다.
+
+사용법:
+    python bench_subtitles.py [--srt ../data/raw/A.Brighter.Summer.Day.srt] [--synthetic 100000] [--queries 2000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+import subtitles
+from subtitles import SubtitleTrack, load_srt
+
+
+def srt_records(path):
+    """The previous parse_srt_file (srt library)."""
+    import srt
+
+    with open(path, "r", encoding="utf-8") as f:
+        srt_text = f.read()
+    return [{"id": i + 1, "start": sub.start.total_seconds(), "end": sub.end.total_seconds(),
+             "text": sub.content.strip()} for i, sub in enumerate(srt.parse(srt_text))]
+
+
+def write_synthetic(path, n, seed=0):
+    def stamp(t):
+        ms = int(round(t * 1000))
+        return f"{ms // 3600000:02d}:{ms // 60000 % 60:02d}:{ms // 1000 % 60:02d},{ms % 1000:03d}"
+
+    rng = np.random.default_rng(seed)
+    t = 0.0
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(n):
+            t += rng.uniform(0.2, 4.0)
+            end = t + rng.uniform(0.8, 5.0)
+            f.write(f"{i + 1}\n{stamp(t)} --> {stamp(end)}\nline {i} of the synthetic subtitle\n"
+                    f"second row {rng.integers(1000)}\n\n")
+
+
+def timed(fn, repeat=1):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, out
+
+
+def run(label, path, queries):
+    size_kb = os.path.getsize(path) / 1024
+    print(f"\n[{label}] {path} ({size_kb:.0f} KB)")
+    try:
+        t_old, old = timed(lambda: srt_records(path))
+        print(f"  srt.parse + timedelta:  {t_old * 1000:9.1f} ms ({len(old)}개)")
+    except ImportError:
+        old = None
+        print("  srt.parse: srt 라이브러리 없음 (건너뜀)")
+    t_new, track = timed(lambda: SubtitleTrack.parse(path))
+    print(f"  스트리밍 파서:          {t_new * 1000:9.1f} ms ({len(track)}개)")
+    if old is not None:
+        print(f"  결과 일치: {track.records() == old}")
+
+    cache_path = path + ".index.pkl"
+    if os.path.exists(cache_path):
+        os.remove(cache_path)
+    load_srt(path)
+
+    def from_disk():
+        subtitles._memo.clear()
+        return load_srt(path)
+
+    t_cache, _ = timed(from_disk, repeat=3)
+    print(f"  .index.pkl 재로드:      {t_cache * 1000:9.1f} ms")
+    t_memo, _ = timed(lambda: load_srt(path), repeat=3)
+    print(f"  메모리 캐시 재로드:     {t_memo * 1000:9.3f} ms")
+    os.remove(cache_path)
+
+    records = track.records()
+    rng = np.random.default_rng(1)
+    times = rng.uniform(0, float(track.ends.max()), queries)
+
+    def linear():
+        hits = 0
+        for t in times:
+            hits += sum(1 for r in records if r["start"] <= t < r["end"])
+            hits += sum(1 for r in records if t <= r["start"] <= t + 60)
+        return hits
+
+    def indexed():
+        return sum(len(track.active_at(t)) + len(track.window(t, t + 60)) for t in times)
+
+    t_lin, a = timed(linear)
+    t_idx, b = timed(indexed, repeat=3)
+    print(f"  조회 {queries}회 (시각 + 60초 구간): 선형 {t_lin * 1000:.1f} ms, "
+          f"이분 탐색 {t_idx * 1000:.1f} ms ({t_lin / max(t_idx, 1e-9):.0f}배), 일치 {a == b}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--srt", default=os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                      "..", "data", "raw", "A.Brighter.Summer.Day.srt"))
+    parser.add_argument("--synthetic", type=int, default=100_000, help="합성 SRT 자막 수 (0이면 생략)")
+    parser.add_argument("--queries", type=int, default=2000)
+    args = parser.parse_args()
+
+    if os.path.exists(args.srt):
+        run("실제 자막", args.srt, args.queries)
+    if args.synthetic:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "synthetic.srt")
+            write_synthetic(path, args.synthetic)
+            run("합성 자막", path, max(1, args.queries // 20))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+"""벤치마크용 합성 입력 생성 (영상, SRT, azure.json, 프레임별 JSON, 추적/자막 CSV)
+
+실제 영화 없이 각 단계를 재현 가능하게 재기 위한 입력을 시드 고정으로 만든다.
+
+- 영상: 샷마다 배경(그라디언트 + 잡음 무늬)이 바뀌는 MP4, 샷 안에서는 사각형 1~3개가
+  움직인다. 컷 시각과 사각형 위치(초 단위)를 정답 파일(truth.json)로 함께 남긴다.
+- SRT: 겹치는 자막도 섞인 N개 자막
+- azure.json: 샷 수천 개(키프레임 포함), 씬, 라벨을 실제 Video Indexer 형식으로
+- 프레임별 *_leading_lines.json: consolidate_json.py 입력
+- 추적 CSV(사각형 정답 박스), 태깅된 자막 CSV: master_table 입력
+
+같은 설정으로 다시 부르면 이미 만든 파일을 그대로 쓴다 (fixture.json 의 설정 비교).
+
+사용법:
+    python fixtures.py [--out bench_fixtures] [--scale small|full]
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+
+SCALES = {
+    # 영상 길이(초), 해상도, fps, 자막 수, 샷 수, 프레임별 JSON 수, 태깅할 자막 줄 수
+    "small": {"video_sec": 60, "size": (640, 360), "fps": 25, "srt_cues": 20_000, "azure_shots": 2_000,
+              "frame_jsons": 500, "tag_lines": 200},
+    "full": {"video_sec": 300, "size": (1280, 720), "fps": 25, "srt_cues": 100_000, "azure_shots": 10_000,
+             "frame_jsons": 5_000, "tag_lines": 1_000},
+}
+EMOTIONS = ["joy", "love", "calm", "neutral", "concern", "caution", "surprise", "curiosity"]
+SEED = 1997
+
+
+def _fmt_srt(t):
+    ms = int(round(t * 1000))
+    return f"{ms // 3_600_000:02d}:{ms // 60_000 % 60:02d}:{ms // 1000 % 60:02d},{ms % 1000:03d}"
+
+
+def _fmt_azure(t):
+    return f"{int(t // 3600)}:{int(t // 60 % 60):02d}:{t % 60:010.7f}"
+
+
+def make_video(path, duration, size=(640, 360), fps=25, seed=SEED):
+    """Write the synthetic MP4; returns the truth dict {'cuts', 'boxes'} (boxes per whole second)."""
+    import cv2
+
+    rng = np.random.default_rng(seed)
+    width, height = size
+    cuts = [0.0]
+    while cuts[-1] < duration:
+        cuts.append(round(cuts[-1] + float(rng.uniform(1.0, 8.0)), 2))
+    cuts = cuts[:-1]
+    yy, xx = np.mgrid[0:height, 0:width]
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    boxes = []
+    shot, n_frames = -1, int(duration * fps)
+    background = movers = None
+    try:
+        for i in range(n_frames):
+            t = i / fps
+            current = int(np.searchsorted(cuts, t, side="right")) - 1
+            if current != shot:
+                shot = current
+                # 샷마다 색/방향/무늬가 다른 배경 → 그래디언트 해시가 크게 바뀐다
+                c0, c1 = rng.integers(0, 256, 3), rng.integers(0, 256, 3)
+                angle = rng.uniform(0, np.pi)
+                ramp = (np.cos(angle) * xx / width + np.sin(angle) * yy / height + 1) / 2
+                background = (c0 + (c1 - c0) * ramp[..., None]).astype(np.uint8)
+                texture = rng.integers(0, 40, (height // 8, width // 8), dtype=np.uint8)
+                background = cv2.add(background, cv2.cvtColor(
+                    cv2.resize(texture, (width, height), interpolation=cv2.INTER_NEAREST), cv2.COLOR_GRAY2BGR))
+                movers = []
+                for track in range(int(rng.integers(1, 4))):
+                    w, h = int(rng.uniform(0.08, 0.2) * width), int(rng.uniform(0.3, 0.7) * height)
+                    movers.append({"track_id": shot * 10 + track, "w": w, "h": h,
+                                   "x": float(rng.uniform(0, width - w)), "y": float(rng.uniform(0, height - h)),
+                                   "vx": float(rng.uniform(-4, 4)), "vy": float(rng.uniform(-1, 1)),
+                                   "color": tuple(int(c) for c in rng.integers(0, 256, 3))})
+            frame = background.copy()
+            for m in movers:
+                m["x"] = float(np.clip(m["x"] + m["vx"], 0, width - m["w"]))
+                m["y"] = float(np.clip(m["y"] + m["vy"], 0, height - m["h"]))
+                x, y = int(m["x"]), int(m["y"])
+                cv2.rectangle(frame, (x, y), (x + m["w"], y + m["h"]), m["color"], -1)
+                if i % fps == 0:
+                    boxes.append({"sec": i // fps, "track_id": m["track_id"], "x": x + m["w"] / 2,
+                                  "y": y + m["h"] / 2, "w": m["w"], "h": m["h"]})
+            writer.write(frame)
+    finally:
+        writer.release()
+    return {"cuts": cuts, "boxes": boxes}
+
+
+def make_srt(path, n, seed=SEED):
+    rng = np.random.default_rng(seed)
+    t = 1.0
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(1, n + 1):
+            # 약 5% 는 앞 자막과 겹친다
+            start = t - (0.5 if rng.random() < 0.05 else 0.0)
+            end = start + float(rng.uniform(0.8, 4.0))
+            words = " ".join(f"word{int(w)}" for w in rng.integers(0, 500, int(rng.integers(2, 12))))
+            f.write(f"{i}\n{_fmt_srt(start)} --> {_fmt_srt(end)}\n<i>Line {i}:</i> {words}\n\n")
+            t = end + float(rng.uniform(0.05, 2.0))
+    return t
+
+
+def make_azure(path, n_shots, seed=SEED):
+    """Video Indexer style azure.json with n_shots shots (1-4 keyframes each), scenes and labels."""
+    rng = np.random.default_rng(seed)
+    bounds = np.concatenate([[0.1], 0.1 + np.cumsum(rng.uniform(0.5, 12.0, n_shots))])
+
+    def inst(a, b):
+        return {"adjustedStart": _fmt_azure(a), "adjustedEnd": _fmt_azure(b), "start": _fmt_azure(a),
+                "end": _fmt_azure(b)}
+
+    shots, kf_id = [], 1
+    for i in range(n_shots):
+        a, b = bounds[i], bounds[i + 1]
+        keyframes = []
+        for t in np.sort(rng.uniform(a, b, int(rng.integers(1, 5)))):
+            keyframes.append({"id": kf_id, "instances": [dict(inst(t, min(t + 0.04, b)), thumbnailId=f"kf{kf_id}")]})
+            kf_id += 1
+        shots.append({"id": i + 1, "keyFrames": keyframes, "instances": [inst(a, b)]})
+    scene_bounds = np.concatenate([[0], np.sort(rng.choice(np.arange(1, n_shots), n_shots // 10, replace=False)),
+                                   [n_shots]])
+    scenes = [{"id": i + 1, "instances": [inst(bounds[s], bounds[e])]}
+              for i, (s, e) in enumerate(zip(scene_bounds[:-1], scene_bounds[1:]))]
+    labels = []
+    for i, name in enumerate(["person", "indoor", "street", "night", "car", "bicycle"]):
+        picks = np.sort(rng.choice(n_shots, n_shots // 5, replace=False))
+        labels.append({"id": i + 1, "name": name, "instances": [inst(bounds[p], bounds[p + 1]) for p in picks]})
+    duration = float(bounds[-1])
+    data = {"name": "synthetic", "durationInSeconds": duration, "duration": _fmt_azure(duration),
+            "videos": [{"insights": {"duration": _fmt_azure(duration), "shots": shots, "scenes": scenes,
+                                     "labels": labels}}]}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    return duration
+
+
+def make_frame_jsons(directory, n, seed=SEED):
+    """Per-frame leading-lines results like the detector writes (frame_XXXX_leading_lines.json)."""
+    rng = np.random.default_rng(seed)
+    os.makedirs(directory, exist_ok=True)
+    for i in range(n):
+        lines = [{"start": rng.integers(0, 1920, 2).tolist(), "end": rng.integers(0, 1920, 2).tolist(),
+                  "angle": round(float(rng.uniform(-90, 90)), 3), "length": round(float(rng.uniform(20, 900)), 3),
+                  "strength": round(float(rng.random()), 4)}
+                 for _ in range(int(rng.integers(0, 25)))]
+        record = {"image_name": f"frame_{i:05d}.jpg", "original_dimensions": {"width": 1920, "height": 1024},
+                  "leading_lines": lines, "vanishing_points": [], "line_count": len(lines)}
+        with open(os.path.join(directory, f"frame_{i:05d}_leading_lines.json"), "w", encoding="utf-8") as f:
+            json.dump(record, f, indent=2)
+
+
+def make_tables(directory, truth, srt_end, n_subs, seed=SEED):
+    """Tracking CSV from the truth boxes (repeated to film length) and a tagged subtitle CSV."""
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    boxes = pd.DataFrame(truth["boxes"])
+    # 영상보다 긴 영화처럼 보이도록 박스 구간을 자막 길이만큼 반복
+    period = int(boxes["sec"].max()) + 1
+    repeats = max(1, int(srt_end // period))
+    parts = []
+    for r in range(repeats):
+        part = boxes.copy()
+        part["sec"] += r * period
+        part["track_id"] += r * 100_000
+        parts.append(part)
+    tracking = pd.concat(parts, ignore_index=True)
+    tracking["time_sec"] = tracking["sec"].astype(float)
+    tracking[["sec", "time_sec", "track_id", "x", "y", "w", "h"]].to_csv(
+        os.path.join(directory, "tracking.csv"), index=False)
+
+    starts = np.sort(rng.uniform(0, srt_end, n_subs))
+    subs = pd.DataFrame({"id": np.arange(1, n_subs + 1), "start": starts.round(3),
+                         "end": (starts + rng.uniform(0.8, 4.0, n_subs)).round(3),
+                         "text": [f"line {i}" for i in range(n_subs)],
+                         "emotions": [str([EMOTIONS[i % len(EMOTIONS)]]) for i in range(n_subs)],
+                         "situation": "synthetic", "situation_type": "stub"})
+    subs.to_csv(os.path.join(directory, "subtitles_tagged.csv"), index=False)
+    return len(tracking)
+
+
+def ensure_fixtures(out_dir, scale="small"):
+    """Create (or reuse) every fixture for a scale; returns a dict of paths and sizes."""
+    config = dict(SCALES[scale], scale=scale, seed=SEED)
+    config["size"] = list(config["size"])
+    manifest_path = os.path.join(out_dir, "fixture.json")
+    if os.path.exists(manifest_path):
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("config") == config and all(os.path.exists(p) for p in manifest["paths"].values()):
+            return manifest
+
+    os.makedirs(out_dir, exist_ok=True)
+    paths = {
+        "video": os.path.join(out_dir, "synthetic.mp4"),
+        "truth": os.path.join(out_dir, "truth.json"),
+        "srt": os.path.join(out_dir, "synthetic.srt"),
+        "azure": os.path.join(out_dir, "azure.json"),
+        "frame_jsons": os.path.join(out_dir, "leading_lines_frames"),
+        "tracking_csv": os.path.join(out_dir, "tracking.csv"),
+        "subtitles_csv": os.path.join(out_dir, "subtitles_tagged.csv"),
+    }
+    print(f"합성 입력 생성 ({scale}) → {out_dir}")
+    truth = make_video(paths["video"], config["video_sec"], tuple(config["size"]), config["fps"])
+    with open(paths["truth"], "w", encoding="utf-8") as f:
+        json.dump(truth, f)
+    srt_end = make_srt(paths["srt"], config["srt_cues"])
+    make_azure(paths["azure"], config["azure_shots"])
+    make_frame_jsons(paths["frame_jsons"], config["frame_jsons"])
+    tracking_rows = make_tables(out_dir, truth, srt_end, config["srt_cues"] // 10)
+    manifest = {"config": config, "paths": paths, "cuts": len(truth["cuts"]), "tracking_rows": tracking_rows}
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="벤치마크용 합성 입력 생성")
+    parser.add_argument("--out", default="bench_fixtures")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    args = parser.parse_args()
+    manifest = ensure_fixtures(args.out, args.scale)
+    print(json.dumps(manifest, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
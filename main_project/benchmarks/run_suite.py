@@ -0,0 +1,362 @@
+"""단계별 벤치마크 모음 (합성 입력, 기준 결과 비교)
+
+fixtures.py 로 만든 합성 영상/SRT/azure.json/프레임별 JSON/스텁 API 로 파이프라인의 각 단계를
+실행해 시간, 처리량, 최대 메모리(peak RSS)를 결과 파일에 남기고, 저장해 둔 기준 결과와 비교한다.
+단계마다 새 프로세스에서 돌리고 peak RSS 는 그 프로세스 이미지의 최고치(Linux 는 /proc 의 VmHWM,
+exec 때 초기화되므로 부모 프로세스의 메모리가 섞이지 않는다)이며, CINEMA_PROFILE 을 켜 두어
+decode_ms/infer_ms 같은 세부 계측도 함께 기록한다.
+
+단계:
+    frame_sampling     iter_frames 1초 간격 디코딩 + JPEG 인코딩 (05.28_extract_frame 과 같은 일)
+    shot_detection     sampling_plan.detect_shots 로컬 컷 검출 (정답 컷 대비 재현율 포함)
+    tracking_loop      tracking.track_batches + CSV 기록 (ultralytics 가 있을 때만)
+    consolidation      consolidate_json 전체 실행 후 증분 재실행
+    scene_shot         0616.scene_shot_analysis 의 analyze_scenes_shots (캐시 없이 azure.json 파싱부터)
+    subtitles          subtitles.load_srt 파싱 + 시각/구간 질의
+    subtitle_tagging   스텁 OpenAI 서버 대상 AsyncSubtitleTagger
+    master_table       master_table.build_master_table 시간 정렬 조인
+
+사용법:
+    python run_suite.py [--scale small|full] [--stages frame_sampling,subtitles] [--repeat 3]
+        [--baseline bench_results/baseline.json] [--save-baseline] [--tolerance 0.2]
+
+단계가 실패하거나 기준 대비 회귀하면 종료 코드 1.
+"""
+import argparse
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SRC = os.path.join(HERE, "..", "src")
+sys.path.append(SRC)
+sys.path.append(os.path.join(HERE, "..", "..", "new_project"))
+
+STAGES = ["frame_sampling", "shot_detection", "tracking_loop", "consolidation", "scene_shot", "subtitles",
+          "subtitle_tagging", "master_table"]
+DEFAULT_RESULTS_DIR = os.path.join(HERE, "bench_results")
+
+
+class Skip(Exception):
+    """Raised by a stage whose optional dependency or input is missing."""
+
+
+def _load_script(name):
+    path = os.path.join(HERE, "..", "scripts", name)
+    spec = importlib.util.spec_from_file_location(os.path.splitext(name)[0].replace(".", "_"), path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+# --- 단계: 각각 (처리한 개수, 단위, 추가 지표) 를 돌려준다 -------------------------------------
+
+def stage_frame_sampling(fx, work_dir):
+    from frame_source import iter_frames, video_info
+    from pipeline import encode_jpg
+
+    duration = int(video_info(fx["paths"]["video"])["duration"])
+    n, jpg_bytes = 0, 0
+    for _, _, frame in iter_frames(fx["paths"]["video"], range(duration)):
+        jpg_bytes += len(encode_jpg(frame))
+        n += 1
+    return n, "frames", {"jpg_mb": round(jpg_bytes / 1e6, 2)}
+
+
+def stage_shot_detection(fx, work_dir):
+    import numpy as np
+
+    from frame_source import video_info
+    from sampling_plan import DEFAULT_PROBE_FPS, detect_shots
+
+    with open(fx["paths"]["truth"], "r", encoding="utf-8") as f:
+        cuts = np.asarray(json.load(f)["cuts"][1:])
+    duration = video_info(fx["paths"]["video"])["duration"]
+    starts, _, _ = detect_shots(fx["paths"]["video"], 0.0, duration)
+    found = np.asarray(starts[1:])
+    # 탐침 간격(0.5초) 안에서 맞은 컷 비율
+    tol = 1.0 / DEFAULT_PROBE_FPS
+    hit = np.array([np.any(np.abs(found - c) <= tol) for c in cuts]) if len(found) else np.zeros(len(cuts), bool)
+    recall = float(hit.mean()) if len(cuts) else 1.0
+    return int(duration * DEFAULT_PROBE_FPS), "probes", {"cut_recall": round(recall, 3), "cuts_found": len(found),
+                                                         "cuts_true": len(cuts)}
+
+
+def stage_tracking_loop(fx, work_dir):
+    try:
+        from ultralytics import YOLO
+    except ImportError:
+        raise Skip("ultralytics 없음")
+    from frame_source import iter_frames, video_info
+    from pipeline import CsvRowWriter
+    from tracking import result_boxes, track_batches
+
+    weights = os.environ.get("BENCH_YOLO_WEIGHTS", "yolo11n.pt")
+    try:
+        model = YOLO(weights)
+    except Exception as e:
+        raise Skip(f"가중치를 불러올 수 없음: {weights} ({e})")
+    duration = int(video_info(fx["paths"]["video"])["duration"])
+    writer = CsvRowWriter(os.path.join(work_dir, "tracking.csv"), ["sec", "track_id", "x", "y", "w", "h"])
+    stats, boxes = {}, 0
+    try:
+        for sec, _, _, result in track_batches(model, iter_frames(fx["paths"]["video"], range(duration)),
+                                               tracker="bytetrack.yaml", stats=stats):
+            if result is None:
+                continue
+            rows = [{"sec": int(sec), "track_id": int(tid), "x": float(b[0]), "y": float(b[1]), "w": float(b[2]),
+                     "h": float(b[3])} for b, tid in zip(*result_boxes(result))]
+            boxes += len(rows)
+            writer.write_rows(rows)
+    finally:
+        writer.close()
+    return stats.get("frames", 0), "frames", {"boxes": boxes, "infer_sec": round(stats.get("infer_sec", 0.0), 3)}
+
+
+def stage_consolidation(fx, work_dir):
+    import shutil
+
+    from consolidate_json import consolidate_json_files, list_frame_files
+
+    directory = os.path.join(work_dir, "frames")
+    shutil.copytree(fx["paths"]["frame_jsons"], directory)
+    n = len(list_frame_files(directory))
+    with contextlib.redirect_stdout(io.StringIO()):
+        t0 = time.perf_counter()
+        consolidate_json_files(directory, workers=8, full=True)
+        full_sec = time.perf_counter() - t0
+        # 한 파일만 바꾸고 다시 실행 (증분)
+        first = os.path.join(directory, list_frame_files(directory)[0])
+        with open(first, "a", encoding="utf-8") as f:
+            f.write("\n")
+        t0 = time.perf_counter()
+        consolidate_json_files(directory, workers=8)
+        incremental_sec = time.perf_counter() - t0
+    size = os.path.getsize(os.path.join(directory, "consolidated_all_leading_lines.json"))
+    return n, "files", {"full_sec": round(full_sec, 3), "incremental_sec": round(incremental_sec, 3),
+                        "output_mb": round(size / 1e6, 2)}
+
+
+def stage_scene_shot(fx, work_dir):
+    import shutil
+
+    azure = os.path.join(work_dir, "azure.json")
+    shutil.copy(fx["paths"]["azure"], azure)  # .index.pkl 이 fixture 폴더에 남지 않도록
+    module = _load_script("0616.scene_shot_analysis.py")
+    with contextlib.redirect_stdout(io.StringIO()):
+        summary = module.analyze_scenes_shots(azure)
+        t0 = time.perf_counter()
+        module.analyze_scenes_shots(azure)  # 두 번째는 .index.pkl 캐시
+        cached_sec = time.perf_counter() - t0
+    return summary["total_shots"], "shots", {"scenes": summary["total_scenes"], "cached_sec": round(cached_sec, 3)}
+
+
+def stage_subtitles(fx, work_dir):
+    import numpy as np
+
+    from subtitles import load_srt
+
+    subs = load_srt(fx["paths"]["srt"], cache=False)
+    rng = np.random.default_rng(0)
+    t0 = time.perf_counter()
+    for t in rng.uniform(0, float(subs.ends.max()), 10_000):
+        subs.active_at(t)
+        subs.window(t, t + 60)
+    query_sec = time.perf_counter() - t0
+    return len(subs), "cues", {"query_us": round(query_sec / 10_000 * 1e6, 2)}
+
+
+def stage_subtitle_tagging(fx, work_dir):
+    import asyncio
+
+    from stub_openai_server import start_stub_server
+    from subtitle_tagger import AsyncSubtitleTagger, make_client
+
+    n = fx["config"]["tag_lines"]
+    emotions = ["joy", "calm", "neutral", "concern", "surprise"]
+    server, url, state = start_stub_server(rpm=6000, latency=0.02)
+    try:
+        tagger = AsyncSubtitleTagger(make_client("stub", url), emotions, rpm=6000, concurrency=16, base_delay=0.05)
+        texts = [f"Synthetic subtitle line number {i}." for i in range(n)]
+        results = asyncio.run(tagger.tag_all(texts, batch_size=10))
+    finally:
+        server.shutdown()
+    tagged = sum(1 for r in results if r.get("emotions"))
+    return n, "lines", {"tagged": tagged, "requests": state.stats["requests"],
+                        "rate_limited": state.stats["rate_limited"]}
+
+
+def stage_master_table(fx, work_dir):
+    from master_table import build_master_table
+
+    rows = build_master_table(fx["paths"]["tracking_csv"], os.path.join(work_dir, "master.csv"),
+                              subtitles_csv=fx["paths"]["subtitles_csv"], azure_json=None,
+                              valence_map={"joy": 1.0, "calm": 0.5, "neutral": 0.5, "concern": 0.42})
+    return rows, "rows", {}
+
+
+# --- 실행/기록 ---------------------------------------------------------------------------------
+
+def _peak_rss_mb():
+    # ru_maxrss 는 Linux 에서 fork+exec 를 넘어 부모의 최고치를 물려받으므로 VmHWM 을 먼저 쓴다
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024  # macOS 는 바이트, Linux 는 KB
+
+
+def run_stage_here(name, fixtures):
+    """Run one stage in this process; returns its result dict (used inside the child process)."""
+    import instrument
+
+    with tempfile.TemporaryDirectory(prefix=f"bench_{name}_") as work_dir:
+        t0 = time.perf_counter()
+        try:
+            items, unit, extra = globals()[f"stage_{name}"](fixtures, work_dir)
+        except Skip as e:
+            return {"stage": name, "skipped": str(e)}
+        wall = time.perf_counter() - t0
+    return {"stage": name, "wall_sec": round(wall, 4), "items": items, "unit": unit,
+            "throughput": round(items / wall, 2) if wall else None, "peak_rss_mb": round(_peak_rss_mb(), 1),
+            **extra, "instrument": instrument.snapshot()}
+
+
+def run_stage(name, fixture_dir, scale, repeat):
+    """Run a stage `repeat` times, each in a fresh process; keeps the fastest run."""
+    best = None
+    env = dict(os.environ, CINEMA_PROFILE="1", PYTHONHASHSEED="0")
+    for _ in range(repeat):
+        with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as f:
+            out_path = f.name
+        try:
+            proc = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", name, "--fixtures",
+                                   fixture_dir, "--scale", scale, "--child-out", out_path],
+                                  env=env, capture_output=True, text=True)
+            if proc.returncode != 0:
+                return {"stage": name, "error": proc.stderr.strip().splitlines()[-1] if proc.stderr else "failed"}
+            with open(out_path, "r", encoding="utf-8") as f:
+                result = json.load(f)
+        finally:
+            os.remove(out_path)
+        if "skipped" in result:
+            return result
+        if best is None or result["wall_sec"] < best["wall_sec"]:
+            best = result
+    return best
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE, capture_output=True,
+                              text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def missing_results(results, baseline):
+    """Stages run this time that have a baseline result but no result now (failed or skipped)."""
+    base = {r["stage"] for r in baseline.get("stages", []) if "wall_sec" in r}
+    return [r["stage"] for r in results if r["stage"] in base and "wall_sec" not in r]
+
+
+def compare(results, baseline, tolerance):
+    """[(stage, metric, baseline, current, ratio, regressed)] for wall time and peak RSS."""
+    base = {r["stage"]: r for r in baseline.get("stages", []) if "wall_sec" in r}
+    rows = []
+    for r in results:
+        b = base.get(r["stage"])
+        if b is None or "wall_sec" not in r:
+            continue
+        for metric in ("wall_sec", "peak_rss_mb"):
+            ratio = r[metric] / b[metric] if b[metric] else 1.0
+            rows.append((r["stage"], metric, b[metric], r[metric], ratio, ratio > 1 + tolerance))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", choices=["small", "full"], default="small")
+    parser.add_argument("--stages", default=",".join(STAGES), help="쉼표로 구분한 단계 이름")
+    parser.add_argument("--repeat", type=int, default=3, help="단계별 반복 횟수 (가장 빠른 값 기록)")
+    parser.add_argument("--fixtures", default=None, help="합성 입력 폴더 (기본: bench_results/fixtures_<scale>)")
+    parser.add_argument("--results-dir", default=DEFAULT_RESULTS_DIR)
+    parser.add_argument("--baseline", default=None, help="비교할 기준 결과 (기본: <results-dir>/baseline_<scale>.json)")
+    parser.add_argument("--save-baseline", action="store_true", help="이번 결과를 기준 결과로 저장")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="이 비율 이상 느려지거나 커지면 회귀로 표시")
+    parser.add_argument("--child", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--child-out", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    from fixtures import ensure_fixtures
+
+    fixture_dir = args.fixtures or os.path.join(args.results_dir, f"fixtures_{args.scale}")
+    if args.child:
+        result = run_stage_here(args.child, ensure_fixtures(fixture_dir, args.scale))
+        with open(args.child_out, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False)
+        return
+
+    ensure_fixtures(fixture_dir, args.scale)
+    stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        parser.error(f"알 수 없는 단계: {', '.join(sorted(unknown))}")
+
+    results = []
+    for name in stages:
+        result = run_stage(name, fixture_dir, args.scale, args.repeat)
+        results.append(result)
+        if "skipped" in result:
+            print(f"{name:<17} 건너뜀: {result['skipped']}")
+        elif "error" in result:
+            print(f"{name:<17} 실패: {result['error']}")
+        else:
+            print(f"{name:<17} {result['wall_sec']:8.3f}s  {result['throughput']:>10,.1f} {result['unit']}/s  "
+                  f"peak RSS {result['peak_rss_mb']:7.1f}MB")
+
+    report = {"created": datetime.now().isoformat(), "scale": args.scale, "repeat": args.repeat,
+              "commit": _git_commit(), "python": platform.python_version(), "platform": platform.platform(),
+              "cpus": os.cpu_count(), "stages": results}
+    os.makedirs(args.results_dir, exist_ok=True)
+    out_path = os.path.join(args.results_dir, f"suite_{args.scale}_{datetime.now():%Y%m%d_%H%M%S}.json")
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"결과: {out_path}")
+
+    baseline_path = args.baseline or os.path.join(args.results_dir, f"baseline_{args.scale}.json")
+    # 실패한 단계는 가장 큰 회귀다
+    regressed = any("error" in r for r in results)
+    if os.path.exists(baseline_path) and not args.save_baseline:
+        with open(baseline_path, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        print(f"기준 결과와 비교 ({baseline_path}, commit {baseline.get('commit')}, 허용 {args.tolerance:.0%}):")
+        for stage, metric, b, c, ratio, bad in compare(results, baseline, args.tolerance):
+            regressed |= bad
+            print(f"  {stage:<17} {metric:<12} {b:>10.3f} → {c:>10.3f}  ({ratio:5.2f}x){'  ← 회귀' if bad else ''}")
+        for stage in missing_results(results, baseline):
+            regressed = True
+            print(f"  {stage:<17} 기준 결과는 있지만 이번 실행에는 결과 없음  ← 회귀")
+    if args.save_baseline:
+        with open(baseline_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"기준 결과 저장: {baseline_path}")
+    if regressed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""로컬 OpenAI 호환 스텁 서버 (/v1/chat/completions)
+
+실제 API 없이 자막 태깅 엔진을 시험하기 위한 서버. 분당 요청 수를 넘기면
+429 + retry-after 를 돌려주고, 응답 지연과 잘못된 JSON 비율을 흉내낼 수 있다.
+응답 내용은 프롬프트에 들어 있는 허용 감정 목록과 자막 id에서 결정적으로 만든다.
+
+사용법:
+    python stub_openai_server.py [--port 8765] [--rpm 120] [--latency 0.2] [--malformed 0.0]
+"""
+import argparse
+import ast
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def _labels_from_prompt(prompt):
+    match = re.search(r"\[('[^\]]*')\]", prompt)
+    if match:
+        try:
+            return list(ast.literal_eval("[" + match.group(1) + "]"))
+        except (ValueError, SyntaxError):
+            pass
+    return ["neutral"]
+
+
+def _fake_tag(text, labels):
+    digest = int(hashlib.md5(text.encode("utf-8")).hexdigest(), 16)
+    return {
+        "emotions": [labels[digest % len(labels)]],
+        "situation": "stub situation",
+        "situation_type": "stub",
+    }
+
+
+def fake_reply(prompt):
+    """Build a plausible reply: a JSON array for batch prompts, one object otherwise."""
+    labels = _labels_from_prompt(prompt)
+    ids = re.findall(r'^\s*\{"id":\s*(\d+),\s*"text":\s*(".*")\}\s*,?\s*$', prompt, re.MULTILINE)
+    if ids:
+        items = []
+        for sub_id, text in ids:
+            item = _fake_tag(json.loads(text), labels)
+            item["id"] = int(sub_id)
+            items.append(item)
+        return json.dumps(items, ensure_ascii=False)
+    return json.dumps(_fake_tag(prompt[-200:], labels), ensure_ascii=False)
+
+
+class StubState:
+    def __init__(self, rpm=120, latency=0.2, malformed=0.0):
+        self.rpm = rpm
+        self.latency = latency
+        self.malformed = malformed
+        self.lock = threading.Lock()
+        self.window = deque()
+        self.stats = {"requests": 0, "rate_limited": 0, "prompt_tokens": 0}
+
+    def admit(self):
+        """Sliding one-minute window; returns seconds to wait if over the limit, else None."""
+        now = time.monotonic()
+        with self.lock:
+            while self.window and now - self.window[0] >= 60.0:
+                self.window.popleft()
+            if self.rpm and len(self.window) >= self.rpm:
+                self.stats["rate_limited"] += 1
+                return 60.0 - (now - self.window[0])
+            self.window.append(now)
+            self.stats["requests"] += 1
+            return None
+
+
+def make_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _send(self, code, body, headers=None):
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            if not self.path.rstrip("/").endswith("chat/completions"):
+                self._send(404, {"error": {"message": "not found"}})
+                return
+
+            wait = state.admit()
+            if wait is not None:
+                self._send(429, {"error": {"message": "rate limit", "type": "rate_limit_exceeded"}},
+                           {"retry-after": f"{max(wait, 0.05):.2f}"})
+                return
+
+            prompt = "".join(m.get("content", "") for m in payload.get("messages", []))
+            prompt_tokens = max(1, len(prompt) // 4)
+            with state.lock:
+                state.stats["prompt_tokens"] += prompt_tokens
+            time.sleep(state.latency)
+
+            content = fake_reply(prompt)
+            if random.random() < state.malformed:
+                content = content[: len(content) // 2]
+            self._send(200, {
+                "id": "stub",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": payload.get("model", "stub"),
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": content}}],
+                "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": len(content) // 4,
+                          "total_tokens": prompt_tokens + len(content) // 4},
+            })
+
+    return Handler
+
+
+def start_stub_server(port=0, rpm=120, latency=0.2, malformed=0.0):
+    """Start the stub in a background thread; returns (server, base_url, state)."""
+    state = StubState(rpm=rpm, latency=latency, malformed=malformed)
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(state))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1", state
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenAI 호환 스텁 서버")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--rpm", type=int, default=120)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--malformed", type=float, default=0.0, help="잘린 JSON 응답 비율")
+    args = parser.parse_args()
+    server, url, _ = start_stub_server(args.port, args.rpm, args.latency, args.malformed)
+    print(f"스텁 서버 실행 중: {url} (Ctrl+C로 종료)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,40 @@
 import cv2
 import pandas as pd
 import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+import instrument
+from frame_source import iter_frames
+
+instrument.start_run("05.28_extract_frame")  # CINEMA_PROFILE=1 일 때만 단계별 시간 리포트
 
 # 원본 영상 경로
 video_path = "../data/samples/Ran.1985_sample.mp4"
 out_dir = "../data/frames/"
 os.makedirs(out_dir, exist_ok=True)
 
-# 필요한 sec(초)만 추출
+
+def frame_name(t):
+    # 정수 초는 기존 이름(frame_0012.jpg), 샷 단위 샘플링의 실수 시각은 frame_0012.500.jpg
+    return f"frame_{int(t):04d}.jpg" if float(t).is_integer() else f"frame_{t:08.3f}.jpg"
+
+
+# 필요한 시각만 추출 (time_sec 열이 있으면 실수 시각 그대로, 없으면 정수 sec)
 df = pd.read_csv("../data/results/main_character_tracking.csv")
-secs_needed = sorted(set(df['sec'].astype(int).tolist()))
+if "time_sec" in df:
+    secs_needed = sorted(set(df["time_sec"].round(3).tolist()))
+else:
+    secs_needed = sorted(set(df['sec'].astype(int).tolist()))
 
-cap = cv2.VideoCapture(video_path)
-fps = cap.get(cv2.CAP_PROP_FPS)
+# 한 번의 순방향 디코딩으로 필요한 시각만 저장
+extracted = set()
+for sec, frame_num, frame in iter_frames(video_path, secs_needed):
+    out_path = f"{out_dir}/{frame_name(sec)}"
+    with instrument.timer("frame_write_ms"):
+        cv2.imwrite(out_path, frame)
+    extracted.add(sec)
 
 for sec in secs_needed:
-    frame_num = int(sec * fps)
-    cap.set(cv2.CAP_PROP_POS_FRAMES, frame_num)
-    ret, frame = cap.read()
-    if ret:
-        out_path = f"{out_dir}/frame_{sec:04d}.jpg"
-        cv2.imwrite(out_path, frame)
-    else:
-        print(f"프레임 추출 실패: {sec}s ({frame_num}번째 프레임)")
-cap.release()
+    if sec not in extracted:
+        print(f"프레임 추출 실패: {sec}s")
@@ -1 +1,36 @@
 # 추적 결과와 자막, 감정 결과 연동 스크립트
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+import instrument
+from master_table import build_master_table
+
+instrument.start_run("05.28_merge_with_subs")  # CINEMA_PROFILE=1 일 때만 단계별 시간 리포트
+
+# 입력 경로 (없는 입력은 None 으로 두면 해당 열을 건너뛴다)
+tracking_csv = "../data/output/results/brighter_bbx_tracking.csv"
+subtitles_csv = "../data/output/brighter_llm_srt.csv"
+labels_csv = "../data/output/emotion_tag_labeled.csv"  # 또는 track_faces.py 의 track 결과
+azure_json = "../data/raw/azure.json"
+
+# 자막 CSV 는 영화 전체 시각, 추적/azure 는 part3 클립(9657초부터) 기준이므로 자막을 앞으로 당긴다
+subtitle_offset = -9657  # 05.28_subtitles_analysis.ipynb 의 SAMPLE_START
+
+# .parquet 으로 저장하면 (pyarrow 필요) CSV 텍스트 변환보다 훨씬 빠르다
+out_path = "../data/output/results/brighter_master_table.csv"
+
+emotion_valence = {
+    "joy": 1.00, "love": 0.95, "affection": 0.90, "gratitude": 0.88, "excitement": 0.85,
+    "amusement": 0.82, "relief": 0.80, "pride": 0.78, "confidence": 0.75, "ambition": 0.73,
+    "protectiveness": 0.70, "determination": 0.68, "anticipation": 0.65, "respect": 0.63,
+    "curiosity": 0.60, "surprise": 0.58, "incredulity": 0.55, "authority": 0.52,
+    "calm": 0.50, "neutral": 0.50, "neutrality": 0.50, "seriousness": 0.48,
+    "caution": 0.45, "concern": 0.42, "nostalgia": 0.40, "awe": 0.38,
+}
+
+start = time.perf_counter()
+rows = build_master_table(tracking_csv, out_path, subtitles_csv=subtitles_csv, labels_csv=labels_csv,
+                          azure_json=azure_json, valence_map=emotion_valence, subtitle_offset=subtitle_offset)
+print(f"마스터 테이블 {rows}행 → {out_path} ({time.perf_counter() - start:.2f}s)")
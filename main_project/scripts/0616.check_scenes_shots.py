@@ -1,108 +1,95 @@
 #!/usr/bin/env python3
-import json
+import os
+import sys
 
-def check_scenes_shots():
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+import instrument
+from azure_index import AzureIndex
+
+def check_scenes_shots(azure_path='azure.json'):
     """Check if Azure JSON contains scene and shot data"""
     
-    with open('azure.json', 'r', encoding='utf-8') as f:
-        data = json.load(f)
+    # 구조 요약과 구간 배열은 인덱스(캐시)에서 읽는다
+    index = AzureIndex.load(azure_path)
+    meta = index.meta
     
     print("🎬 씬과 샷 데이터 확인")
     print("=" * 50)
     
     # 전체 JSON 구조 확인
     print("📊 JSON 최상위 키들:")
-    for key in data.keys():
+    for key in meta['top_level_keys']:
         print(f"  - {key}")
     print()
     
     # 비디오 인사이트 내부 확인
-    if 'videos' in data and len(data['videos']) > 0:
-        video = data['videos'][0]
-        insights = video.get('insights', {})
-        
-        print("🔍 인사이트 섹션 내 키들:")
-        for key in insights.keys():
-            if isinstance(insights[key], list):
-                print(f"  - {key}: {len(insights[key])}개 항목")
-            else:
-                print(f"  - {key}: {type(insights[key])}")
-        print()
-        
-        # 씬 데이터 확인
-        scenes = insights.get('scenes', [])
-        if scenes:
-            print("🎭 씬(Scene) 데이터 발견!")
-            print(f"  총 씬 수: {len(scenes)}")
-            
-            print("  샘플 씬 정보:")
-            for i, scene in enumerate(scenes[:3]):
-                print(f"    씬 {i+1}:")
-                for key, value in scene.items():
-                    if key == 'instances' and isinstance(value, list):
-                        print(f"      {key}: {len(value)}개 인스턴스")
-                        if value:
-                            first_instance = value[0]
-                            start = first_instance.get('start', 'N/A')
-                            end = first_instance.get('end', 'N/A')
-                            print(f"        첫 번째: {start} - {end}")
-                    else:
-                        print(f"      {key}: {value}")
+    sections = meta['sections']
+    print("🔍 인사이트 섹션 내 키들:")
+    for key, value in sections.items():
+        if isinstance(value, int):
+            print(f"  - {key}: {value}개 항목")
         else:
-            print("❌ 씬(Scene) 데이터 없음")
-        
-        # 샷 데이터 확인
-        shots = insights.get('shots', [])
-        if shots:
-            print("\n📷 샷(Shot) 데이터 발견!")
-            print(f"  총 샷 수: {len(shots)}")
-            
-            print("  샘플 샷 정보:")
-            for i, shot in enumerate(shots[:5]):
-                print(f"    샷 {i+1}:")
-                for key, value in shot.items():
-                    if key == 'instances' and isinstance(value, list):
-                        print(f"      {key}: {len(value)}개 인스턴스")
-                        if value:
-                            first_instance = value[0]
-                            start = first_instance.get('start', 'N/A')
-                            end = first_instance.get('end', 'N/A')
-                            print(f"        시간: {start} - {end}")
-                    else:
-                        print(f"      {key}: {value}")
-        else:
-            print("\n❌ 샷(Shot) 데이터 없음")
-        
-        # 기타 비디오 분석 데이터 확인
-        print("\n🔍 기타 가능한 비디오 분석 데이터:")
+            print(f"  - {key}: {value}")
+    print()
+    
+    # 씬 데이터 확인
+    scenes = index['scenes'] if 'scenes' in index.sets else None
+    if scenes is not None and len(scenes):
+        print("🎭 씬(Scene) 데이터 발견!")
+        print(f"  총 씬 수: {len(scenes)}")
         
-        analysis_fields = [
-            'faces', 'keywords', 'labels', 'brands', 'emotions', 
-            'sentiments', 'visualContentModeration', 'audioEffects',
-            'blocks', 'framePatterns', 'speakers'
-        ]
+        print("  샘플 씬 정보:")
+        for i in range(min(3, len(scenes))):
+            print(f"    씬 {i+1}:")
+            print(f"      id: {scenes.owners[i]}")
+            print(f"      시간: {scenes.starts[i]:.2f}초 - {scenes.ends[i]:.2f}초")
+    else:
+        print("❌ 씬(Scene) 데이터 없음")
+    
+    # 샷 데이터 확인
+    shots = index['shots'] if 'shots' in index.sets else None
+    if shots is not None and len(shots):
+        keyframes_per_shot = index.keyframes_per_shot()
+        print("\n📷 샷(Shot) 데이터 발견!")
+        print(f"  총 샷 수: {len(shots)}")
         
-        for field in analysis_fields:
-            if field in insights:
-                data_item = insights[field]
-                if isinstance(data_item, list):
-                    if len(data_item) > 0:
-                        print(f"  ✅ {field}: {len(data_item)}개 항목")
-                    else:
-                        print(f"  ⚪ {field}: 빈 배열")
+        print("  샘플 샷 정보:")
+        for i in range(min(5, len(shots))):
+            print(f"    샷 {i+1}:")
+            print(f"      id: {shots.owners[i]}")
+            print(f"      keyFrames: {keyframes_per_shot.get(int(shots.owners[i]), 0)}개")
+            print(f"      시간: {shots.starts[i]:.2f}초 - {shots.ends[i]:.2f}초")
+    else:
+        print("\n❌ 샷(Shot) 데이터 없음")
+    
+    # 기타 비디오 분석 데이터 확인
+    print("\n🔍 기타 가능한 비디오 분석 데이터:")
+    
+    analysis_fields = [
+        'faces', 'keywords', 'labels', 'brands', 'emotions', 
+        'sentiments', 'visualContentModeration', 'audioEffects',
+        'blocks', 'framePatterns', 'speakers'
+    ]
+    
+    for field in analysis_fields:
+        if field in sections:
+            value = sections[field]
+            if isinstance(value, int):
+                if value > 0:
+                    print(f"  ✅ {field}: {value}개 항목")
                 else:
-                    print(f"  ⚪ {field}: {type(data_item)}")
-        
-        # 비어있지 않은 섹션들 상세 보기
-        print("\n📋 데이터가 있는 섹션들:")
-        for key, value in insights.items():
-            if isinstance(value, list) and len(value) > 0:
-                print(f"  • {key}: {len(value)}개")
-                # 첫 번째 항목 구조 확인
-                if value:
-                    first_item = value[0]
-                    if isinstance(first_item, dict):
-                        print(f"    구조: {list(first_item.keys())}")
+                    print(f"  ⚪ {field}: 빈 배열")
+            else:
+                print(f"  ⚪ {field}: {value}")
+    
+    # 비어있지 않은 섹션들 상세 보기
+    print("\n📋 데이터가 있는 섹션들:")
+    for key, value in sections.items():
+        if isinstance(value, int) and value > 0:
+            print(f"  • {key}: {value}개")
+            if key in meta['item_keys']:
+                print(f"    구조: {meta['item_keys'][key]}")
 
 if __name__ == "__main__":
-    check_scenes_shots() 
\ No newline at end of file
+    instrument.start_run("0616.check_scenes_shots")
+    check_scenes_shots(sys.argv[1] if len(sys.argv) > 1 else 'azure.json')
@@ -0,0 +1,190 @@
+"""Azure Video Indexer 인사이트(azure.json) 인덱스
+
+azure.json 을 한 번만 파싱해 인사이트 종류(scenes, shots, keyframes, labels, faces,
+transcript, ...)마다 정렬된 시작/끝 float 배열(IntervalSet)로 만든다. 'H:MM:SS.ff'
+문자열은 로드할 때 한 번만 변환하고, 결과는 원본 옆의 .index.pkl (CINEMA_INDEX_CACHE=폴더 면
+그 폴더) 에 캐시해 두었다가 원본 크기/수정 시각이 같으면 그대로 읽는다. 캐시를 쓸 수 없으면
+캐시 없이 동작한다.
+
+    index = AzureIndex.load("../data/raw/azure.json")
+    index.scene_at(123.4)                # t 를 포함하는 씬 id
+    index.overlapping("labels", 60, 90)  # [60, 90) 과 겹치는 라벨 이름들
+
+사용법:
+    python azure_index.py <azure.json> [--at 초] [--between 시작 끝]
+"""
+import argparse
+import json
+import os
+import pickle
+
+import numpy as np
+
+import instrument
+from intervals import IntervalSet, index_cache_path, write_index_cache
+
+CACHE_VERSION = 1
+NAME_KEYS = ("name", "type", "sentimentType", "text")
+
+
+def parse_time(value):
+    """Parse an Azure time string like '0:00:11.68' to seconds."""
+    hours, minutes, seconds = value.split(":")
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+
+def _item_name(item):
+    for key in NAME_KEYS:
+        if item.get(key) is not None:
+            return str(item[key])
+    return str(item.get("id", ""))
+
+
+def _interval_set(items):
+    """One interval per instance; owner = item id, name = item name/type/text."""
+    starts, ends, owners, names = [], [], [], []
+    for item in items:
+        name = _item_name(item)
+        for inst in item.get("instances") or []:
+            if "start" not in inst or "end" not in inst:
+                continue
+            starts.append(parse_time(inst["start"]))
+            ends.append(parse_time(inst["end"]))
+            owners.append(item.get("id", -1))
+            names.append(name)
+    return IntervalSet(starts, ends, np.asarray(owners, dtype=np.int64), names)
+
+
+class AzureIndex:
+    """All time-coded insights of one video as sorted interval arrays."""
+
+    def __init__(self, sets, meta):
+        self.sets = sets
+        self.meta = meta
+
+    @classmethod
+    def from_json(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        video = data["videos"][0]
+        insights = video["insights"]
+        sets = {}
+        for key, value in insights.items():
+            if isinstance(value, list) and value and isinstance(value[0], dict) and "instances" in value[0]:
+                sets[key] = _interval_set(value)
+        # 키프레임은 샷 안에 들어 있다: owner 는 샷 id
+        keyframes = [dict(kf, id=shot["id"]) for shot in insights.get("shots", [])
+                     for kf in shot.get("keyFrames", [])]
+        sets["keyframes"] = _interval_set(keyframes)
+        meta = {
+            "name": data.get("name"),
+            "duration": parse_time(insights["duration"]) if "duration" in insights else None,
+            "width": video.get("width"),
+            "height": video.get("height"),
+            "top_level_keys": list(data.keys()),
+            "sections": {key: (len(value) if isinstance(value, list) else str(type(value)))
+                         for key, value in insights.items()},
+            "item_keys": {key: list(value[0].keys()) for key, value in insights.items()
+                          if isinstance(value, list) and value and isinstance(value[0], dict)},
+        }
+        return cls(sets, meta)
+
+    @classmethod
+    @instrument.timed("azure_load_ms")
+    def load(cls, path, cache=True):
+        """Load from the .index.pkl cache when it matches the source file, else parse and cache."""
+        cache_path = index_cache_path(path)
+        stat = os.stat(path)
+        signature = (CACHE_VERSION, stat.st_size, stat.st_mtime_ns)
+        if cache and os.path.exists(cache_path):
+            try:
+                with open(cache_path, "rb") as f:
+                    cached_signature, arrays, meta = pickle.load(f)
+                if cached_signature == signature:
+                    return cls({kind: IntervalSet(**a) for kind, a in arrays.items()}, meta)
+            except Exception:
+                pass
+        index = cls.from_json(path)
+        if cache:
+            # 클래스가 아닌 배열만 저장: 어느 스크립트에서 만든 캐시든 그대로 읽힌다
+            arrays = {kind: s.to_arrays() for kind, s in index.sets.items()}
+            write_index_cache(cache_path, (signature, arrays, index.meta))
+        return index
+
+    def __getitem__(self, kind):
+        return self.sets[kind]
+
+    def kinds(self):
+        return sorted(self.sets)
+
+    def _owner_at(self, kind, t):
+        pos = self.sets[kind].locate(t)
+        owners = np.where(pos >= 0, self.sets[kind].owners[np.clip(pos, 0, None)], -1)
+        return int(owners) if np.ndim(owners) == 0 else owners
+
+    def scene_at(self, t):
+        """Scene id containing t (scalar or array); -1 outside every scene."""
+        return self._owner_at("scenes", t)
+
+    def shot_at(self, t):
+        """Shot id containing t (scalar or array); -1 outside every shot."""
+        return self._owner_at("shots", t)
+
+    def containing(self, kind, t):
+        """Names of the kind's instances active at t."""
+        s = self.sets[kind]
+        return list(s.names[s.containing(t)])
+
+    def overlapping(self, kind, a, b):
+        """Names of the kind's instances overlapping [a, b)."""
+        s = self.sets[kind]
+        return list(s.names[s.overlapping(a, b)])
+
+    def at(self, t):
+        """Everything active at t, as {kind: [names]} (kinds without a hit are omitted)."""
+        out = {}
+        for kind, s in self.sets.items():
+            hits = s.containing(t)
+            if len(hits):
+                out[kind] = list(s.names[hits])
+        return out
+
+    def shot_scenes(self):
+        """Scene id of every shot (by shot start), in shot order."""
+        return self.scene_at(self.sets["shots"].starts)
+
+    def keyframes_per_shot(self):
+        """{shot id: number of keyframes}"""
+        owners = self.sets["keyframes"].owners
+        ids, counts = np.unique(owners, return_counts=True)
+        out = {int(shot_id): 0 for shot_id in self.sets["shots"].owners}
+        out.update({int(i): int(c) for i, c in zip(ids, counts)})
+        return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="azure.json 인사이트 인덱스 조회")
+    parser.add_argument("azure_json")
+    parser.add_argument("--at", type=float, default=None, help="이 시각(초)에 활성인 인사이트")
+    parser.add_argument("--between", type=float, nargs=2, default=None, help="이 구간과 겹치는 인사이트")
+    parser.add_argument("--no-cache", action="store_true")
+    args = parser.parse_args()
+
+    index = AzureIndex.load(args.azure_json, cache=not args.no_cache)
+    for kind in index.kinds():
+        print(f"  {kind}: {len(index[kind])}개 구간")
+    if args.at is not None:
+        print(f"\n{args.at}초: 씬 {index.scene_at(args.at)}, 샷 {index.shot_at(args.at)}")
+        for kind, names in index.at(args.at).items():
+            print(f"  {kind}: {', '.join(names[:10])}")
+    if args.between is not None:
+        a, b = args.between
+        print(f"\n[{a}, {b}) 구간")
+        for kind in index.kinds():
+            names = index.overlapping(kind, a, b)
+            if names:
+                print(f"  {kind}: {len(names)}개 ({', '.join(sorted(set(names))[:10])})")
+
+
+if __name__ == "__main__":
+    main()
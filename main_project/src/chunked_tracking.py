@@ -0,0 +1,316 @@
+"""시간 구간을 겹치는 청크로 나눠 프로세스별로 추적하고 track ID를 이어 붙이는 모듈
+
+각 청크는 자기 구간(own_start~own_end) 앞에 overlap초의 워밍업 구간을 더 추적한다.
+워밍업 구간은 이전 청크의 마지막 overlap초와 겹치므로, 그 구간에서 두 청크의
+박스를 IoU(+ JDE 임베딩 코사인 유사도)로 짝지어 투표한 뒤 청크 로컬 ID를 전역 ID로
+바꾼다. 출력에는 각 초를 소유한 청크의 행만 들어간다.
+"""
+import os
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import numpy as np
+
+import instrument
+from frame_source import iter_frames
+from pipeline import encode_jpg
+from tracking import DEFAULT_BATCH_SIZE, DEFAULT_TRACKER, result_boxes, track_batches
+
+DEFAULT_OVERLAP_SEC = 10
+MAX_SAMPLES_PER_TRACK = 20
+ROW_FIELDS = ["sec", "time_sec", "track_id", "x", "y", "w", "h"]
+
+
+def split_chunks(start, end, n_chunks, overlap=DEFAULT_OVERLAP_SEC):
+    """Split [start, end) into n_chunks owned ranges, each with an overlap warm-up before it."""
+    n_chunks = max(1, min(n_chunks, end - start))
+    bounds = np.linspace(start, end, n_chunks + 1).round().astype(int)
+    chunks = []
+    for i in range(n_chunks):
+        own_start, own_end = int(bounds[i]), int(bounds[i + 1])
+        run_start = own_start if i == 0 else max(start, own_start - overlap)
+        chunks.append({"index": i, "run_start": run_start, "own_start": own_start, "own_end": own_end})
+    return chunks
+
+
+# YOLO11-JDE 포크가 Results 에 임베딩을 싣는 위치 후보 (포크 버전마다 이름이 다르다)
+EMBEDDING_ATTRS = ("embeds", "embeddings", "feats", "features")
+_warned_no_embeddings = False
+
+
+def result_embeddings(result):
+    """Return per-box JDE embeddings (N x D float32) if the result carries them, else None.
+
+    Looks for EMBEDDING_ATTRS on the result first, then on result.boxes.
+    """
+    for owner in (result, getattr(result, "boxes", None)):
+        for name in EMBEDDING_ATTRS:
+            embeds = getattr(owner, name, None) if owner is not None else None
+            if embeds is None:
+                continue
+            if hasattr(embeds, "cpu"):
+                embeds = embeds.cpu().numpy()
+            embeds = np.asarray(embeds, dtype=np.float32)
+            if embeds.ndim == 2:
+                return embeds
+    return None
+
+
+def _warn_no_embeddings(result):
+    global _warned_no_embeddings
+    if _warned_no_embeddings:
+        return
+    _warned_no_embeddings = True
+    boxes = getattr(result, "boxes", None)
+    print(f"[경고] JDE 모델 결과에서 임베딩을 찾지 못했습니다 ({', '.join(EMBEDDING_ATTRS)} 확인, "
+          f"result 속성: {sorted(a for a in getattr(result, '__dict__', {}) if not a.startswith('_'))}, "
+          f"boxes 타입: {type(boxes).__name__}). 청크 이어붙이기는 IoU만 사용합니다.")
+
+
+def track_chunk(chunk, video_path, weights_path, batch_size=DEFAULT_BATCH_SIZE,
+                tracker=DEFAULT_TRACKER, overlap=DEFAULT_OVERLAP_SEC):
+    """Track one chunk with a fresh model/tracker and return its rows and crop samples.
+
+    Rows carry local track ids. Rows inside the two stitching windows (the warm-up
+    before own_start and the last `overlap` seconds of the chunk) also keep an
+    "emb" entry when the model exposes embeddings.
+    """
+    from ultralytics import YOLO
+
+    model = YOLO(weights_path, task="jde")
+    own_start, own_end = chunk["own_start"], chunk["own_end"]
+    rows = []
+    samples = defaultdict(list)
+    window_rows = embedded_rows = 0
+    t0 = time.perf_counter()
+
+    frames = iter_frames(video_path, range(chunk["run_start"], own_end))
+    for sec, frame_index, frame, result in track_batches(model, frames, batch_size=batch_size, tracker=tracker):
+        if result is None:
+            continue
+        boxes, track_ids = result_boxes(result)
+        embeds = result_embeddings(result)
+        if embeds is None and len(boxes):
+            _warn_no_embeddings(result)
+        in_window = sec < own_start or sec >= own_end - overlap
+
+        for i, (box, track_id) in enumerate(zip(boxes, track_ids)):
+            x, y, w, h = (float(v) for v in box)
+            row = {"sec": int(sec), "time_sec": float(sec), "track_id": int(track_id), "x": x, "y": y, "w": w, "h": h}
+            if in_window:
+                window_rows += 1
+                if embeds is not None and i < len(embeds):
+                    row["emb"] = embeds[i]
+                    embedded_rows += 1
+            rows.append(row)
+
+            if sec < own_start or len(samples[track_id]) >= MAX_SAMPLES_PER_TRACK:
+                continue
+            l, t = int(x - w / 2), int(y - h / 2)
+            r, b = int(x + w / 2), int(y + h / 2)
+            crop = frame[t:b, l:r] if l >= 0 and t >= 0 and r > l and b > t else None
+            if crop is not None and crop.size > 0:
+                samples[track_id].append((sec, encode_jpg(crop)))
+
+    return {
+        "chunk": chunk,
+        "rows": rows,
+        "samples": dict(samples),
+        "window_rows": window_rows,
+        "embedded_rows": embedded_rows,
+        "elapsed": time.perf_counter() - t0,
+        "pid": os.getpid(),
+    }
+
+
+def box_iou(a, b):
+    """IoU matrix between two (N, 4) / (M, 4) arrays of center-format xywh boxes."""
+    a = np.asarray(a, dtype=np.float64).reshape(-1, 4)
+    b = np.asarray(b, dtype=np.float64).reshape(-1, 4)
+    a1, a2 = a[:, :2] - a[:, 2:] / 2, a[:, :2] + a[:, 2:] / 2
+    b1, b2 = b[:, :2] - b[:, 2:] / 2, b[:, :2] + b[:, 2:] / 2
+    lt = np.maximum(a1[:, None], b1[None])
+    rb = np.minimum(a2[:, None], b2[None])
+    inter = np.clip(rb - lt, 0, None).prod(axis=2)
+    union = a[:, 2:].prod(axis=1)[:, None] + b[:, 2:].prod(axis=1)[None] - inter
+    return np.where(union > 0, inter / np.maximum(union, 1e-9), 0.0)
+
+
+def greedy_match(score, threshold):
+    """One-to-one greedy matching of a score matrix; returns (row, col) pairs above threshold."""
+    pairs = []
+    if score.size == 0:
+        return pairs
+    order = np.dstack(np.unravel_index(np.argsort(-score, axis=None), score.shape))[0]
+    used_r, used_c = set(), set()
+    for r, c in order:
+        if score[r, c] < threshold:
+            break
+        if r in used_r or c in used_c:
+            continue
+        used_r.add(r)
+        used_c.add(c)
+        pairs.append((int(r), int(c)))
+    return pairs
+
+
+def _rows_by_sec(rows, lo, hi):
+    by_sec = defaultdict(list)
+    for row in rows:
+        if lo <= row["sec"] < hi:
+            by_sec[row["sec"]].append(row)
+    return by_sec
+
+
+def _window_votes(prev_rows, next_rows, lo, hi, iou_threshold, emb_threshold):
+    """Count how often each (next local id, prev id) pair is matched inside [lo, hi)."""
+    prev_by_sec = _rows_by_sec(prev_rows, lo, hi)
+    next_by_sec = _rows_by_sec(next_rows, lo, hi)
+    votes = Counter()
+    for sec, nxt in next_by_sec.items():
+        prv = prev_by_sec.get(sec)
+        if not prv:
+            continue
+        iou = box_iou([[r["x"], r["y"], r["w"], r["h"]] for r in prv],
+                      [[r["x"], r["y"], r["w"], r["h"]] for r in nxt])
+        score = iou
+        if all("emb" in r for r in prv + nxt):
+            e_prev = np.stack([r["emb"] for r in prv])
+            e_next = np.stack([r["emb"] for r in nxt])
+            e_prev = e_prev / np.maximum(np.linalg.norm(e_prev, axis=1, keepdims=True), 1e-9)
+            e_next = e_next / np.maximum(np.linalg.norm(e_next, axis=1, keepdims=True), 1e-9)
+            sim = e_prev @ e_next.T
+            # 외형이 다르면 박스가 겹쳐도 같은 사람으로 보지 않는다
+            score = np.where(sim >= emb_threshold, (iou + sim) / 2, 0.0)
+        for r, c in greedy_match(score, iou_threshold):
+            votes[(nxt[c]["track_id"], prv[r]["track_id"])] += 1
+    return votes
+
+
+def stitch_chunks(chunk_results, iou_threshold=0.5, emb_threshold=0.5, min_votes=2):
+    """Merge chunk outputs into rows with globally consistent track ids.
+
+    Returns (rows, samples, id_maps, mode) where id_maps[i] maps chunk i local ids
+    to global ids and mode is stitch_mode(chunk_results). Only rows inside each
+    chunk's owned range are kept.
+    """
+    chunk_results = sorted(chunk_results, key=lambda r: r["chunk"]["index"])
+    next_global = 1
+    id_maps = []
+    prev_rows = None  # 이전 청크의 행 (track_id는 이미 전역 ID)
+
+    for res in chunk_results:
+        chunk = res["chunk"]
+        local_ids = sorted({row["track_id"] for row in res["rows"]})
+        id_map = {}
+
+        if prev_rows is not None:
+            votes = _window_votes(prev_rows, res["rows"], chunk["run_start"], chunk["own_start"],
+                                  iou_threshold, emb_threshold)
+            used_global = set()
+            for (local_id, global_id), n in votes.most_common():
+                if n < min_votes:
+                    break
+                if local_id in id_map or global_id in used_global:
+                    continue
+                id_map[local_id] = global_id
+                used_global.add(global_id)
+
+        for local_id in local_ids:
+            if local_id not in id_map:
+                id_map[local_id] = next_global
+                next_global += 1
+        id_maps.append(id_map)
+
+        prev_rows = [dict(row, track_id=id_map[row["track_id"]]) for row in res["rows"]]
+
+    rows = []
+    samples = defaultdict(list)
+    for res, id_map in zip(chunk_results, id_maps):
+        chunk = res["chunk"]
+        for row in res["rows"]:
+            if chunk["own_start"] <= row["sec"] < chunk["own_end"]:
+                rows.append({k: (id_map[row["track_id"]] if k == "track_id" else row[k]) for k in ROW_FIELDS})
+        for local_id, items in res["samples"].items():
+            samples[id_map[local_id]].extend(items)
+
+    # 순차 실행과 같게 트랙당 앞쪽 MAX_SAMPLES_PER_TRACK개만 유지
+    samples = {gid: sorted(items, key=lambda s: s[0])[:MAX_SAMPLES_PER_TRACK] for gid, items in samples.items()}
+    rows.sort(key=lambda r: r["sec"])
+    return rows, samples, id_maps, stitch_mode(chunk_results)
+
+
+def stitch_mode(chunk_results):
+    """'iou+embedding' if every overlap-window row carried a JDE embedding, 'iou' if none did, else 'mixed'."""
+    window_rows = sum(res.get("window_rows", 0) for res in chunk_results)
+    embedded_rows = sum(res.get("embedded_rows", 0) for res in chunk_results)
+    if window_rows and embedded_rows == window_rows:
+        return "iou+embedding"
+    return "mixed" if embedded_rows else "iou"
+
+
+def run_chunked(video_path, weights_path, start, end, workers=None, overlap=DEFAULT_OVERLAP_SEC,
+                batch_size=DEFAULT_BATCH_SIZE, tracker=DEFAULT_TRACKER, **stitch_kwargs):
+    """Track [start, end) with one process per chunk and return stitched (rows, samples, id_maps, mode)."""
+    workers = workers or os.cpu_count() or 1
+    chunks = split_chunks(start, end, workers, overlap)
+    # CUDA/torch는 fork 이후 초기화가 안전하지 않으므로 spawn 사용
+    with ProcessPoolExecutor(max_workers=len(chunks), mp_context=get_context("spawn")) as pool:
+        futures = [pool.submit(track_chunk, chunk, video_path, weights_path, batch_size, tracker, overlap)
+                   for chunk in chunks]
+        results = [f.result() for f in futures]
+    for res in results:
+        c = res["chunk"]
+        print(f"  청크 {c['index']}: {c['own_start']}~{c['own_end']}s (워밍업 {c['run_start']}s~), "
+              f"{len(res['rows'])}행, {res['elapsed']:.1f}초")
+        instrument.observe("chunk_ms", res["elapsed"] * 1000)
+    with instrument.timer("stitch_ms"):
+        stitched = stitch_chunks(results, **stitch_kwargs)
+    print(f"  이어붙이기 방식: {stitched[3]}")
+    return stitched
+
+
+def compare_tracking(reference_rows, candidate_rows, iou_threshold=0.5):
+    """Compare two tracking outputs (e.g. sequential vs chunked) and return a report dict.
+
+    Boxes are matched per second by IoU; ID consistency is measured on the matched
+    pairs as purity (each candidate id maps to one reference id) and completeness
+    (each reference id stays in one candidate id).
+    """
+    ref_by_sec = _rows_by_sec(reference_rows, -np.inf, np.inf)
+    cand_by_sec = _rows_by_sec(candidate_rows, -np.inf, np.inf)
+    pairs = Counter()
+    matched = 0
+    for sec in set(ref_by_sec) | set(cand_by_sec):
+        ref, cand = ref_by_sec.get(sec, []), cand_by_sec.get(sec, [])
+        if not ref or not cand:
+            continue
+        iou = box_iou([[r["x"], r["y"], r["w"], r["h"]] for r in ref],
+                      [[r["x"], r["y"], r["w"], r["h"]] for r in cand])
+        for r, c in greedy_match(iou, iou_threshold):
+            pairs[(ref[r]["track_id"], cand[c]["track_id"])] += 1
+            matched += 1
+
+    best_for_cand = defaultdict(int)
+    best_for_ref = defaultdict(int)
+    cand_ids_per_ref = Counter()
+    for (ref_id, cand_id), n in pairs.items():
+        best_for_cand[cand_id] = max(best_for_cand[cand_id], n)
+        best_for_ref[ref_id] = max(best_for_ref[ref_id], n)
+        cand_ids_per_ref[ref_id] += 1
+
+    n_ref, n_cand = len(reference_rows), len(candidate_rows)
+    return {
+        "reference_rows": n_ref,
+        "candidate_rows": n_cand,
+        "matched_boxes": matched,
+        "box_recall": matched / n_ref if n_ref else 1.0,
+        "box_precision": matched / n_cand if n_cand else 1.0,
+        "reference_tracks": len({r["track_id"] for r in reference_rows}),
+        "candidate_tracks": len({r["track_id"] for r in candidate_rows}),
+        "id_purity": sum(best_for_cand.values()) / matched if matched else 1.0,
+        "id_completeness": sum(best_for_ref.values()) / matched if matched else 1.0,
+        "split_reference_tracks": sum(1 for n in cand_ids_per_ref.values() if n > 1),
+    }
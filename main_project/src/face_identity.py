@@ -0,0 +1,195 @@
+"""얼굴 크롭 → 인물(identity) 매칭 엔진
+
+DeepFace.find 는 질의 이미지마다 ds_model_arcface_*.pkl 을 다시 읽고 갤러리를 선형
+탐색한다. 여기서는 갤러리 임베딩을 한 번만 읽어 정규화된 float32 행렬로 만들고, 질의
+크롭은 배치로 ArcFace 임베딩을 구한 뒤 행렬곱 한 번으로 모든 인물과의 코사인 거리를
+계산한다. 인물마다 임계값을 따로 줄 수 있고, 배우가 수천 명인 갤러리에서는 faiss
+근사 최근접 탐색(선택)을 쓴다.
+
+출력은 identity_check.csv 형식(image, identity, score=코사인 거리)이며, 임계값을 넘는
+결과를 "none" 으로 바꾼 identity_filtered.csv 형식도 함께 쓸 수 있다.
+
+사용법:
+    python face_identity.py <크롭 폴더> <갤러리 .pkl> <출력 csv> [--filtered 출력2.csv]
+        [--threshold 0.68] [--thresholds ming=0.6,xiao=0.65] [--batch-size 64] [--ann]
+"""
+import argparse
+import os
+import pickle
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+import instrument
+
+try:
+    import faiss
+except ImportError:
+    faiss = None
+
+ARCFACE_COSINE_THRESHOLD = 0.68  # DeepFace 의 ArcFace/cosine 기본 임계값
+IMAGE_EXTS = (".jpg", ".jpeg", ".png")
+
+
+def l2_normalize(x):
+    x = np.ascontiguousarray(x, dtype=np.float32)
+    return x / np.maximum(np.linalg.norm(x, axis=1, keepdims=True), 1e-12)
+
+
+def load_gallery(pkl_path):
+    """Read a DeepFace representations pickle; returns (embeddings (n, d) float32, identity names, paths)."""
+    with open(pkl_path, "rb") as f:
+        representations = pickle.load(f)
+    if not representations:
+        raise ValueError(f"갤러리에 임베딩이 없습니다 (DeepFace 가 얼굴을 하나도 찾지 못한 .pkl): {pkl_path}")
+    paths = [rep["identity"] for rep in representations]
+    # 갤러리 폴더 구조: <db>/<인물>/<이미지>
+    names = [os.path.basename(os.path.dirname(path)) for path in paths]
+    embeddings = np.asarray([rep["embedding"] for rep in representations], dtype=np.float32)
+    return embeddings, names, paths
+
+
+def parse_thresholds(text):
+    """'ming=0.6,xiao=0.65' -> {'ming': 0.6, 'xiao': 0.65}"""
+    thresholds = {}
+    for item in filter(None, (text or "").split(",")):
+        name, value = item.split("=")
+        thresholds[name.strip()] = float(value)
+    return thresholds
+
+
+class IdentityIndex:
+    """Normalized gallery matrix with per-identity thresholds; exact matmul or optional faiss search."""
+
+    def __init__(self, embeddings, names, thresholds=None, default_threshold=ARCFACE_COSINE_THRESHOLD,
+                 ann=False, ann_k=32):
+        self.names, codes = np.unique(np.asarray(names), return_inverse=True)
+        # 인물 코드 순으로 정렬해 두면 인물별 최대 유사도를 reduceat 한 번으로 구할 수 있다
+        order = np.argsort(codes, kind="stable")
+        self.codes = codes[order]
+        self.matrix = l2_normalize(np.asarray(embeddings)[order])
+        self.starts = np.flatnonzero(np.r_[True, self.codes[1:] != self.codes[:-1]])
+        thresholds = thresholds or {}
+        self.thresholds = np.asarray([thresholds.get(name, default_threshold) for name in self.names],
+                                     dtype=np.float32)
+        self.index = None
+        self.ann_k = ann_k
+        if ann:
+            if faiss is None:
+                raise ImportError("--ann 에는 faiss 가 필요합니다 (pip install faiss-cpu)")
+            self.index = faiss.IndexHNSWFlat(self.matrix.shape[1], 32, faiss.METRIC_INNER_PRODUCT)
+            self.index.add(self.matrix)
+
+    def _identity_similarity(self, queries):
+        """(m, n_identities) best cosine similarity per identity."""
+        if self.index is None:
+            sims = queries @ self.matrix.T
+            return np.maximum.reduceat(sims, self.starts, axis=1)
+        k = min(self.ann_k, len(self.matrix))
+        sims, idx = self.index.search(queries, k)
+        per_id = np.full((len(queries), len(self.names)), -1.0, dtype=np.float32)
+        valid = idx >= 0
+        rows = np.repeat(np.arange(len(queries)), k).reshape(-1, k)
+        np.maximum.at(per_id, (rows[valid], self.codes[idx[valid]]), sims[valid])
+        return per_id
+
+    def search(self, queries, chunk=4096):
+        """Nearest identity per query embedding.
+
+        Returns (identity names, cosine distances, accepted mask) where
+        accepted means distance <= that identity's threshold.
+        """
+        queries = l2_normalize(queries)
+        best = np.empty(len(queries), dtype=np.int64)
+        dist = np.empty(len(queries), dtype=np.float32)
+        for start in range(0, len(queries), chunk):
+            per_id = self._identity_similarity(queries[start:start + chunk])
+            top = per_id.argmax(axis=1)
+            best[start:start + chunk] = top
+            dist[start:start + chunk] = 1.0 - per_id[np.arange(len(top)), top]
+        return self.names[best], dist, dist <= self.thresholds[best]
+
+
+class ArcFaceEmbedder:
+    """Batched DeepFace ArcFace embeddings for already-cropped faces (detector 'skip')."""
+
+    def __init__(self, model_name="ArcFace", batch_size=64):
+        from deepface import DeepFace
+        from deepface.modules import preprocessing
+
+        self.model = DeepFace.build_model(model_name)
+        self.preprocessing = preprocessing
+        self.batch_size = batch_size
+        self.target_size = self.model.input_shape  # (h, w)
+
+    def _prepare(self, img):
+        # DeepFace.represent 와 같은 전처리: 비율 유지 패딩 + 리사이즈 + /255 (BGR 유지)
+        img = self.preprocessing.resize_image(img, (self.target_size[1], self.target_size[0]))
+        return self.preprocessing.normalize_input(img, normalization="base")[0]
+
+    @instrument.timed("embed_ms")
+    def embed(self, images):
+        """Embed a list of BGR face crops; returns an (n, d) float32 array."""
+        out = []
+        for start in range(0, len(images), self.batch_size):
+            batch = np.stack([self._prepare(img) for img in images[start:start + self.batch_size]])
+            out.append(np.asarray(self.model.model.predict(batch, verbose=0), dtype=np.float32))
+        return np.concatenate(out) if out else np.empty((0, 512), dtype=np.float32)
+
+
+def _read_images(paths, workers=4):
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(cv2.imread, paths))
+
+
+def identify_folder(folder, pkl_path, out_csv, filtered_csv=None, thresholds=None,
+                    default_threshold=ARCFACE_COSINE_THRESHOLD, batch_size=64, ann=False, embedder=None):
+    """Match every crop in folder against the gallery and write identity_check-style CSV(s)."""
+    import pandas as pd
+
+    embeddings, names, _ = load_gallery(pkl_path)
+    index = IdentityIndex(embeddings, names, thresholds=thresholds,
+                          default_threshold=default_threshold, ann=ann)
+    embedder = embedder or ArcFaceEmbedder(batch_size=batch_size)
+
+    files = sorted(f for f in os.listdir(folder) if f.lower().endswith(IMAGE_EXTS))
+    identity = np.full(len(files), "none", dtype=object)
+    score = np.full(len(files), np.nan, dtype=np.float32)
+    accepted = np.zeros(len(files), dtype=bool)
+    # 읽기(스레드)와 임베딩(배치)을 배치 단위로 번갈아 수행해 메모리를 제한한다
+    for start in range(0, len(files), batch_size):
+        images = _read_images([os.path.join(folder, f) for f in files[start:start + batch_size]])
+        ok = [i for i, img in enumerate(images) if img is not None]
+        if not ok:
+            continue
+        rows = start + np.asarray(ok)
+        names_, dist, acc = index.search(embedder.embed([images[i] for i in ok]))
+        identity[rows], score[rows], accepted[rows] = names_, dist, acc
+
+    df = pd.DataFrame({"image": files, "identity": identity, "score": score})
+    df.to_csv(out_csv, index=False)
+    if filtered_csv:
+        df.assign(identity=np.where(accepted, identity, "none")).to_csv(filtered_csv, index=False)
+    print(f"{len(files)}개 크롭 매칭 완료 (임계값 통과 {int(accepted.sum())}개) → {out_csv}")
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ArcFace 임베딩 배치 매칭으로 얼굴 크롭의 인물 판별")
+    parser.add_argument("folder")
+    parser.add_argument("pkl_path", help="DeepFace 갤러리 ds_model_arcface_*.pkl")
+    parser.add_argument("out_csv")
+    parser.add_argument("--filtered", default=None, help="임계값을 넘으면 none 으로 기록한 CSV")
+    parser.add_argument("--threshold", type=float, default=ARCFACE_COSINE_THRESHOLD)
+    parser.add_argument("--thresholds", default="", help="인물별 임계값, 예: ming=0.6,xiao=0.65")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--ann", action="store_true", help="faiss HNSW 근사 탐색 (큰 갤러리용)")
+    args = parser.parse_args()
+    identify_folder(args.folder, args.pkl_path, args.out_csv, filtered_csv=args.filtered,
+                    thresholds=parse_thresholds(args.thresholds), default_threshold=args.threshold,
+                    batch_size=args.batch_size, ann=args.ann)
+
+
+if __name__ == "__main__":
+    main()
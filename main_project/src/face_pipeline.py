@@ -0,0 +1,264 @@
+"""얼굴 검출 → 정렬 → 인물 → 감정을 한 번의 검출로 처리하는 통합 파이프라인
+
+기존에는 RetinaFace 로 faces_from_retina/ 크롭을 저장하고, DeepFace 로 인물을 찾고,
+감정 분석에서 DeepFace.analyze(detector_backend='retinaface') 가 얼굴을 다시 검출했다.
+여기서는 후보 이미지마다 RetinaFace 검출+정렬을 한 번만 하고, 정렬된 얼굴을 메모리에
+둔 채 ArcFace 임베딩과 감정 모델에 배치로 넣어 emotion_tag_labeled.csv 형식의 표
+하나로 기록한다. 크롭 JPEG 는 확인용으로만 선택적으로 저장한다.
+
+사용법:
+    python face_pipeline.py <후보 이미지 폴더> <갤러리 .pkl> <출력 csv> [--save-crops 폴더]
+        [--batch-size 32] [--threshold 0.68] [--thresholds ming=0.6]
+
+영상 + 추적 CSV 가 있으면 run_video()/face_roi.py 로 인물 박스 윗부분에서만 검출한다 (track_id 포함).
+"""
+import argparse
+import os
+from collections import defaultdict
+
+import cv2
+import numpy as np
+
+import instrument
+from face_identity import (ARCFACE_COSINE_THRESHOLD, IMAGE_EXTS, ArcFaceEmbedder, IdentityIndex,
+                           load_gallery, parse_thresholds)
+from pipeline import CsvRowWriter, WriterPool, background_iter, encode_jpg, write_bytes
+from track_samples import sample_name
+
+EMOTION_LABELS = ["angry", "disgust", "fear", "happy", "sad", "surprise", "neutral"]
+FIELDS = ["image", "identity", "score", "emotion", "emotion_score", "nearest_identity",
+          "source_image", "face_index", "x", "y", "w", "h", "det_confidence"] + EMOTION_LABELS
+ROI_FIELDS = ["time_sec", "track_id"] + FIELDS
+
+
+@instrument.timed("face_detect_ms")
+def extract_aligned_faces(img, detector_backend="retinaface", min_confidence=0.5):
+    """Detect and align faces once; returns [(aligned BGR uint8 face, facial_area, confidence)]."""
+    from deepface import DeepFace
+
+    try:
+        faces = DeepFace.extract_faces(img_path=img, detector_backend=detector_backend, align=True,
+                                       enforce_detection=False, color_face="bgr", normalize_face=False)
+        to_bgr = False
+    except TypeError:
+        # color_face 인자가 없는 이전 버전: RGB [0, 1] 로 돌려준다
+        faces = DeepFace.extract_faces(img_path=img, detector_backend=detector_backend, align=True,
+                                       enforce_detection=False)
+        to_bgr = True
+    out = []
+    for face in faces:
+        # enforce_detection=False 에서 얼굴이 없으면 이미지 전체가 confidence 0 으로 돌아온다
+        if face.get("confidence", 0) < min_confidence:
+            continue
+        aligned = face["face"]
+        if to_bgr:
+            aligned = aligned[:, :, ::-1] * 255
+        out.append((np.ascontiguousarray(aligned).clip(0, 255).astype(np.uint8),
+                    face["facial_area"], float(face["confidence"])))
+    return out
+
+
+class EmotionClassifier:
+    """Batched DeepFace emotion head on aligned BGR faces (48x48 grayscale input)."""
+
+    def __init__(self, batch_size=64):
+        from deepface import DeepFace
+
+        try:
+            self.model = DeepFace.build_model("Emotion", task="facial_attribute")
+        except TypeError:
+            self.model = DeepFace.build_model("Emotion")
+        self.batch_size = batch_size
+
+    @staticmethod
+    def _prepare(face):
+        gray = cv2.cvtColor(face, cv2.COLOR_BGR2GRAY)
+        return cv2.resize(gray, (48, 48)).astype(np.float32)[:, :, None] / 255.0
+
+    @instrument.timed("emotion_ms")
+    def predict(self, faces):
+        """Return an (n, 7) array of emotion percentages in EMOTION_LABELS order."""
+        out = []
+        for start in range(0, len(faces), self.batch_size):
+            batch = np.stack([self._prepare(face) for face in faces[start:start + self.batch_size]])
+            probs = np.asarray(self.model.model.predict(batch, verbose=0), dtype=np.float32)
+            out.append(100.0 * probs / probs.sum(axis=1, keepdims=True))
+        return np.concatenate(out) if out else np.empty((0, len(EMOTION_LABELS)), dtype=np.float32)
+
+
+class FacePipeline:
+    """One detection per image; identity and emotion computed on the same aligned faces in batches."""
+
+    def __init__(self, pkl_path, thresholds=None, default_threshold=ARCFACE_COSINE_THRESHOLD,
+                 batch_size=32, detector_backend="retinaface", min_confidence=0.5, ann=False,
+                 embedder=None, emotion=None):
+        embeddings, names, _ = load_gallery(pkl_path)
+        self.index = IdentityIndex(embeddings, names, thresholds=thresholds,
+                                   default_threshold=default_threshold, ann=ann)
+        self.embedder = embedder or ArcFaceEmbedder(batch_size=batch_size)
+        self.emotion = emotion or EmotionClassifier(batch_size=batch_size)
+        self.batch_size = batch_size
+        self.detector_backend = detector_backend
+        self.min_confidence = min_confidence
+        self.stats = {"images": 0, "faces": 0, "no_face": 0}
+
+    def _flush(self, pending):
+        faces = [face for face, _ in pending]
+        nearest, dist, accepted = self.index.search(self.embedder.embed(faces))
+        emotions = self.emotion.predict(faces)
+        rows = []
+        for (_, row), name, d, ok, probs in zip(pending, nearest, dist, accepted, emotions):
+            top = int(np.argmax(probs))
+            row.update({
+                "identity": name if ok else "none",
+                "score": float(d),
+                "emotion": EMOTION_LABELS[top],
+                "emotion_score": float(probs[top]),
+                "nearest_identity": name,
+                **{label: float(p) for label, p in zip(EMOTION_LABELS, probs)},
+            })
+            rows.append(row)
+        return rows
+
+    def iter_rows(self, items, crop_writer=None):
+        """items: iterable of (image name, BGR image). Yields joined rows per face, batch by batch."""
+        pending = []
+        for name, img in items:
+            self.stats["images"] += 1
+            if img is None:
+                self.stats["no_face"] += 1
+                continue
+            faces = extract_aligned_faces(img, self.detector_backend, self.min_confidence)
+            if not faces:
+                self.stats["no_face"] += 1
+            stem = os.path.splitext(name)[0]
+            for i, (face, area, conf) in enumerate(faces):
+                crop_name = f"{stem}_face{i}.jpg"  # faces_from_retina 와 같은 이름
+                if crop_writer is not None:
+                    crop_writer(crop_name, face)
+                pending.append((face, {
+                    "image": crop_name, "source_image": name, "face_index": i,
+                    "x": area.get("x"), "y": area.get("y"), "w": area.get("w"), "h": area.get("h"),
+                    "det_confidence": conf,
+                }))
+                self.stats["faces"] += 1
+            if len(pending) >= self.batch_size:
+                yield from self._flush(pending)
+                pending = []
+        if pending:
+            yield from self._flush(pending)
+
+    def iter_roi_rows(self, tracked_frames, roi_detector, source_name="", crop_writer=None):
+        """tracked_frames: iterable of (time, frame, boxes, track_ids). Yields rows with time_sec and track_id."""
+        samples = defaultdict(int)
+        pending = []
+        for t, frame, boxes, track_ids in tracked_frames:
+            self.stats["images"] += 1
+            faces = roi_detector.detect(frame, boxes, track_ids)
+            if not faces:
+                self.stats["no_face"] += 1
+            for i, f in enumerate(faces):
+                samples[f["track_id"]] += 1
+                # track_faces.py 가 그대로 묶을 수 있는 이름: track_{id}_sample_{k}_sec_{s}_face0.jpg
+                stem = os.path.splitext(sample_name(f["track_id"], samples[f["track_id"]], t))[0]
+                crop_name = f"{stem}_face0.jpg"
+                if crop_writer is not None:
+                    crop_writer(crop_name, f["face"])
+                pending.append((f["face"], {
+                    "time_sec": round(float(t), 3), "track_id": f["track_id"],
+                    "image": crop_name, "source_image": source_name, "face_index": i,
+                    "x": f["x"], "y": f["y"], "w": f["w"], "h": f["h"], "det_confidence": f["confidence"],
+                }))
+                self.stats["faces"] += 1
+            if len(pending) >= self.batch_size:
+                yield from self._flush(pending)
+                pending = []
+        if pending:
+            yield from self._flush(pending)
+
+
+def _save_crop(path, face):
+    write_bytes(path, encode_jpg(face))
+
+
+def _write_rows(out_csv, fields, save_crops, make_rows):
+    """Stream make_rows(crop_writer) into out_csv, optionally saving the aligned face crops."""
+    writer = CsvRowWriter(out_csv, fields)
+    crops = None
+    if save_crops:
+        os.makedirs(save_crops, exist_ok=True)
+        crops = WriterPool(max_workers=2, name="crop-writer")
+    try:
+        crop_writer = None
+        if crops is not None:
+            crop_writer = lambda name, face: crops.submit(_save_crop, os.path.join(save_crops, name), face)
+        batch = []
+        for row in make_rows(crop_writer):
+            batch.append(row)
+            if len(batch) >= 256:
+                writer.write_rows(batch)
+                batch = []
+        writer.write_rows(batch)
+    finally:
+        writer.close()
+        if crops is not None:
+            crops.close()
+
+
+def run_folder(folder, pkl_path, out_csv, save_crops=None, **kwargs):
+    """Run the unified pipeline on every image of a folder and write one joined CSV.
+
+    Reads the images from disk; with the video and tracking CSV, run_video reads
+    frames through iter_frames (and the frame cache) instead.
+    """
+    files = sorted(f for f in os.listdir(folder) if f.lower().endswith(IMAGE_EXTS))
+    pipeline = FacePipeline(pkl_path, **kwargs)
+    # 이미지 읽기는 백그라운드 스레드에서 미리 진행
+    items = background_iter(((f, cv2.imread(os.path.join(folder, f))) for f in files), maxsize=8)
+    _write_rows(out_csv, FIELDS, save_crops, lambda crop_writer: pipeline.iter_rows(items, crop_writer))
+    s = pipeline.stats
+    print(f"이미지 {s['images']}개, 얼굴 {s['faces']}개 (얼굴 없음 {s['no_face']}개) → {out_csv}")
+    return s
+
+
+def run_video(video_path, tracking_csv, pkl_path, out_csv, save_crops=None, start=None, end=None,
+              top_fraction=None, max_side=None, **kwargs):
+    """Detect faces only inside the tracked person boxes of a video and write one joined CSV with track_id."""
+    from face_roi import (MAX_SIDE, TOP_FRACTION, RoiFaceDetector, haar_detector, iter_tracked_frames,
+                          retinaface_detector)
+
+    pipeline = FacePipeline(pkl_path, **kwargs)
+    if pipeline.detector_backend == "haar":
+        detect = haar_detector()
+    else:
+        detect = retinaface_detector(pipeline.detector_backend, pipeline.min_confidence)
+    roi_detector = RoiFaceDetector(detect, top_fraction=top_fraction or TOP_FRACTION,
+                                   max_side=max_side or MAX_SIDE)
+    frames = background_iter(iter_tracked_frames(video_path, tracking_csv, start, end), maxsize=8)
+    source = os.path.basename(video_path)
+    _write_rows(out_csv, ROI_FIELDS, save_crops,
+                lambda crop_writer: pipeline.iter_roi_rows(frames, roi_detector, source, crop_writer))
+    s, r = pipeline.stats, roi_detector.stats
+    print(f"프레임 {s['images']}개, ROI {r['rois']}개, 얼굴 {s['faces']}개 (얼굴 없음 {s['no_face']}개) → {out_csv}")
+    print(f"검출기 입력 픽셀: 프레임 전체의 {roi_detector.pixel_ratio() * 100:.1f}%")
+    return s
+
+
+def main():
+    parser = argparse.ArgumentParser(description="검출 1회로 인물+감정을 함께 구하는 얼굴 파이프라인")
+    parser.add_argument("folder", help="후보 이미지 폴더 (track_*_sample_*_sec_*.jpg)")
+    parser.add_argument("pkl_path", help="DeepFace 갤러리 ds_model_arcface_*.pkl")
+    parser.add_argument("out_csv")
+    parser.add_argument("--save-crops", default=None, help="정렬된 얼굴 크롭을 확인용으로 저장할 폴더")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--threshold", type=float, default=ARCFACE_COSINE_THRESHOLD)
+    parser.add_argument("--thresholds", default="", help="인물별 임계값, 예: ming=0.6,xiao=0.65")
+    parser.add_argument("--detector", default="retinaface")
+    args = parser.parse_args()
+    run_folder(args.folder, args.pkl_path, args.out_csv, save_crops=args.save_crops,
+               thresholds=parse_thresholds(args.thresholds), default_threshold=args.threshold,
+               batch_size=args.batch_size, detector_backend=args.detector)
+
+
+if __name__ == "__main__":
+    main()
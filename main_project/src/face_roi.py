@@ -0,0 +1,257 @@
+"""추적 박스 안에서만 얼굴을 찾는 ROI 검출
+
+추적 CSV(all_tracking_results.csv / brighter_bbx_tracking.csv)에는 이미 초마다 인물 박스
+x, y, w, h 가 있으므로 얼굴 검출기를 프레임 전체에 돌릴 필요가 없다. 여기서는
+- 인물 박스의 윗부분(머리가 있을 자리, 좌우/위로 약간 여유)만 ROI 로 잘라
+- 너무 큰 ROI 는 max_side 로 줄이고,
+- 한 프레임의 ROI 들을 모자이크 한 장에 선반(shelf) 방식으로 붙여 검출기를 프레임당 한 번 돌린 뒤
+- 얼굴 박스를 원래 프레임 좌표로 되돌리고 그 ROI 의 track_id 를 붙인다.
+얼굴과 track 을 따로 매칭할 필요가 없고, 검출기가 보는 픽셀은 프레임 전체의 일부가 된다.
+
+사람 박스의 가로세로 비가 작으면(상반신/클로즈업) 얼굴이 박스 아래쪽까지 내려오므로
+ROI 높이를 늘린다.
+
+사용법:
+    python face_roi.py <영상> <추적 csv> <갤러리 .pkl> <출력 csv> [--save-crops 폴더]
+        [--start 초] [--end 초] [--top-fraction 0.45] [--max-side 320] [--detector retinaface]
+"""
+import argparse
+import math
+
+import cv2
+import numpy as np
+
+import instrument
+from frame_source import iter_frames
+
+TOP_FRACTION = 0.45      # 전신 박스에서 ROI 로 쓸 윗부분 비율
+CLOSEUP_FRACTION = 0.8   # 상반신/클로즈업 박스(높이/너비 < CLOSEUP_ASPECT)에서의 비율
+CLOSEUP_ASPECT = 1.5
+SIDE_PAD = 0.1           # 좌우 여유 (박스 너비 대비)
+TOP_PAD = 0.05           # 위쪽 여유 (박스 높이 대비)
+MIN_SIDE = 24            # 이보다 작은 ROI 는 얼굴을 찾아도 쓸 수 없으므로 건너뛴다
+MAX_SIDE = 320           # ROI 긴 변이 이보다 크면 줄여서 검출 (얼굴이 ArcFace 입력 112px 정도로 남는 크기)
+MOSAIC_GAP = 8           # 모자이크에서 ROI 사이 간격(px)
+BOX_COLUMNS = (("x", "y", "w", "h"), ("x_center", "y_center", "width", "height"))
+
+
+def person_rois(boxes, frame_shape, top_fraction=TOP_FRACTION, side_pad=SIDE_PAD, top_pad=TOP_PAD,
+                min_side=MIN_SIDE):
+    """Head regions of center-format (x, y, w, h) person boxes as int (x0, y0, x1, y1), plus a keep mask."""
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    height, width = frame_shape[:2]
+    x, y, w, h = boxes.T
+    fraction = np.where(h < CLOSEUP_ASPECT * w, CLOSEUP_FRACTION, top_fraction)
+    top = y - h / 2
+    rois = np.stack([x - w / 2 - side_pad * w, top - top_pad * h,
+                     x + w / 2 + side_pad * w, top + fraction * h], axis=1)
+    rois = np.round(rois).astype(np.int64)
+    rois[:, [0, 2]] = rois[:, [0, 2]].clip(0, width)
+    rois[:, [1, 3]] = rois[:, [1, 3]].clip(0, height)
+    keep = ((rois[:, 2] - rois[:, 0]) >= min_side) & ((rois[:, 3] - rois[:, 1]) >= min_side)
+    return rois, keep
+
+
+def pack_mosaic(frame, rois, max_side=MAX_SIDE, gap=MOSAIC_GAP):
+    """Paste the ROIs into one canvas (shelf packing, tallest first).
+
+    Returns (mosaic, tiles) where tiles[i] = (mx, my, tw, th, scale) places ROI i at
+    (mx, my) with size (tw, th), scaled by `scale` from frame pixels.
+    """
+    sizes = []
+    for x0, y0, x1, y1 in rois:
+        scale = min(1.0, max_side / max(x1 - x0, y1 - y0))
+        sizes.append((max(1, int(round((x1 - x0) * scale))), max(1, int(round((y1 - y0) * scale))), scale))
+    order = sorted(range(len(rois)), key=lambda i: -sizes[i][1])
+    area = sum((tw + gap) * (th + gap) for tw, th, _ in sizes)
+    widest = max(tw for tw, _, _ in sizes)
+    # 선반 너비 후보 몇 개 중 빈 공간이 가장 적은(캔버스 넓이가 가장 작은) 배치를 쓴다
+    best = None
+    for shelf_width in {widest, sum(tw + gap for tw, _, _ in sizes) - gap,
+                        *(max(widest, int(math.sqrt(area) * f)) for f in (1.0, 1.25, 1.5, 2.0))}:
+        tiles = np.zeros((len(rois), 5), dtype=np.float64)
+        cx = cy = shelf_height = used_width = 0
+        for i in order:
+            tw, th, scale = sizes[i]
+            if cx and cx + tw > shelf_width:
+                cx, cy, shelf_height = 0, cy + shelf_height + gap, 0
+            tiles[i] = (cx, cy, tw, th, scale)
+            cx += tw + gap
+            used_width = max(used_width, cx - gap)
+            shelf_height = max(shelf_height, th)
+        shape = (cy + shelf_height, used_width)
+        if best is None or shape[0] * shape[1] < best[0][0] * best[0][1]:
+            best = (shape, tiles)
+    shape, tiles = best
+
+    mosaic = np.zeros(shape + frame.shape[2:], dtype=frame.dtype)
+    for (x0, y0, x1, y1), (mx, my, tw, th, scale) in zip(rois, tiles.astype(np.int64)):
+        roi = frame[y0:y1, x0:x1]
+        if roi.shape[1] != tw or roi.shape[0] != th:
+            roi = cv2.resize(roi, (tw, th), interpolation=cv2.INTER_AREA)
+        mosaic[my:my + th, mx:mx + tw] = roi
+    return mosaic, tiles
+
+
+def to_frame_boxes(areas, rois, tiles):
+    """Map mosaic (x, y, w, h) boxes back to frame coordinates.
+
+    Returns (tile index per box, frame boxes); a box whose center falls in a gap gets index -1.
+    """
+    areas = np.asarray(areas, dtype=np.float64).reshape(-1, 4)
+    cx = areas[:, 0] + areas[:, 2] / 2
+    cy = areas[:, 1] + areas[:, 3] / 2
+    mx, my, tw, th, scale = tiles.T
+    inside = ((cx[:, None] >= mx) & (cx[:, None] < mx + tw) & (cy[:, None] >= my) & (cy[:, None] < my + th))
+    owner = np.where(inside.any(axis=1), inside.argmax(axis=1), -1)
+    out = np.zeros_like(areas)
+    ok = owner >= 0
+    t = owner[ok]
+    # 타일 밖으로 나간 부분은 잘라서 (이웃 ROI 픽셀이 섞이지 않게) 프레임 좌표로
+    x0 = np.clip(areas[ok, 0], mx[t], mx[t] + tw[t])
+    y0 = np.clip(areas[ok, 1], my[t], my[t] + th[t])
+    x1 = np.clip(areas[ok, 0] + areas[ok, 2], mx[t], mx[t] + tw[t])
+    y1 = np.clip(areas[ok, 1] + areas[ok, 3], my[t], my[t] + th[t])
+    out[ok, 0] = rois[t, 0] + (x0 - mx[t]) / scale[t]
+    out[ok, 1] = rois[t, 1] + (y0 - my[t]) / scale[t]
+    out[ok, 2] = (x1 - x0) / scale[t]
+    out[ok, 3] = (y1 - y0) / scale[t]
+    return owner, out
+
+
+def retinaface_detector(detector_backend="retinaface", min_confidence=0.5):
+    """Detector callable for RoiFaceDetector: image -> [(aligned face, (x, y, w, h), confidence)]."""
+    from face_pipeline import extract_aligned_faces
+
+    def detect(img):
+        faces = extract_aligned_faces(img, detector_backend, min_confidence)
+        return [(face, (a.get("x"), a.get("y"), a.get("w"), a.get("h")), conf) for face, a, conf in faces]
+    return detect
+
+
+def haar_detector(scale_factor=1.1, min_neighbors=5, min_size=(30, 30)):
+    """OpenCV Haar cascade detector callable (no alignment; the face is the plain crop)."""
+    cascade = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
+
+    @instrument.timed("face_detect_ms")
+    def detect(img):
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+        found = cascade.detectMultiScale(gray, scaleFactor=scale_factor, minNeighbors=min_neighbors,
+                                         minSize=min_size)
+        return [(img[y:y + h, x:x + w], (x, y, w, h), 1.0) for x, y, w, h in found]
+    return detect
+
+
+class RoiFaceDetector:
+    """Run a face detector once per frame on a mosaic of the tracked persons' head regions."""
+
+    def __init__(self, detect, top_fraction=TOP_FRACTION, max_side=MAX_SIDE, min_side=MIN_SIDE,
+                 one_per_track=True):
+        self.detect_fn = detect
+        self.top_fraction = top_fraction
+        self.max_side = max_side
+        self.min_side = min_side
+        self.one_per_track = one_per_track
+        self.stats = {"frames": 0, "rois": 0, "faces": 0, "frame_pixels": 0, "detector_pixels": 0}
+
+    def detect(self, frame, boxes, track_ids):
+        """[{'track_id', 'x', 'y', 'w', 'h', 'confidence', 'face'}] for one frame, boxes in frame pixels."""
+        self.stats["frames"] += 1
+        self.stats["frame_pixels"] += frame.shape[0] * frame.shape[1]
+        rois, keep = person_rois(boxes, frame.shape, self.top_fraction, min_side=self.min_side)
+        rois, track_ids = rois[keep], np.asarray(track_ids)[keep]
+        if not len(rois):
+            return []
+        mosaic, tiles = pack_mosaic(frame, rois, self.max_side)
+        self.stats["rois"] += len(rois)
+        self.stats["detector_pixels"] += mosaic.shape[0] * mosaic.shape[1]
+        instrument.count("face_rois", len(rois))
+
+        found = self.detect_fn(mosaic)
+        if not found:
+            return []
+        owner, frame_boxes = to_frame_boxes([area for _, area, _ in found], rois, tiles)
+        faces = []
+        for (face, _, conf), tile, box in zip(found, owner, frame_boxes):
+            if tile < 0:
+                continue
+            faces.append({"track_id": int(track_ids[tile]), "x": int(round(box[0])), "y": int(round(box[1])),
+                          "w": int(round(box[2])), "h": int(round(box[3])), "confidence": float(conf),
+                          "face": face, "_tile": int(tile)})
+        if self.one_per_track:
+            # ROI 에 옆 사람 얼굴이 걸칠 수 있으므로 박스 가운데에 가장 가까운 얼굴 하나만 남긴다
+            best = {}
+            for f in faces:
+                x0, _, x1, _ = rois[f["_tile"]]
+                offset = abs(f["x"] + f["w"] / 2 - (x0 + x1) / 2)
+                if f["_tile"] not in best or offset < best[f["_tile"]][0]:
+                    best[f["_tile"]] = (offset, f)
+            faces = [f for _, f in sorted(best.values(), key=lambda item: item[1]["_tile"])]
+        for f in faces:
+            del f["_tile"]
+        self.stats["faces"] += len(faces)
+        return faces
+
+    def pixel_ratio(self):
+        """Detector pixels / full-frame pixels so far."""
+        return self.stats["detector_pixels"] / self.stats["frame_pixels"] if self.stats["frame_pixels"] else 0.0
+
+
+def read_tracking(tracking_csv, start=None, end=None):
+    """Tracking CSV as {time: (boxes (n, 4) center xywh, track_ids)} for either column layout."""
+    import pandas as pd
+
+    from master_table import time_column
+
+    header = pd.read_csv(tracking_csv, nrows=0).columns
+    time_col = time_column(header)
+    box_cols = next((list(cols) for cols in BOX_COLUMNS if set(cols) <= set(header)), None)
+    if box_cols is None:
+        raise KeyError(f"박스 열이 없습니다 (후보: {BOX_COLUMNS})")
+    df = pd.read_csv(tracking_csv, usecols=[time_col, "track_id"] + box_cols)
+    if start is not None:
+        df = df[df[time_col] >= start]
+    if end is not None:
+        df = df[df[time_col] < end]
+    out = {}
+    for t, group in df.groupby(time_col, sort=True):
+        out[float(t)] = (group[box_cols].to_numpy(np.float64), group["track_id"].to_numpy(np.int64))
+    return out
+
+
+def iter_tracked_frames(video_path, tracking_csv, start=None, end=None):
+    """Yield (time, frame, boxes, track_ids) for every tracked time, decoding in one forward pass."""
+    tracks = read_tracking(tracking_csv, start, end)
+    for t, _, frame in iter_frames(video_path, list(tracks)):
+        boxes, track_ids = tracks[float(t)]
+        yield t, frame, boxes, track_ids
+
+
+def main():
+    from face_identity import ARCFACE_COSINE_THRESHOLD, parse_thresholds
+    from face_pipeline import run_video
+
+    parser = argparse.ArgumentParser(description="추적 박스 윗부분에서만 얼굴 검출 → 인물+감정")
+    parser.add_argument("video_path")
+    parser.add_argument("tracking_csv", help="추적 결과 csv (sec/time_sec, track_id, x/y/w/h 또는 x_center...)")
+    parser.add_argument("pkl_path", help="DeepFace 갤러리 ds_model_arcface_*.pkl")
+    parser.add_argument("out_csv")
+    parser.add_argument("--save-crops", default=None, help="정렬된 얼굴 크롭 폴더 (track_faces.py 입력 이름)")
+    parser.add_argument("--start", type=float, default=None)
+    parser.add_argument("--end", type=float, default=None)
+    parser.add_argument("--top-fraction", type=float, default=TOP_FRACTION)
+    parser.add_argument("--max-side", type=int, default=MAX_SIDE)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--threshold", type=float, default=ARCFACE_COSINE_THRESHOLD)
+    parser.add_argument("--thresholds", default="", help="인물별 임계값, 예: ming=0.6,xiao=0.65")
+    parser.add_argument("--detector", default="retinaface", help="DeepFace 검출기 이름 또는 haar")
+    args = parser.parse_args()
+    instrument.start_run("face_roi")
+    run_video(args.video_path, args.tracking_csv, args.pkl_path, args.out_csv, save_crops=args.save_crops,
+              start=args.start, end=args.end, top_fraction=args.top_fraction, max_side=args.max_side,
+              thresholds=parse_thresholds(args.thresholds), default_threshold=args.threshold,
+              batch_size=args.batch_size, detector_backend=args.detector)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,420 @@
+"""디코딩 한 번으로 공유하는 프레임 캐시 (memory-map 청크 저장소)
+
+추적(YOLO), 프레임 추출, 리딩 라인, 얼굴/감정 단계가 같은 영화를 각자 디코딩하거나 JPEG 로
+저장했다가 다시 읽는 대신, 샘플링한 시각의 프레임을 한 번만 디코딩해 uint8 배열 그대로
+청크 파일(.npy, 청크당 chunk_frames 장)에 쌓아 두고 모두 거기서 읽는다.
+
+- 저장 위치: <root>/<영상 sha256 앞 16자>/<tier>/chunk_00000.npy + index.json
+  tier 는 원본 해상도(full)와 너비를 줄인 w640 같은 축소본. 축소 tier 는 full 에 이미 있는
+  프레임이면 디코딩 없이 줄여서 만든다.
+- 읽기: np.load(mmap_mode="r") 로 연 청크의 한 장을 그대로 돌려준다 (복사 없음, 읽기 전용).
+  여러 프로세스가 같은 청크를 열면 OS 페이지 캐시를 함께 쓴다.
+- 쓰기: 프로세스마다 자기 청크 번호를 받아 채우고, index.json 갱신만 잠금(fcntl)으로 묶는다.
+  그래서 chunked_tracking 처럼 같은 영상을 여러 프로세스가 동시에 채워도 된다.
+- 무효화: 영상 내용의 sha256 이 키이므로 영상이 바뀌면 새 폴더를 쓰고, 같은 경로의 이전
+  해시 폴더는 지운다. 해시는 영상 크기/수정 시각이 같으면 hashes.json 의 값을 다시 쓴다.
+- 정리: 청크 파일의 수정 시각을 마지막 사용 시각으로 삼아(열 때 갱신) 전체 크기가 예산을
+  넘으면 가장 오래 안 쓴 청크부터 지운다 (LRU).
+
+    CINEMA_FRAME_CACHE=frame_cache python extract_frames.py     # iter_frames 가 캐시를 거친다
+    CINEMA_FRAME_CACHE_GB=50 ...                                 # 디스크 예산 (기본 20GB)
+
+사용법:
+    python frame_cache.py fill <영상> [--start 0] [--end 초] [--step 1] [--width 640] [--root frame_cache]
+    python frame_cache.py info [--root frame_cache]
+    python frame_cache.py evict [--root frame_cache] [--budget-gb 20]
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+import shutil
+from collections import OrderedDict
+
+import numpy as np
+
+import instrument
+from frame_source import decode_frames, frame_index_at, plan_targets, resize_to_width, video_info
+
+try:
+    import fcntl
+except ImportError:  # Windows: 잠금 없이 (한 프로세스만 쓰는 경우)
+    fcntl = None
+
+CACHE_VERSION = 1
+DEFAULT_ROOT = os.environ.get("CINEMA_FRAME_CACHE", "") or "frame_cache"
+DEFAULT_BUDGET_GB = float(os.environ.get("CINEMA_FRAME_CACHE_GB", "20"))
+DEFAULT_CHUNK_FRAMES = 32
+OPEN_CHUNKS = 16         # 프로세스당 열어 둘 최대 청크 수
+HASH_BLOCK = 8 << 20
+
+
+def _read_json(path, default):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def _write_json(path, data):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+class _Lock:
+    """Exclusive advisory lock on a file (no-op where fcntl is unavailable)."""
+
+    def __init__(self, path):
+        self.path = path
+        self.f = None
+
+    def __enter__(self):
+        if fcntl is not None:
+            self.f = open(self.path, "a")
+            fcntl.flock(self.f, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.f is not None:
+            fcntl.flock(self.f, fcntl.LOCK_UN)
+            self.f.close()
+        return False
+
+
+def video_hash(video_path, root=DEFAULT_ROOT):
+    """sha256 of the video content, reused from <root>/hashes.json while size and mtime are unchanged."""
+    stat = os.stat(video_path)
+    key = os.path.abspath(video_path)
+    memo_path = os.path.join(root, "hashes.json")
+    memo = _read_json(memo_path, {})
+    entry = memo.get(key)
+    if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+        return entry["hash"]
+    h = hashlib.sha256()
+    with open(video_path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK), b""):
+            h.update(block)
+    digest = h.hexdigest()
+    os.makedirs(root, exist_ok=True)
+    with _Lock(os.path.join(root, ".lock")):
+        memo = _read_json(memo_path, {})
+        memo[key] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "hash": digest}
+        _write_json(memo_path, memo)
+    return digest
+
+
+def tier_name(width):
+    return "full" if width is None else f"w{int(width)}"
+
+
+def _disk_bytes(stat):
+    # 미리 잡아 둔 청크는 희소 파일이므로 실제 블록 수로 센다
+    return stat.st_blocks * 512 if hasattr(stat, "st_blocks") else stat.st_size
+
+
+class _TierWriter:
+    """Fills chunks claimed by this process and publishes their slots to the tier index."""
+
+    def __init__(self, cache, tier):
+        self.cache = cache
+        self.tier = tier
+        self.chunk = None
+        self.array = None
+        self.slot = 0
+        self.pending = {}
+        self.written = 0
+
+    def put(self, frame_index, frame):
+        if self.array is None or self.slot == self.cache.chunk_frames:
+            self.flush()
+            self._new_chunk(frame.shape)
+        self.array[self.slot] = frame
+        loc = (self.chunk, self.slot)
+        self.pending[frame_index] = loc
+        self.cache.index.setdefault(self.tier, {})[frame_index] = loc
+        self.slot += 1
+        self.written += 1
+        view = self.array[loc[1]]
+        view.flags.writeable = False
+        return view
+
+    def _new_chunk(self, shape):
+        cache = self.cache
+        if cache.budget_bytes:
+            keep = [] if self.array is None else [cache.chunk_path(self.tier, self.chunk)]
+            evict(cache.root, cache.budget_bytes, keep=keep)
+        os.makedirs(os.path.join(cache.dir, self.tier), exist_ok=True)
+        with cache.lock():
+            index = cache.read_index(self.tier)
+            self.chunk = index["next_chunk"]
+            index["next_chunk"] += 1
+            cache.write_index(self.tier, index)
+        self.array = np.lib.format.open_memmap(cache.chunk_path(self.tier, self.chunk), mode="w+",
+                                               dtype=np.uint8, shape=(cache.chunk_frames,) + shape)
+        self.slot = 0
+
+    def flush(self):
+        if not self.pending:
+            return
+        self.array.flush()
+        with self.cache.lock():
+            index = self.cache.read_index(self.tier)
+            index["frames"].update({str(k): list(v) for k, v in self.pending.items()})
+            self.cache.write_index(self.tier, index)
+        self.pending = {}
+
+
+class FrameCache:
+    """Decoded frames of one video, shared through memory-mapped chunk files."""
+
+    def __init__(self, video_path, root=None, chunk_frames=DEFAULT_CHUNK_FRAMES, budget_gb=DEFAULT_BUDGET_GB):
+        self.root = root or DEFAULT_ROOT
+        os.makedirs(self.root, exist_ok=True)
+        self.video_path = video_path
+        self.hash = video_hash(video_path, self.root)
+        self.dir = os.path.join(self.root, self.hash[:16])
+        self.chunk_frames = chunk_frames
+        self.budget_bytes = int(budget_gb * (1 << 30)) if budget_gb else 0
+        self._chunks = OrderedDict()
+
+        meta_path = os.path.join(self.dir, "meta.json")
+        meta = _read_json(meta_path, None)
+        if meta is None or meta.get("version") != CACHE_VERSION or meta.get("hash") != self.hash:
+            if meta is not None:
+                shutil.rmtree(self.dir, ignore_errors=True)
+            os.makedirs(self.dir, exist_ok=True)
+            info = video_info(video_path)
+            meta = {"version": CACHE_VERSION, "hash": self.hash, "source": os.path.abspath(video_path),
+                    "fps": info["fps"], "total_frames": info["total_frames"]}
+            with self.lock():
+                _write_json(meta_path, meta)
+            _drop_stale(self.root, meta["source"], self.dir)
+        self.meta = meta
+        self.fps = meta["fps"]
+        self.total_frames = meta["total_frames"]
+        self.index = {}
+        self.reload()
+
+    def lock(self):
+        return _Lock(os.path.join(self.dir, ".lock"))
+
+    def chunk_path(self, tier, chunk):
+        return os.path.join(self.dir, tier, f"chunk_{chunk:05d}.npy")
+
+    def read_index(self, tier):
+        return _read_json(os.path.join(self.dir, tier, "index.json"), {"next_chunk": 0, "frames": {}})
+
+    def write_index(self, tier, index):
+        _write_json(os.path.join(self.dir, tier, "index.json"), index)
+
+    def reload(self):
+        """Re-read the tier indexes (other processes may have added or evicted frames)."""
+        self.index = {}
+        for path in glob.glob(os.path.join(self.dir, "*", "index.json")):
+            tier = os.path.basename(os.path.dirname(path))
+            frames = _read_json(path, {"frames": {}})["frames"]
+            self.index[tier] = {int(k): tuple(v) for k, v in frames.items()}
+
+    def _view(self, tier, loc):
+        key = (tier, loc[0])
+        array = self._chunks.get(key)
+        if array is None:
+            path = self.chunk_path(tier, loc[0])
+            try:
+                array = np.load(path, mmap_mode="r")
+                os.utime(path)  # LRU 기준: 마지막 사용 시각
+            except (OSError, ValueError):
+                return None  # 다른 프로세스가 지운 청크
+            self._chunks[key] = array
+            if len(self._chunks) > OPEN_CHUNKS:
+                self._chunks.popitem(last=False)
+        else:
+            self._chunks.move_to_end(key)
+        return array[loc[1]]
+
+    def lookup(self, frame_index, width=None):
+        """Cached frame (read-only view) or None."""
+        tier = tier_name(width)
+        loc = self.index.get(tier, {}).get(frame_index)
+        return None if loc is None else self._view(tier, loc)
+
+    def get(self, sec, width=None):
+        """Cached frame at a time in seconds (same nearest-frame rounding as frames()) or None."""
+        return self.lookup(frame_index_at(sec, self.fps), width)
+
+    def frames(self, secs, width=None, seek_gap_sec=None):
+        """Yield (sec, frame_index, frame) like frame_source.iter_frames, decoding only the missing frames."""
+        tier = tier_name(width)
+        plan = plan_targets(secs, self.fps, self.total_frames)
+        have = self.index.get(tier, {})
+        full = self.index.get("full", {}) if width is not None else {}
+        to_decode = [group[0] for idx, group in plan if idx not in have and idx not in full]
+        kwargs = {} if seek_gap_sec is None else {"seek_gap_sec": seek_gap_sec}
+        decoded = _Lookahead(decode_frames(self.video_path, to_decode, **kwargs) if to_decode else ())
+        writer = _TierWriter(self, tier)
+        hits = 0
+        try:
+            for frame_index, group in plan:
+                frame = self.lookup(frame_index, width)
+                if frame is not None:
+                    hits += 1
+                else:
+                    source = self.lookup(frame_index) if width is not None else None
+                    if source is None:
+                        source = self._decode(decoded, frame_index, group[0], kwargs)
+                        if source is None:
+                            return
+                    frame = writer.put(frame_index, resize_to_width(source, width))
+                for sec in group:
+                    yield sec, frame_index, frame
+        finally:
+            writer.flush()
+            instrument.count("frame_cache_hits", hits)
+            instrument.count("frame_cache_misses", writer.written)
+
+    def _decode(self, decoded, frame_index, sec, kwargs):
+        while decoded.peek() is not None and decoded.peek()[1] < frame_index:
+            decoded.next()
+        if decoded.peek() is not None and decoded.peek()[1] == frame_index:
+            return decoded.next()[2]
+        # 계획 뒤에 다른 프로세스가 지운 프레임: 그 한 장만 따로 디코딩
+        for _, _, frame in decode_frames(self.video_path, [sec], **kwargs):
+            return frame
+        return None
+
+    def fill(self, secs, widths=(None,)):
+        """Make sure the given seconds are cached in every tier; returns the number of frames available."""
+        n = 0
+        for width in widths:
+            n = sum(1 for _ in self.frames(secs, width=width))
+        return n
+
+
+class _Lookahead:
+    """Iterator wrapper with one item of lookahead."""
+
+    def __init__(self, iterable):
+        self.it = iter(iterable)
+        self.head = None
+        self.filled = False
+
+    def peek(self):
+        if not self.filled:
+            self.head = next(self.it, None)
+            self.filled = True
+        return self.head
+
+    def next(self):
+        item = self.peek()
+        self.filled = False
+        return item
+
+
+def _drop_stale(root, source, current_dir):
+    """Remove cache folders of an earlier version (other hash) of the same video file."""
+    for meta_path in glob.glob(os.path.join(root, "*", "meta.json")):
+        video_dir = os.path.dirname(meta_path)
+        if video_dir != current_dir and _read_json(meta_path, {}).get("source") == source:
+            shutil.rmtree(video_dir, ignore_errors=True)
+
+
+def _chunk_files(root):
+    out = []
+    for path in glob.glob(os.path.join(root, "*", "*", "chunk_*.npy")):
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        out.append((st.st_mtime_ns, _disk_bytes(st), path))
+    return out
+
+
+def evict(root, budget_bytes, keep=()):
+    """Delete least recently used chunks until the cache fits in budget_bytes; returns the bytes freed."""
+    chunks = _chunk_files(root)
+    total = sum(size for _, size, _ in chunks)
+    if total <= budget_bytes:
+        return 0
+    keep = set(keep)
+    removed = {}
+    freed = 0
+    for _, size, path in sorted(chunks):
+        if total - freed <= budget_bytes:
+            break
+        if path in keep:
+            continue
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        freed += size
+        tier_dir = os.path.dirname(path)
+        chunk = int(os.path.basename(path)[len("chunk_"):-len(".npy")])
+        removed.setdefault(tier_dir, set()).add(chunk)
+
+    # 지운 청크를 가리키는 인덱스 항목 정리
+    for tier_dir, chunk_ids in removed.items():
+        with _Lock(os.path.join(os.path.dirname(tier_dir), ".lock")):
+            index_path = os.path.join(tier_dir, "index.json")
+            index = _read_json(index_path, None)
+            if index is None:
+                continue
+            index["frames"] = {k: v for k, v in index["frames"].items() if v[0] not in chunk_ids}
+            _write_json(index_path, index)
+    instrument.count("frame_cache_evicted_bytes", freed)
+    return freed
+
+
+def cache_info(root=DEFAULT_ROOT):
+    """[{'source', 'hash', 'tier', 'frames', 'chunks', 'bytes'}] for every cached video tier."""
+    rows = []
+    for meta_path in sorted(glob.glob(os.path.join(root, "*", "meta.json"))):
+        meta = _read_json(meta_path, {})
+        video_dir = os.path.dirname(meta_path)
+        for index_path in sorted(glob.glob(os.path.join(video_dir, "*", "index.json"))):
+            tier_dir = os.path.dirname(index_path)
+            chunks = glob.glob(os.path.join(tier_dir, "chunk_*.npy"))
+            rows.append({"source": meta.get("source"), "hash": meta.get("hash", "")[:16],
+                         "tier": os.path.basename(tier_dir),
+                         "frames": len(_read_json(index_path, {"frames": {}})["frames"]),
+                         "chunks": len(chunks), "bytes": sum(_disk_bytes(os.stat(p)) for p in chunks)})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="공유 프레임 캐시")
+    sub = parser.add_subparsers(dest="command", required=True)
+    fill = sub.add_parser("fill", help="구간의 프레임을 미리 디코딩해 캐시")
+    fill.add_argument("video_path")
+    fill.add_argument("--start", type=float, default=0.0)
+    fill.add_argument("--end", type=float, default=None)
+    fill.add_argument("--step", type=float, default=1.0)
+    fill.add_argument("--width", type=int, nargs="*", default=[], help="추가로 만들 축소 tier 너비")
+    fill.add_argument("--no-full", action="store_true", help="원본 해상도 tier 는 만들지 않기")
+    for p in (fill, sub.add_parser("info"), sub.add_parser("evict")):
+        p.add_argument("--root", default=DEFAULT_ROOT)
+        p.add_argument("--budget-gb", type=float, default=DEFAULT_BUDGET_GB)
+    args = parser.parse_args()
+
+    if args.command == "fill":
+        cache = FrameCache(args.video_path, args.root, budget_gb=args.budget_gb)
+        end = cache.total_frames / cache.fps if args.end is None else args.end
+        secs = np.arange(args.start, end, args.step).tolist()
+        widths = ([] if args.no_full else [None]) + args.width
+        for width in widths:
+            n = cache.fill(secs, widths=(width,))
+            print(f"{tier_name(width)}: {n}프레임")
+    elif args.command == "evict":
+        freed = evict(args.root, int(args.budget_gb * (1 << 30)))
+        print(f"{freed / (1 << 30):.2f}GB 정리")
+    for row in cache_info(args.root):
+        print(f"{row['source']} [{row['hash']}] {row['tier']}: {row['frames']}프레임, "
+              f"청크 {row['chunks']}개, {row['bytes'] / (1 << 30):.2f}GB")
+
+
+if __name__ == "__main__":
+    main()
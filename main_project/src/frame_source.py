@@ -0,0 +1,116 @@
+"""공용 프레임 소스: 필요한 시각의 프레임을 한 번의 순방향 디코딩으로 읽어온다.
+
+초마다 cap.set(POS_MSEC/POS_FRAMES)로 이동하면 긴 GOP H.264 영상에서는 매번
+직전 키프레임부터 다시 디코딩하게 된다. 여기서는 목표 프레임들을 정렬한 뒤
+가까운 목표는 grab()으로 건너뛰며(retrieve 없이) 따라가고, 멀리 떨어진 목표만
+seek 한다.
+
+CINEMA_FRAME_CACHE=<폴더> 이면 iter_frames 가 frame_cache 를 거쳐, 이미 디코딩한 프레임은
+memory-map 저장소에서 바로 읽고 없는 프레임만 디코딩해 저장한다 (추적/추출/리딩 라인/얼굴
+단계가 같은 영화를 한 번만 디코딩).
+"""
+import os
+
+import cv2
+
+import instrument
+
+# 다음 목표까지의 간격이 이 값(초)보다 크면 seek, 작으면 grab()으로 순차 디코딩
+DEFAULT_SEEK_GAP_SEC = 8.0
+FRAME_CACHE_DIR = os.environ.get("CINEMA_FRAME_CACHE", "")
+
+
+def video_info(video_path):
+    """Return fps, frame count, duration and size of a video."""
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise IOError(f"영상을 열 수 없습니다: {video_path}")
+    try:
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        return {
+            "fps": fps,
+            "total_frames": total_frames,
+            "duration": total_frames / fps if fps else 0.0,
+            "width": int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            "height": int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        }
+    finally:
+        cap.release()
+
+
+def frame_index_at(sec, fps):
+    """Nearest frame index of a time in seconds."""
+    return int(round(sec * fps))  # 계획 시각은 k / fps 로 맞춰져 있어 버림하면 k-1 이 될 수 있다
+
+
+def plan_targets(secs, fps, total_frames=None):
+    """Map requested seconds to sorted (frame_index, [secs]) groups (nearest frame)."""
+    groups = {}
+    for sec in secs:
+        frame_index = frame_index_at(sec, fps)
+        if frame_index < 0 or (total_frames and frame_index >= total_frames):
+            continue
+        groups.setdefault(frame_index, []).append(sec)
+    return [(idx, sorted(groups[idx])) for idx in sorted(groups)]
+
+
+def resize_to_width(frame, width):
+    """Downscale a frame to the given width keeping the aspect ratio (never upscales)."""
+    if width is None or frame.shape[1] <= width:
+        return frame
+    height = max(1, int(round(frame.shape[0] * width / frame.shape[1])))
+    return cv2.resize(frame, (int(width), height), interpolation=cv2.INTER_AREA)
+
+
+def iter_frames(video_path, secs, seek_gap_sec=DEFAULT_SEEK_GAP_SEC, width=None):
+    """Yield (sec, frame_index, frame) for the requested seconds in one forward pass.
+
+    Frames are yielded in time order. Iteration stops early if the decoder
+    fails, so callers should compare what they received with what they asked for.
+    width downscales the frames (a separate cache tier when the frame cache is on);
+    cached frames are read-only views, copy them before drawing on them.
+    """
+    if FRAME_CACHE_DIR:
+        from frame_cache import FrameCache
+
+        return FrameCache(video_path, FRAME_CACHE_DIR).frames(secs, width=width, seek_gap_sec=seek_gap_sec)
+    frames = decode_frames(video_path, secs, seek_gap_sec)
+    if width is None:
+        return frames
+    return ((sec, frame_index, resize_to_width(frame, width)) for sec, frame_index, frame in frames)
+
+
+@instrument.timed("decode_ms")
+def decode_frames(video_path, secs, seek_gap_sec=DEFAULT_SEEK_GAP_SEC):
+    """iter_frames without the cache: always decodes from the video."""
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise IOError(f"영상을 열 수 없습니다: {video_path}")
+    try:
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        seek_gap = max(1, int(seek_gap_sec * fps))
+
+        pos = 0  # 다음 read()/grab()이 돌려줄 프레임 번호
+        for frame_index, group_secs in plan_targets(secs, fps, total_frames):
+            gap = frame_index - pos
+            if gap > seek_gap:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
+                pos = frame_index
+            else:
+                # 가까운 목표: 디코딩만 하고 픽셀 변환(retrieve)은 생략
+                while pos < frame_index:
+                    if not cap.grab():
+                        return
+                    pos += 1
+
+            success, frame = cap.read()
+            if not success:
+                return
+            pos += 1
+
+            for sec in group_secs:
+                yield sec, frame_index, frame
+    finally:
+        cap.release()
@@ -0,0 +1,238 @@
+"""단계별 시간 측정/카운터 (환경 변수로 켜고 끄는 계측)
+
+CINEMA_PROFILE 이 비어 있거나 0 이면 모든 함수가 아무것도 하지 않는다: timer() 는 공용 no-op
+컨텍스트, timed() 는 원래 함수를 그대로 돌려주므로 꺼져 있을 때의 비용은 함수 호출 한 번 정도다.
+
+    CINEMA_PROFILE=1 python extract_frames.py          # 단계별 시간/카운터 리포트
+    CINEMA_PROFILE=cprofile python extract_frames.py   # + 메인 스레드 cProfile (.prof)
+    CINEMA_PROFILE_DIR=reports ...                     # 리포트 폴더 (기본 profile_reports)
+
+계측 이름 규칙: *_ms 는 시간 히스토그램(count/total/mean/p50/p90/p99/max), 나머지는 카운터.
+
+    instrument.start_run("extract_frames")   # 종료 시 JSON/CSV 리포트 기록
+    with instrument.timer("infer_ms"): ...
+    @instrument.timed("crop_write_ms")        # 일반/async/제너레이터 함수 모두 가능
+    instrument.count("cache_hits", n)
+
+.prof 는 `python -m pstats` 나 snakeviz 로 본다. 워커 스레드/프로세스까지 포함한 샘플링
+프로파일이 필요하면 `py-spy record --format speedscope -o run.json -- python 스크립트.py` 처럼
+py-spy 를 밖에서 붙이면 되고, 리포트의 pid 로 `py-spy dump --pid` 도 할 수 있다.
+"""
+import atexit
+import csv
+import functools
+import inspect
+import json
+import math
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+MODE = os.environ.get("CINEMA_PROFILE", "").strip().lower()
+ENABLED = MODE not in ("", "0", "false", "off")
+PROFILE_CPU = MODE == "cprofile"
+REPORT_DIR = os.environ.get("CINEMA_PROFILE_DIR", "profile_reports")
+
+# 히스토그램 버킷: 경계가 10%씩 커지는 로그 스케일 (백분위 오차 10% 이내)
+_BUCKET_BASE = math.log(1.1)
+
+_lock = threading.Lock()
+_histograms = {}
+_counters = {}
+_run = {}
+
+
+class Histogram:
+    """Count/total/min/max plus log-scale buckets for approximate percentiles (constant memory)."""
+
+    __slots__ = ("count", "total", "min", "max", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+        self.buckets = {}
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        b = math.floor(math.log(value) / _BUCKET_BASE) if value > 1e-6 else -1000
+        self.buckets[b] = self.buckets.get(b, 0) + 1
+
+    def percentile(self, q):
+        rank = q * self.count
+        seen = 0
+        for b in sorted(self.buckets):
+            seen += self.buckets[b]
+            if seen >= rank:
+                return min(self.max, math.exp((b + 1) * _BUCKET_BASE)) if b > -1000 else 0.0
+        return self.max
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "total_ms": round(self.total, 3),
+            "mean_ms": round(self.total / self.count, 3) if self.count else 0.0,
+            "min_ms": round(self.min, 3) if self.count else 0.0,
+            "p50_ms": round(self.percentile(0.5), 3),
+            "p90_ms": round(self.percentile(0.9), 3),
+            "p99_ms": round(self.percentile(0.99), 3),
+            "max_ms": round(self.max, 3),
+        }
+
+
+def observe(name, value_ms):
+    if not ENABLED:
+        return
+    with _lock:
+        hist = _histograms.get(name)
+        if hist is None:
+            hist = _histograms[name] = Histogram()
+        hist.add(value_ms)
+
+
+def count(name, n=1):
+    if not ENABLED:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    __slots__ = ("name", "t0")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        observe(self.name, (time.perf_counter() - self.t0) * 1000)
+        return False
+
+
+def timer(name):
+    """Context manager recording the block's wall time under name (no-op when disabled)."""
+    return _Timer(name) if ENABLED else _NULL_TIMER
+
+
+def timed_iter(name, iterable):
+    """Yield from iterable, recording the time spent producing each item (not the consumer's time)."""
+    if not ENABLED:
+        return iterable
+    return _timed_iter(name, iter(iterable))
+
+
+def _timed_iter(name, it):
+    while True:
+        t0 = time.perf_counter()
+        try:
+            item = next(it)
+        except StopIteration:
+            return
+        observe(name, (time.perf_counter() - t0) * 1000)
+        yield item
+
+
+def timed(name):
+    """Decorator version of timer(); generator functions are timed per yielded item."""
+    def decorate(fn):
+        if not ENABLED:
+            return fn
+        if inspect.isgeneratorfunction(fn):
+            @functools.wraps(fn)
+            def gen_wrapper(*args, **kwargs):
+                return _timed_iter(name, fn(*args, **kwargs))
+            return gen_wrapper
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with _Timer(name):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with _Timer(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def snapshot():
+    """Current stages and counters as plain dicts."""
+    with _lock:
+        stages = {name: hist.summary() for name, hist in sorted(_histograms.items())}
+        counters = dict(sorted(_counters.items()))
+    return {"stages": stages, "counters": counters}
+
+
+def start_run(name, report_dir=None):
+    """Mark the start of a run and write its report at interpreter exit (no-op when disabled)."""
+    if not ENABLED or _run:
+        return
+    _run.update(name=name, pid=os.getpid(), argv=sys.argv, started=datetime.now().isoformat(),
+                t0=time.perf_counter(), report_dir=report_dir or REPORT_DIR)
+    if PROFILE_CPU:
+        import cProfile
+        _run["profiler"] = cProfile.Profile()
+        _run["profiler"].enable()
+    atexit.register(write_report)
+
+
+def write_report():
+    """Write <name>_<time>_<pid>.json/.csv (and .prof) into the report directory; returns the JSON path."""
+    if not _run or _run.get("written"):
+        return None
+    _run["written"] = True
+    wall = time.perf_counter() - _run["t0"]
+    data = snapshot()
+    for stage in data["stages"].values():
+        stage["share_of_wall"] = round(stage["total_ms"] / 1000 / wall, 4) if wall else 0.0
+    report = {"run": _run["name"], "pid": _run["pid"], "argv": _run["argv"], "started": _run["started"],
+              "wall_sec": round(wall, 3), **data}
+
+    os.makedirs(_run["report_dir"], exist_ok=True)
+    stem = os.path.join(_run["report_dir"], f"{_run['name']}_{datetime.now():%Y%m%d_%H%M%S}_{_run['pid']}")
+    with open(stem + ".json", "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    fields = ["name", "count", "total_ms", "mean_ms", "min_ms", "p50_ms", "p90_ms", "p99_ms", "max_ms",
+              "share_of_wall"]
+    with open(stem + ".csv", "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        for name, stage in report["stages"].items():
+            writer.writerow(dict(stage, name=name))
+        for name, value in report["counters"].items():
+            writer.writerow({"name": name, "count": value})
+    if "profiler" in _run:
+        _run["profiler"].disable()
+        _run["profiler"].dump_stats(stem + ".prof")
+
+    print(f"[계측] {_run['name']} {wall:.2f}s → {stem}.json")
+    for name, stage in report["stages"].items():
+        print(f"  {name:<20} {stage['count']:>8}회  합계 {stage['total_ms'] / 1000:8.2f}s "
+              f"({stage['share_of_wall'] * 100:5.1f}%)  p50 {stage['p50_ms']:.1f}ms  p99 {stage['p99_ms']:.1f}ms")
+    for name, value in report["counters"].items():
+        print(f"  {name:<20} {value:>8}")
+    return stem + ".json"
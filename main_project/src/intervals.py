@@ -0,0 +1,107 @@
+"""정렬된 시작/끝 배열 기반 구간 질의
+
+구간들을 시작 시각 기준으로 정렬하고 "지금까지의 최대 끝 시각"을 함께 저장해 두면,
+구간이 서로 겹쳐도 이분 탐색 두 번으로 후보 범위를 좁힐 수 있다.
+씬/샷처럼 겹치지 않는 구간은 locate() 로 여러 시각을 한 번에 찾는다.
+
+azure_index / subtitles 의 파싱 캐시(.index.pkl)는 기본으로 원본 옆에 두고,
+CINEMA_INDEX_CACHE=폴더 면 그 폴더에 모은다. 쓰기 실패(읽기 전용/공유 데이터 폴더)는 무시한다.
+"""
+import hashlib
+import os
+import pickle
+
+import numpy as np
+
+INDEX_CACHE_DIR = os.environ.get("CINEMA_INDEX_CACHE", "")
+
+
+def index_cache_path(path):
+    """Parse-cache path of a source file: <path>.index.pkl, or a per-path file under $CINEMA_INDEX_CACHE."""
+    if not INDEX_CACHE_DIR:
+        return path + ".index.pkl"
+    key = hashlib.sha1(os.path.abspath(path).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(INDEX_CACHE_DIR, f"{os.path.basename(path)}.{key}.index.pkl")
+
+
+def write_index_cache(cache_path, payload):
+    """Pickle payload to cache_path via a temp file; returns False instead of raising when it can't write."""
+    tmp = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        if os.path.dirname(cache_path):
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        with open(tmp, "wb") as f:
+            pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, cache_path)
+        return True
+    except OSError:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        return False
+
+
+class IntervalSet:
+    """Half-open intervals [start, end) sorted by start, with an owner id and name per interval."""
+
+    def __init__(self, starts, ends, owners=None, names=None):
+        starts = np.asarray(starts, dtype=np.float64)
+        order = np.argsort(starts, kind="stable")
+        self.starts = starts[order]
+        self.ends = np.asarray(ends, dtype=np.float64)[order]
+        self.owners = (np.arange(len(starts)) if owners is None else np.asarray(owners))[order]
+        self.names = None if names is None else np.asarray(names, dtype=object)[order]
+        # 앞에서부터의 최대 끝 시각: 단조 증가이므로 이분 탐색 가능
+        self.max_ends = np.maximum.accumulate(self.ends) if len(self.ends) else self.ends
+
+    def __len__(self):
+        return len(self.starts)
+
+    def _candidates(self, a, b, right):
+        lo = int(np.searchsorted(self.max_ends, a, side="right"))
+        hi = int(np.searchsorted(self.starts, b, side="right" if right else "left"))
+        return lo, max(lo, hi)
+
+    def containing(self, t):
+        """Positions of intervals with start <= t < end."""
+        lo, hi = self._candidates(t, t, right=True)
+        return lo + np.flatnonzero(self.ends[lo:hi] > t)
+
+    def overlapping(self, a, b):
+        """Positions of intervals overlapping [a, b) (a zero-length query behaves like containing)."""
+        if b <= a:
+            return self.containing(a)
+        lo, hi = self._candidates(a, b, right=False)
+        return lo + np.flatnonzero(self.ends[lo:hi] > a)
+
+    def locate(self, times):
+        """Vectorized lookup: position per time of the latest-starting interval containing it, -1 if none.
+
+        Exact for overlapping intervals too (e.g. SRT cues that overlap): a time past the end of
+        its nearest interval but still inside an earlier, longer one falls back to containing().
+        """
+        times = np.asarray(times, dtype=np.float64)
+        pos = np.searchsorted(self.starts, times, side="right") - 1
+        if not len(self):
+            return np.where(pos >= 0, pos, -1)
+        safe = np.clip(pos, 0, None)
+        valid = (pos >= 0) & (times < self.ends[safe])
+        # 바로 앞 구간은 끝났지만 더 앞에서 시작한 긴 구간이 아직 열려 있는 시각
+        missed = (pos >= 0) & ~valid & (times < self.max_ends[safe])
+        if not missed.any():
+            return np.where(valid, pos, -1)
+        out = np.where(valid, pos, -1)
+        flat_out, flat_times = out.reshape(-1), times.reshape(-1)
+        for i in np.flatnonzero(missed.reshape(-1)):
+            flat_out[i] = self.containing(flat_times[i])[-1]
+        return flat_out.reshape(out.shape)
+
+    def durations(self):
+        return self.ends - self.starts
+
+    def to_arrays(self):
+        out = {"starts": self.starts, "ends": self.ends, "owners": self.owners}
+        if self.names is not None:
+            out["names"] = self.names
+        return out
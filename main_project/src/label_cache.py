@@ -0,0 +1,200 @@
+"""LLM 자막 라벨 캐시 (SQLite, 내용 주소 기반)
+
+키는 (모델, 프롬프트 템플릿, 감정 목록) 네임스페이스와 자막 텍스트의 해시다. 결과는
+요청이 끝날 때마다 커밋하므로 중간에 죽어도 다시 실행하면 이미 태깅한 줄은 건너뛰고,
+"Yes.", "What?" 같은 반복 대사는 영화가 달라도 한 번만 태깅한다. 프롬프트를 바꾸면
+네임스페이스가 달라져 자동으로 새로 태깅되며, 옛 결과는 invalidate/evict 로 지운다.
+
+사용법:
+    python label_cache.py info <db>
+    python label_cache.py invalidate <db> (--namespace 접두어 | --model 이름 | --stale | --all)
+    python label_cache.py evict <db> [--older-than-days 30] [--max-rows N]
+"""
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+import instrument
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS namespaces (
+    ns TEXT PRIMARY KEY,
+    model TEXT,
+    template TEXT,
+    labels TEXT,
+    created REAL,
+    last_used REAL
+);
+CREATE TABLE IF NOT EXISTS labels (
+    key TEXT PRIMARY KEY,
+    ns TEXT NOT NULL,
+    text TEXT,
+    result TEXT NOT NULL,
+    created REAL,
+    last_hit REAL
+);
+CREATE INDEX IF NOT EXISTS labels_ns ON labels (ns);
+CREATE INDEX IF NOT EXISTS labels_last_hit ON labels (last_hit);
+"""
+
+
+def _sha(*parts):
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def namespace_id(model, template, emotion_labels):
+    """Hash of everything besides the text that changes what the LLM returns."""
+    return _sha(model, template, json.dumps(list(emotion_labels), ensure_ascii=False))
+
+
+def label_key(ns, text):
+    return _sha(ns, text)
+
+
+class LabelCache:
+    """SQLite-backed map (namespace, text) -> label dict with hit/miss counters."""
+
+    def __init__(self, path):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.stats = {"hits": 0, "misses": 0, "stored": 0}
+
+    def register(self, model, template, emotion_labels):
+        """Record a namespace (model + rendered template + vocabulary) and return its id."""
+        ns = namespace_id(model, template, emotion_labels)
+        now = time.time()
+        self.conn.execute(
+            "INSERT INTO namespaces VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(ns) DO UPDATE SET last_used = excluded.last_used",
+            (ns, model, template, json.dumps(list(emotion_labels), ensure_ascii=False), now, now),
+        )
+        self.conn.commit()
+        return ns
+
+    def get_many(self, ns, texts):
+        """Return {text: label} for the texts already cached under ns."""
+        found = {}
+        unique = list(dict.fromkeys(texts))
+        keys = {label_key(ns, text): text for text in unique}
+        key_list = list(keys)
+        for i in range(0, len(key_list), 500):  # SQLite 변수 개수 제한
+            part = key_list[i:i + 500]
+            rows = self.conn.execute(
+                f"SELECT key, result FROM labels WHERE key IN ({','.join('?' * len(part))})", part)
+            for key, result in rows:
+                found[keys[key]] = json.loads(result)
+        if found:
+            now = time.time()
+            self.conn.executemany("UPDATE labels SET last_hit = ? WHERE key = ?",
+                                  [(now, label_key(ns, text)) for text in found])
+            self.conn.commit()
+        self.stats["hits"] += len(found)
+        self.stats["misses"] += len(unique) - len(found)
+        instrument.count("cache_hits", len(found))
+        instrument.count("cache_misses", len(unique) - len(found))
+        return found
+
+    def put_many(self, ns, items):
+        """Store [(text, label)] and commit immediately so an interrupted run keeps them."""
+        now = time.time()
+        rows = [(label_key(ns, text), ns, text, json.dumps(label, ensure_ascii=False), now, now)
+                for text, label in items]
+        self.conn.executemany("INSERT OR REPLACE INTO labels VALUES (?, ?, ?, ?, ?, ?)", rows)
+        self.conn.commit()
+        self.stats["stored"] += len(rows)
+
+    def info(self):
+        """Per-namespace row counts, newest namespace first."""
+        rows = self.conn.execute(
+            "SELECT n.ns, n.model, n.labels, n.last_used, COUNT(l.key) FROM namespaces n "
+            "LEFT JOIN labels l ON l.ns = n.ns GROUP BY n.ns ORDER BY n.last_used DESC")
+        return [{"namespace": ns, "model": model, "labels": json.loads(labels),
+                 "last_used": last_used, "rows": count}
+                for ns, model, labels, last_used, count in rows]
+
+    def invalidate(self, namespace=None, model=None, stale=False):
+        """Delete labels by namespace prefix, by model, or (stale) all but the last-used namespace."""
+        if stale:
+            row = self.conn.execute("SELECT ns FROM namespaces ORDER BY last_used DESC LIMIT 1").fetchone()
+            where, args = "ns != ?", [row[0] if row else ""]
+        elif namespace:
+            where, args = "ns LIKE ?", [namespace + "%"]
+        elif model:
+            where, args = "ns IN (SELECT ns FROM namespaces WHERE model = ?)", [model]
+        else:
+            where, args = "1", []
+        deleted = self.conn.execute(f"DELETE FROM labels WHERE {where}", args).rowcount
+        self.conn.execute(f"DELETE FROM namespaces WHERE {where}", args)
+        self.conn.commit()
+        return deleted
+
+    def evict(self, older_than_days=None, max_rows=None):
+        """Drop labels not hit for older_than_days, then the least recently hit beyond max_rows."""
+        deleted = 0
+        if older_than_days is not None:
+            cutoff = time.time() - older_than_days * 86400
+            deleted += self.conn.execute("DELETE FROM labels WHERE last_hit < ?", (cutoff,)).rowcount
+        if max_rows is not None:
+            deleted += self.conn.execute(
+                "DELETE FROM labels WHERE key IN (SELECT key FROM labels ORDER BY last_hit DESC LIMIT -1 OFFSET ?)",
+                (max_rows,)).rowcount
+        self.conn.commit()
+        return deleted
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="자막 라벨 캐시 관리")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_info = sub.add_parser("info", help="네임스페이스별 저장 현황")
+    p_info.add_argument("db")
+    p_inv = sub.add_parser("invalidate", help="프롬프트/모델이 바뀌었을 때 옛 결과 삭제")
+    p_inv.add_argument("db")
+    group = p_inv.add_mutually_exclusive_group(required=True)
+    group.add_argument("--namespace", help="네임스페이스 id 접두어")
+    group.add_argument("--model")
+    group.add_argument("--stale", action="store_true", help="마지막으로 사용한 네임스페이스만 남김")
+    group.add_argument("--all", action="store_true")
+    p_evict = sub.add_parser("evict", help="오래 쓰지 않은 결과 삭제")
+    p_evict.add_argument("db")
+    p_evict.add_argument("--older-than-days", type=float)
+    p_evict.add_argument("--max-rows", type=int)
+    args = parser.parse_args()
+
+    with LabelCache(args.db) as cache:
+        if args.command == "info":
+            for entry in cache.info():
+                used = time.strftime("%Y-%m-%d %H:%M", time.localtime(entry["last_used"]))
+                print(f"{entry['namespace'][:12]}  {entry['model']:<20} {entry['rows']:>7}줄  "
+                      f"마지막 사용 {used}  감정 {len(entry['labels'])}개")
+        elif args.command == "invalidate":
+            deleted = cache.invalidate(namespace=args.namespace, model=args.model, stale=args.stale)
+            print(f"삭제: {deleted}줄")
+        else:
+            deleted = cache.evict(older_than_days=args.older_than_days, max_rows=args.max_rows)
+            cache.conn.execute("VACUUM")
+            print(f"삭제: {deleted}줄")
+
+
+if __name__ == "__main__":
+    main()
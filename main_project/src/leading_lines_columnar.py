@@ -0,0 +1,194 @@
+"""리딩 라인 결과의 열 기반(columnar) 저장/로드
+
+프레임마다 {"start_point": {"x", "y"}, "end_point": {...}} 딕셔너리가 반복되는 JSON 대신
+video_file, frame_number, line_id, x1, y1, x2, y2, width, height 를 타입이 정해진 배열로
+저장한다. pyarrow가 있으면 Parquet, 없으면 비압축 .npz 로 저장하며, .npz 는 각 배열을
+파일에서 바로 memory-map 해서 읽는다.
+
+사용법:
+    python leading_lines_columnar.py <consolidated .json 또는 .jsonl> <출력 .parquet|.npz>
+"""
+import argparse
+import json
+import struct
+import zipfile
+
+import numpy as np
+
+from leading_lines_dedup import resolve_references
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+COLUMNS = {
+    "frame_number": np.int32,
+    "line_id": np.int16,
+    "x1": np.float32,
+    "y1": np.float32,
+    "x2": np.float32,
+    "y2": np.float32,
+    "width": np.int32,
+    "height": np.int32,
+}
+
+
+def _iter_source(path):
+    if path.endswith(".jsonl"):
+        from leading_lines_store import iter_records
+        records = iter_records(path)
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            records = json.load(f).get("results", [])
+    # 증분 실행의 참조 레코드(ref_frame_number)는 참조한 프레임의 라인으로 펼친다
+    yield from resolve_references(records)
+
+
+def records_to_columns(records):
+    """Flatten leading-lines records into typed column arrays.
+
+    video_file is dictionary-encoded: "video_file" holds integer codes (int16, or
+    int32 past 32767 names) into the "video_files" array. Records without video_file (per-image results) use
+    image_file as the name and frame_number -1.
+    """
+    names = {}
+    codes = []
+    cols = {name: [] for name in COLUMNS}
+    for record in records:
+        name = record.get("video_file") or record.get("image_file") or ""
+        code = names.setdefault(name, len(names))
+        dims = record.get("original_dimensions", {})
+        for line in record.get("leading_lines", []):
+            codes.append(code)
+            cols["frame_number"].append(record.get("frame_number", -1))
+            cols["line_id"].append(line.get("id", -1))
+            cols["x1"].append(line["start_point"]["x"])
+            cols["y1"].append(line["start_point"]["y"])
+            cols["x2"].append(line["end_point"]["x"])
+            cols["y2"].append(line["end_point"]["y"])
+            cols["width"].append(dims.get("width", 0))
+            cols["height"].append(dims.get("height", 0))
+
+    out = {name: np.asarray(values, dtype=COLUMNS[name]) for name, values in cols.items()}
+    out["video_file"] = np.asarray(codes, dtype=code_dtype(len(names)))
+    out["video_files"] = np.asarray(list(names), dtype=str)
+    return out
+
+
+def code_dtype(n_categories):
+    """Smallest signed integer dtype that holds dictionary codes for n_categories names."""
+    return np.int16 if n_categories <= np.iinfo(np.int16).max + 1 else np.int32
+
+
+def npz_path(out_path):
+    """The path np.savez actually writes to (it appends .npz when missing)."""
+    return out_path if out_path.endswith(".npz") else out_path + ".npz"
+
+
+def export_columnar(source_path, out_path):
+    """Convert a consolidated JSON/JSONL result file to .parquet or .npz; returns row count."""
+    cols = records_to_columns(_iter_source(source_path))
+    if out_path.endswith(".parquet"):
+        if pa is None:
+            raise ImportError("Parquet 저장에는 pyarrow가 필요합니다 (.npz 경로를 쓰면 불필요)")
+        video = pa.DictionaryArray.from_arrays(pa.array(cols["video_file"]), pa.array(cols["video_files"]))
+        table = pa.table({"video_file": video, **{name: cols[name] for name in COLUMNS}})
+        pq.write_table(table, out_path)
+    else:
+        # 압축하지 않아야 로드할 때 memory-map 가능
+        np.savez(npz_path(out_path), **cols)
+    return len(cols["frame_number"])
+
+
+def _npz_memmap(path):
+    """Memory-map every array stored (uncompressed) in an .npz file."""
+    arrays = {}
+    with zipfile.ZipFile(path) as zf, open(path, "rb") as f:
+        for info in zf.infolist():
+            key = info.filename[:-4] if info.filename.endswith(".npy") else info.filename
+            if info.compress_type != zipfile.ZIP_STORED:
+                arrays[key] = np.load(path)[key]
+                continue
+            f.seek(info.header_offset)
+            local_header = f.read(30)
+            name_len, extra_len = struct.unpack("<HH", local_header[26:30])
+            f.seek(info.header_offset + 30 + name_len + extra_len)
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran, dtype = np.lib.format.read_array_header_2_0(f)
+            arrays[key] = np.memmap(path, dtype=dtype, mode="r", offset=f.tell(), shape=shape,
+                                    order="F" if fortran else "C")
+    return arrays
+
+
+def load_columns(path, mmap=True):
+    """Load a columnar export as a dict of NumPy arrays (memory-mapped views for .npz)."""
+    if path.endswith(".parquet"):
+        if pq is None:
+            raise ImportError("Parquet 로드에는 pyarrow가 필요합니다")
+        table = pq.read_table(path)
+        video = table.column("video_file").combine_chunks()
+        cols = {name: table.column(name).to_numpy() for name in COLUMNS}
+        cols["video_file"] = video.indices.to_numpy().astype(code_dtype(len(video.dictionary)))
+        cols["video_files"] = np.asarray(video.dictionary.to_pylist(), dtype=str)
+        return cols
+    if mmap:
+        return _npz_memmap(path)
+    with np.load(path) as data:
+        return {key: data[key] for key in data.files}
+
+
+def load_dataframe(path, mmap=True):
+    """Load a columnar export as a pandas DataFrame with a categorical video_file column."""
+    import pandas as pd
+
+    cols = load_columns(path, mmap=mmap)
+    df = pd.DataFrame({name: cols[name] for name in COLUMNS}, copy=False)
+    df.insert(0, "video_file", pd.Categorical.from_codes(cols["video_file"], categories=cols["video_files"]))
+    return df
+
+
+def line_geometry(cols):
+    """Vectorized per-line geometry: length and angle (degrees, 0=horizontal), normalized by frame size."""
+    dx = (cols["x2"] - cols["x1"]) / np.maximum(cols["width"], 1)
+    dy = (cols["y2"] - cols["y1"]) / np.maximum(cols["height"], 1)
+    angle = np.degrees(np.arctan2(dy, dx)) % 180.0
+    return {"length": np.hypot(dx, dy), "angle": angle}
+
+
+def film_summary(path):
+    """Per-film composition statistics computed with groupby instead of Python loops."""
+    df = load_dataframe(path)
+    geo = line_geometry({name: df[name].to_numpy() for name in COLUMNS})
+    df["length"] = geo["length"]
+    df["angle"] = geo["angle"]
+    df["is_diagonal"] = (df["angle"] > 20) & (df["angle"] < 160) & ((df["angle"] < 70) | (df["angle"] > 110))
+    per_frame = df.groupby(["video_file", "frame_number"], observed=True).size()
+    summary = df.groupby("video_file", observed=True).agg(
+        lines=("line_id", "size"),
+        mean_length=("length", "mean"),
+        mean_angle=("angle", "mean"),
+        diagonal_ratio=("is_diagonal", "mean"),
+    )
+    summary["frames_with_lines"] = per_frame.groupby(level=0, observed=True).size()
+    summary["lines_per_frame"] = per_frame.groupby(level=0, observed=True).mean()
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="리딩 라인 결과를 열 기반 포맷으로 변환")
+    parser.add_argument("source", help="consolidated .json 또는 .jsonl")
+    parser.add_argument("out_path", help=".parquet 또는 .npz")
+    args = parser.parse_args()
+    out_path = args.out_path if args.out_path.endswith(".parquet") else npz_path(args.out_path)
+    rows = export_columnar(args.source, out_path)
+    print(f"변환 완료: {rows}개 라인 → {out_path}")
+    print(film_summary(out_path).to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""리딩 라인 증분 계산: 화면이 거의 그대로인 프레임은 이전 결과를 참조로 재사용
+
+정적인 샷 안에서는 연속 샘플(frame 0, 24, ...)의 라인 집합이 똑같이 나오는 경우가 많다.
+프레임마다 축소 그래디언트 해시를 만들어 마지막으로 실제 계산한 프레임과 비교하고,
+차이가 threshold 이하이면서 같은 샷(컷 경계를 넘지 않음)이면 라인 검출을 건너뛰고
+{"ref_frame_number": N} 참조 레코드만 저장한다.
+
+사용법:
+    python leading_lines_dedup.py report <전체 실행 결과> <증분 실행 결과>
+"""
+import argparse
+import bisect
+import json
+
+import cv2
+import numpy as np
+
+DEFAULT_THRESHOLD = 0.06
+SIGNATURE_SIZE = (33, 32)  # (w, h) — 가로 차분 후 32x32 비트
+
+
+def frame_signature(frame, size=SIGNATURE_SIZE):
+    """Downscaled gradient hash: sign bits of horizontal and vertical intensity differences."""
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    small = cv2.resize(gray, size, interpolation=cv2.INTER_AREA).astype(np.int16)
+    dx = small[:, 1:] > small[:, :-1]
+    dy = small[1:, :-1] > small[:-1, :-1]
+    return np.packbits(np.concatenate([dx.ravel(), dy.ravel()]))
+
+
+def signature_distance(a, b):
+    """Fraction of differing bits between two signatures (0 = identical)."""
+    return float(np.unpackbits(np.bitwise_xor(a, b)).mean())
+
+
+def azure_cut_times(azure_json_path):
+    """Shot start times (sec) from an Azure Video Indexer insights file."""
+    from azure_index import AzureIndex
+
+    return AzureIndex.load(azure_json_path)["shots"].starts.tolist()
+
+
+class IncrementalLineDetector:
+    """Wrap a leading-lines detector and reuse results inside static stretches of a shot."""
+
+    def __init__(self, detect_fn, threshold=DEFAULT_THRESHOLD, cut_times=None):
+        self.detect_fn = detect_fn
+        self.threshold = threshold
+        self.cut_times = sorted(cut_times or [])
+        self.stats = {"computed": 0, "reused": 0}
+        self._ref_signature = None
+        self._ref_frame_number = None
+        self._ref_shot = None
+
+    def _shot_of(self, sec):
+        return bisect.bisect_right(self.cut_times, sec)
+
+    def process(self, frame, frame_number, sec, base_record):
+        """Return a full record (with leading_lines) or a reference record for this frame."""
+        signature = frame_signature(frame)
+        shot = self._shot_of(sec)
+        if (self._ref_signature is not None and shot == self._ref_shot
+                and signature_distance(signature, self._ref_signature) <= self.threshold):
+            self.stats["reused"] += 1
+            return dict(base_record, ref_frame_number=self._ref_frame_number)
+
+        # 기준 프레임은 실제 계산한 프레임으로만 갱신 (조금씩 변하는 장면에서 누적 오차 방지)
+        self._ref_signature = signature
+        self._ref_frame_number = frame_number
+        self._ref_shot = shot
+        self.stats["computed"] += 1
+        return dict(base_record, leading_lines=self.detect_fn(frame))
+
+
+def run_incremental(video_path, detect_fn, jsonl_path, secs, threshold=DEFAULT_THRESHOLD, cut_times=None):
+    """Detect leading lines on the sampled seconds of a video into a resumable JSONL store."""
+    import os
+
+    from frame_source import iter_frames
+    from leading_lines_store import LeadingLinesWriter
+
+    detector = IncrementalLineDetector(detect_fn, threshold=threshold, cut_times=cut_times)
+    video_file = os.path.basename(video_path)
+    with LeadingLinesWriter(jsonl_path) as writer:
+        for sec, frame_number, frame in iter_frames(video_path, secs):
+            if writer.is_done((video_file, frame_number)):
+                continue
+            base = {
+                "video_file": video_file,
+                "frame_number": frame_number,
+                "original_dimensions": {"width": frame.shape[1], "height": frame.shape[0]},
+            }
+            writer.append(detector.process(frame, frame_number, sec, base))
+    total = detector.stats["computed"] + detector.stats["reused"]
+    if total:
+        print(f"라인 검출 {detector.stats['computed']}회, 재사용 {detector.stats['reused']}회 "
+              f"({detector.stats['reused'] / total * 100:.1f}% 생략)")
+    return detector.stats
+
+
+def resolve_references(records):
+    """Yield records with ref_frame_number entries expanded to the referenced lines."""
+    last_full = {}  # video_file -> 마지막으로 실제 계산된 레코드
+    for record in records:
+        video = record.get("video_file")
+        if "ref_frame_number" in record:
+            ref = last_full.get(video)
+            if ref is None or ref.get("frame_number") != record["ref_frame_number"]:
+                print(f"[경고] 참조 프레임을 찾을 수 없음: {video} #{record['ref_frame_number']}")
+                ref = {"leading_lines": []}
+            record = {k: v for k, v in record.items() if k != "ref_frame_number"}
+            record["leading_lines"] = ref["leading_lines"]
+        else:
+            last_full[video] = record
+        yield record
+
+
+def _line_array(record):
+    dims = record.get("original_dimensions", {})
+    diag = np.hypot(dims.get("width", 1), dims.get("height", 1)) or 1.0
+    pts = [[l["start_point"]["x"], l["start_point"]["y"], l["end_point"]["x"], l["end_point"]["y"]]
+           for l in record.get("leading_lines", [])]
+    return np.asarray(pts, dtype=np.float64).reshape(-1, 4) / diag
+
+
+def _match_lines(a, b, tol):
+    """Number of lines in a that have an undirected endpoint match in b within tol."""
+    if len(a) == 0 or len(b) == 0:
+        return 0
+    fwd = np.maximum(np.hypot(*(a[:, None, :2] - b[None, :, :2]).transpose(2, 0, 1)),
+                     np.hypot(*(a[:, None, 2:] - b[None, :, 2:]).transpose(2, 0, 1)))
+    rev = np.maximum(np.hypot(*(a[:, None, :2] - b[None, :, 2:]).transpose(2, 0, 1)),
+                     np.hypot(*(a[:, None, 2:] - b[None, :, :2]).transpose(2, 0, 1)))
+    dist = np.minimum(fwd, rev)
+    matched, used = 0, set()
+    for i in np.argsort(dist.min(axis=1)):
+        j = int(np.argmin(dist[i]))
+        if dist[i, j] <= tol and j not in used:
+            used.add(j)
+            matched += 1
+    return matched
+
+
+def accuracy_report(full_records, incremental_records, tol=0.02):
+    """Compare an incremental run with a full run frame by frame.
+
+    Lines are matched by endpoint distance normalized by the frame diagonal.
+    """
+    from leading_lines_store import record_key
+
+    full = {record_key(r): r for r in full_records}
+    raw = list(incremental_records)
+    reused = sum(1 for r in raw if "ref_frame_number" in r)
+    tp = n_full = n_inc = exact = frames = 0
+    for record in resolve_references(raw):
+        ref = full.get(record_key(record))
+        if ref is None:
+            continue
+        a, b = _line_array(ref), _line_array(record)
+        m = _match_lines(a, b, tol)
+        tp += m
+        n_full += len(a)
+        n_inc += len(b)
+        exact += int(m == len(a) == len(b))
+        frames += 1
+    return {
+        "frames_compared": frames,
+        "frames_reused": reused,
+        "reuse_ratio": reused / len(raw) if raw else 0.0,
+        "exact_frame_match": exact / frames if frames else 1.0,
+        "line_recall": tp / n_full if n_full else 1.0,
+        "line_precision": tp / n_inc if n_inc else 1.0,
+    }
+
+
+def _load_records(path):
+    if path.endswith(".jsonl"):
+        from leading_lines_store import iter_records
+        return list(iter_records(path))
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f).get("results", [])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="리딩 라인 증분 계산 도구")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_report = sub.add_parser("report", help="전체 실행 대비 증분 실행 정확도 리포트")
+    p_report.add_argument("full_path")
+    p_report.add_argument("incremental_path")
+    p_report.add_argument("--tol", type=float, default=0.02, help="라인 끝점 허용 오차 (대각선 길이 비율)")
+    args = parser.parse_args()
+
+    report = accuracy_report(_load_records(args.full_path), _load_records(args.incremental_path), tol=args.tol)
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
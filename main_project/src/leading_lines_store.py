@@ -0,0 +1,198 @@
+"""리딩 라인 결과 저장소: 프레임당 한 줄씩 추가하는 JSONL + 최종 통합 JSON 생성
+
+중간 저장 때마다 지금까지의 모든 결과를 indent=2로 다시 덤프하면 체크포인트 I/O가
+결과 수의 제곱으로 늘어난다. 여기서는 프레임마다 압축 JSON 한 줄만 추가하고 주기적으로
+fsync 하며, 재시작 시에는 마지막으로 완전히 기록된 줄 다음부터 이어간다.
+
+사용법:
+    python leading_lines_store.py migrate <intermediate 폴더> <출력 .jsonl>
+    python leading_lines_store.py finalize <입력 .jsonl> <consolidated_leading_lines_results.json>
+"""
+import argparse
+import glob
+import json
+import os
+import re
+from datetime import datetime
+
+DEFAULT_FSYNC_EVERY = 100
+
+
+def record_key(record):
+    """Key identifying one analysed frame: (video_file, frame_number) or image_file."""
+    if "frame_number" in record:
+        return (record.get("video_file"), record["frame_number"])
+    return (record.get("image_file"), None)
+
+
+def _scan_committed(path):
+    """Return (byte offset after the last complete record, list of keys) of a JSONL file."""
+    keys = []
+    good_offset = 0
+    with open(path, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break  # 기록 도중 끊긴 마지막 줄
+            try:
+                keys.append(record_key(json.loads(line)))
+            except ValueError:
+                break
+            good_offset += len(line)
+    return good_offset, keys
+
+
+def iter_records(path):
+    """Stream records from a JSONL result file, ignoring an incomplete trailing line."""
+    with open(path, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                return
+            try:
+                yield json.loads(line)
+            except ValueError:
+                return
+
+
+class LeadingLinesWriter:
+    """Append-only JSONL writer for per-frame leading-lines results with crash resume."""
+
+    def __init__(self, path, fsync_every=DEFAULT_FSYNC_EVERY):
+        self.path = path
+        self.fsync_every = fsync_every
+        self.committed = set()
+        self._pending = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        if os.path.exists(path):
+            good_offset, keys = _scan_committed(path)
+            self.committed.update(keys)
+            if good_offset < os.path.getsize(path):
+                print(f"[경고] 불완전한 마지막 기록을 잘라냅니다: {path} ({good_offset} bytes 이후)")
+                with open(path, "r+b") as f:
+                    f.truncate(good_offset)
+        self._file = open(path, "ab")
+
+    def is_done(self, record_or_key):
+        """True if the frame was already committed in a previous run."""
+        key = record_or_key if isinstance(record_or_key, tuple) else record_key(record_or_key)
+        return key in self.committed
+
+    def append(self, record):
+        line = json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+        self._file.write(line.encode("utf-8"))
+        self.committed.add(record_key(record))
+        self._pending += 1
+        if self._pending >= self.fsync_every:
+            self.sync()
+
+    def sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._pending = 0
+
+    def close(self):
+        if not self._file.closed:
+            self.sync()
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+def _indent_block(text, prefix):
+    return "\n".join(prefix + line for line in text.split("\n"))
+
+
+def write_consolidated(jsonl_path, out_path, indent=2):
+    """Build consolidated_leading_lines_results.json from a JSONL store in one streaming pass.
+
+    Records are written as they are read, so memory stays at one record. Because
+    the counts are only known at the end, analysis_info comes after results.
+    """
+    tmp_path = out_path + ".tmp"
+    total = 0
+    videos = set()
+    pad = " " * indent
+    with open(tmp_path, "w", encoding="utf-8") as out:
+        out.write("{\n" + pad + '"results": [')
+        for record in iter_records(jsonl_path):
+            text = json.dumps(record, indent=indent, ensure_ascii=False)
+            out.write(("," if total else "") + "\n" + _indent_block(text, pad * 2))
+            total += 1
+            if record.get("video_file"):
+                videos.add(record["video_file"])
+        out.write(("\n" + pad if total else "") + "],\n")
+        info = {
+            "total_images": total,
+            "successfully_processed": total,
+            "total_videos": len(videos),
+            "timestamp": datetime.now().isoformat(),
+        }
+        info_text = json.dumps(info, indent=indent, ensure_ascii=False)
+        out.write(pad + '"analysis_info": ' + _indent_block(info_text, pad).lstrip() + "\n}")
+    os.replace(tmp_path, out_path)
+    return total
+
+
+def _snapshot_number(path):
+    match = re.search(r"_(\d+)\.json$", path)
+    return int(match.group(1)) if match else -1
+
+
+def migrate_intermediate(intermediate_dir, jsonl_path, latest_only=False):
+    """Convert cumulative consolidated_*_intermediate_XXXXX.json snapshots into a JSONL store.
+
+    Snapshots are read oldest to newest and only frames not yet in the store are
+    appended, so frame order is preserved and duplicates across snapshots vanish.
+    With latest_only, just the newest snapshot is read (each one is cumulative).
+    """
+    snapshots = sorted(glob.glob(os.path.join(intermediate_dir, "*_intermediate_*.json")), key=_snapshot_number)
+    if not snapshots:
+        print(f"[경고] 중간 저장 파일이 없습니다: {intermediate_dir}")
+        return 0
+    if latest_only:
+        snapshots = snapshots[-1:]
+
+    added = 0
+    with LeadingLinesWriter(jsonl_path, fsync_every=1000) as writer:
+        for snapshot in snapshots:
+            with open(snapshot, "r", encoding="utf-8") as f:
+                results = json.load(f).get("results", [])
+            new = 0
+            for record in results:
+                if not writer.is_done(record):
+                    writer.append(record)
+                    new += 1
+            added += new
+            print(f"  {os.path.basename(snapshot)}: {len(results)}개 중 {new}개 추가")
+    print(f"마이그레이션 완료: {added}개 프레임 → {jsonl_path}")
+    return added
+
+
+def main():
+    parser = argparse.ArgumentParser(description="리딩 라인 결과 JSONL 저장소 도구")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_migrate = sub.add_parser("migrate", help="중간 저장 스냅샷들을 JSONL로 변환")
+    p_migrate.add_argument("intermediate_dir")
+    p_migrate.add_argument("jsonl_path")
+    p_migrate.add_argument("--latest-only", action="store_true", help="가장 최근 스냅샷만 읽기")
+
+    p_final = sub.add_parser("finalize", help="JSONL에서 최종 통합 JSON 생성")
+    p_final.add_argument("jsonl_path")
+    p_final.add_argument("out_path")
+
+    args = parser.parse_args()
+    if args.command == "migrate":
+        migrate_intermediate(args.intermediate_dir, args.jsonl_path, latest_only=args.latest_only)
+    else:
+        total = write_consolidated(args.jsonl_path, args.out_path)
+        print(f"통합 완료: {total}개 프레임 → {args.out_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""추적 결과 × 자막 × 얼굴 감정 × 샷/씬 시간 정렬 조인
+
+추적 CSV(all_tracking_results.csv / brighter_bbx_tracking.csv)의 모든 행에
+- 그 시각에 활성인 자막(brighter_llm_srt.csv)과 감정 valence,
+- 그 시각의 Azure 샷/씬 id,
+- track 단위 인물/얼굴 감정(emotion_tag_labeled.csv 또는 track_faces 결과)
+을 붙여 초 단위 마스터 테이블을 만든다. 자막/샷은 정렬된 구간 배열에서 searchsorted 로
+찾고, 추적 CSV 는 청크 단위로 읽고 써서 메모리를 제한한다. 출력 경로가 .parquet 이면
+(pyarrow 필요) 청크마다 row group 으로 추가한다.
+"""
+import ast
+
+import numpy as np
+import pandas as pd
+
+import instrument
+from intervals import IntervalSet
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+TIME_COLUMNS = ("time_sec", "sec")  # 실수 시각을 우선
+SUB_FIELDS = ["sub_id", "sub_text", "sub_emotions", "valence", "situation", "situation_type"]
+TRACK_LABEL_FIELDS = ["identity", "identity_score", "face_emotion", "face_emotion_score"]
+
+
+def _parse_list(value):
+    if isinstance(value, list):
+        return value
+    try:
+        parsed = ast.literal_eval(value) if isinstance(value, str) else []
+    except (ValueError, SyntaxError):
+        return []
+    return parsed if isinstance(parsed, list) else []
+
+
+def calc_valence(emotions, valence_map):
+    if not emotions:
+        return 0.5
+    scores = [valence_map.get(e.lower(), 0.5) for e in emotions]
+    return sum(scores) / len(scores)
+
+
+def load_subtitles(path, valence_map=None, subtitle_offset=0.0):
+    """Subtitle intervals plus a per-subtitle attribute table aligned with the interval order.
+
+    subtitle_offset (seconds) is added to every start/end, e.g. -9657 when the subtitles use
+    full-film time but the tracking CSV starts at 0 for a clip cut at 9657 s.
+    """
+    df = pd.read_csv(path)
+    emotions = df["emotions"].map(_parse_list) if "emotions" in df else pd.Series([[]] * len(df))
+    if "valence" not in df:
+        df["valence"] = [calc_valence(e, valence_map or {}) for e in emotions]
+    table = pd.DataFrame({
+        "sub_id": df["id"] if "id" in df else np.arange(len(df)),
+        "sub_text": df["text"],
+        "sub_emotions": emotions.map(lambda e: ",".join(e)),
+        "valence": df["valence"].astype(np.float32),
+        "situation": df.get("situation"),
+        "situation_type": df.get("situation_type"),
+    })
+    intervals = IntervalSet(df["start"].to_numpy() + subtitle_offset, df["end"].to_numpy() + subtitle_offset,
+                            owners=np.arange(len(df)))
+    # IntervalSet 은 시작 시각으로 정렬하므로 속성 표도 같은 순서로 맞춘다
+    return intervals, table.iloc[intervals.owners].reset_index(drop=True)
+
+
+def track_labels(path):
+    """Per-track identity/emotion from a track_faces result or a per-crop emotion_tag_labeled CSV."""
+    df = pd.read_csv(path)
+    if "track_id" in df:
+        return pd.DataFrame({
+            "track_id": df["track_id"], "identity": df["identity"], "identity_score": df["score"],
+            "face_emotion": df["emotion"], "face_emotion_score": df["emotion_score"],
+        })
+
+    from track_faces import CROP_NAME
+
+    df["track_id"] = df["image"].str.extract(CROP_NAME.pattern)[0].astype("Int64")
+    df = df.dropna(subset=["track_id"])
+    df["track_id"] = df["track_id"].astype(np.int64)
+    # 인물: "none" 이 아닌 라벨의 최빈값 (모두 none 이면 none), 감정: 최빈값
+    named = df[df["identity"] != "none"]
+    identity = (named.groupby(["track_id", "identity"]).size().rename("n").reset_index()
+                .sort_values(["track_id", "n"], ascending=[True, False]).drop_duplicates("track_id"))
+    identity = identity.merge(named.groupby(["track_id", "identity"])["score"].mean().reset_index(),
+                              on=["track_id", "identity"])
+    emotion = (df.groupby(["track_id", "emotion"]).size().rename("n").reset_index()
+               .sort_values(["track_id", "n"], ascending=[True, False]).drop_duplicates("track_id"))
+    emotion = emotion.merge(df.groupby(["track_id", "emotion"])["emotion_score"].mean().reset_index(),
+                            on=["track_id", "emotion"])
+    out = pd.DataFrame({"track_id": np.unique(df["track_id"])})
+    out = out.merge(identity[["track_id", "identity", "score"]], on="track_id", how="left")
+    out = out.merge(emotion[["track_id", "emotion", "emotion_score"]], on="track_id", how="left")
+    out["identity"] = out["identity"].fillna("none")
+    return out.rename(columns={"score": "identity_score", "emotion": "face_emotion",
+                               "emotion_score": "face_emotion_score"})
+
+
+def time_column(columns):
+    for name in TIME_COLUMNS:
+        if name in columns:
+            return name
+    raise KeyError(f"시간 열이 없습니다 (후보: {', '.join(TIME_COLUMNS)})")
+
+
+def attach(chunk, time_col, subs=None, azure=None, tracks=None):
+    """Vectorized joins for one chunk of tracking rows."""
+    times = chunk[time_col].to_numpy(dtype=np.float64)
+    if subs is not None:
+        intervals, table = subs
+        pos = intervals.locate(times)
+        hit = pos >= 0
+        idx = np.where(hit, pos, 0)
+        for name in SUB_FIELDS:
+            col = table[name].to_numpy()[idx] if len(table) else np.zeros(len(times))
+            # 자막이 없는 시각: 숫자 id 는 -1, 실수는 NaN, 나머지는 빈 값
+            missing = -1 if col.dtype.kind in "iu" else np.nan if col.dtype.kind == "f" else None
+            chunk[name] = np.where(hit, col, missing)
+    if azure is not None:
+        chunk["shot_id"] = azure.shot_at(times)
+        chunk["scene_id"] = azure.scene_at(times)
+    if tracks is not None:
+        chunk = chunk.merge(tracks, on="track_id", how="left")
+        chunk["identity"] = chunk["identity"].fillna("unknown")
+    return chunk
+
+
+def build_master_table(tracking_csv, out_csv, subtitles_csv=None, labels_csv=None, azure_json=None,
+                       valence_map=None, chunksize=500_000, subtitle_offset=0.0):
+    """Stream the tracking CSV in chunks and write the joined per-second master table; returns row count.
+
+    subtitle_offset shifts subtitle times onto the tracking clock (see load_subtitles).
+    """
+    subs = load_subtitles(subtitles_csv, valence_map, subtitle_offset) if subtitles_csv else None
+    tracks = track_labels(labels_csv) if labels_csv else None
+    azure = None
+    if azure_json:
+        from azure_index import AzureIndex
+        azure = AzureIndex.load(azure_json)
+
+    rows = 0
+    matched = 0
+    t_min, t_max = np.inf, -np.inf
+    writer = None
+    if out_csv.endswith(".parquet") and pq is None:
+        raise ImportError("Parquet 저장에는 pyarrow가 필요합니다 (.csv 경로를 쓰면 불필요)")
+    try:
+        chunks = instrument.timed_iter("read_ms", pd.read_csv(tracking_csv, chunksize=chunksize))
+        for i, chunk in enumerate(chunks):
+            with instrument.timer("join_ms"):
+                time_col = time_column(chunk.columns)
+                chunk = attach(chunk, time_col, subs=subs, azure=azure, tracks=tracks)
+            if subs is not None and len(chunk):
+                matched += int((chunk["sub_id"] >= 0).sum())
+                t_min, t_max = min(t_min, chunk[time_col].min()), max(t_max, chunk[time_col].max())
+            with instrument.timer("write_ms"):
+                if out_csv.endswith(".parquet"):
+                    # 문자열 열은 청크마다 전부 비어 있어도 같은 스키마가 되도록 string 으로 고정
+                    for name in chunk.columns[chunk.dtypes == object]:
+                        chunk[name] = chunk[name].astype("string")
+                    table = pa.Table.from_pandas(chunk, preserve_index=False)
+                    if writer is None:
+                        writer = pq.ParquetWriter(out_csv, table.schema)
+                    writer.write_table(table.cast(writer.schema))
+                else:
+                    # 대용량에서는 CSV 텍스트 변환이 조인보다 훨씬 느리다 — 가능하면 .parquet
+                    chunk.to_csv(out_csv, mode="w" if i == 0 else "a", header=i == 0, index=False)
+            rows += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    if subs is not None and rows and not matched and len(subs[0]):
+        # 자막이 영화 전체 시각이고 추적은 잘라낸 구간 기준인 경우가 흔하다 → subtitle_offset
+        print(f"[경고] 자막이 붙은 추적 행이 없습니다: 추적 {t_min:.0f}~{t_max:.0f}초, "
+              f"자막 {subs[0].starts.min():.0f}~{subs[0].ends.max():.0f}초 (subtitle_offset={subtitle_offset:g})")
+    return rows
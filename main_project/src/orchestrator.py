@@ -0,0 +1,656 @@
+"""여러 영화를 매니페스트로 받아 단계 의존 그래프로 처리하는 배치 오케스트레이터
+
+스크립트마다 하드코딩한 경로 대신 매니페스트(JSON) 한 장에 영화 목록을 적고, 영화마다
+아래 단계를 의존 순서대로 돌린다. 입력이 없는 단계는 그래프에서 빠진다 (자막이 없으면
+subtitles, 갤러리가 없으면 faces/emotion).
+
+    sample ──▶ track ──▶ faces ──▶ emotion ──┐
+                  └──────────────────────────┼──▶ merge
+    subtitles ───────────────────────────────┘
+
+- sample: 균등(초 단위) 또는 샷 단위 샘플링 계획 → plan.csv (프레임 캐시를 켜면 여기서 한 번 디코딩해 채움)
+- track: 계획 시각만 YOLO11-JDE + 추적기 → tracking.csv
+- faces: 추적 박스 윗부분 ROI 얼굴 검출 + 인물/감정 (face_pipeline.run_video) → faces.csv, crops/
+- emotion: track 당 인물/감정 집계 (track_faces.analyze_tracks) → track_labels.csv
+- subtitles: 구간 자막 LLM 태깅 (subtitle_tagger, 라벨 캐시 공유) → subtitles_tagged.csv
+- merge: 초 단위 마스터 테이블 (master_table) → master.csv (또는 .parquet)
+
+건너뛰기: 단계마다 입력 파일 내용 해시(영상/SRT/갤러리/가중치 + 앞 단계 출력) 와 단계 설정으로
+키를 만들어 <work>/<영화>/state.json 에 기록한다. 키가 같고 출력도 그대로면 다시 돌리지 않는다.
+앞 단계가 다시 돌아도 출력 내용이 같으면 뒤 단계는 건너뛴다. 파일 해시는 크기/수정 시각이
+같으면 <work>/hashes.json 의 값을 다시 쓴다.
+
+병렬/재시작: 단계는 각각 자식 프로세스(로그는 <work>/<영화>/logs/<단계>.log)로 돌고, 의존이
+끝난 단계를 --max-cpus / --max-mem-gb 안에서 영화를 가리지 않고 띄운다. 단계의 예상 자원은
+기본값(RESOURCES)을 매니페스트 "resources" 로 바꿀 수 있다 (GPU 하나를 나눠 쓰면 track 의 cpus 를
+--max-cpus 와 같게 두어 한 번에 하나만 돌게 한다). 상태는 단계가 끝날 때마다 원자적으로 저장하므로
+중간에 죽어도 같은 명령을 다시 실행하면 끝난 단계는 건너뛰고 이어서 한다. 실패한 단계의 뒤
+단계만 막히고 다른 영화는 계속 진행한다.
+
+매니페스트 예 (경로는 매니페스트 파일 기준 상대 경로 가능, API 키는 환경 변수로만):
+    {
+      "work_dir": "catalogue",
+      "frame_cache": "frame_cache",
+      "defaults": {"weights": "yolo11_jde/weights/YOLO11s_JDE-CHMOT17-64b-100e_TBHS_m075_1280px.pt",
+                   "sample": {"sampling": "shots"},
+                   "subtitles": {"api_key_env": "GROQ_API_KEY"}},
+      "films": [
+        {"name": "cure", "video": "data/raw/Cure_1997.mp4", "srt": "data/raw/Cure_1997_en.srt",
+         "start": 109, "end": 349},
+        {"name": "brighter", "video": "data/raw/brighter_part3.mp4", "azure": "data/raw/azure.json",
+         "srt": "data/raw/A.Brighter.Summer.Day.srt", "subtitle_offset": -9657,
+         "gallery": "data/gallery/ds_model_arcface_detector_retinaface_aligned_normalization_base_expand_0.pkl"}
+      ]
+    }
+
+start/end 는 영상 기준 시각이다. 자막이 영화 전체 시각이고 영상이 잘라낸 클립이면 subtitle_offset
+(자막 시각에 더할 초, 예: 9657초부터 자른 part3 는 -9657) 을 적는다. 자막 구간을 고를 때와 마스터
+테이블 조인 때 모두 적용되고 건너뛰기 키에도 들어간다.
+
+사용법:
+    python orchestrator.py <매니페스트.json> [--work-dir 폴더] [--max-cpus N] [--max-mem-gb GB]
+        [--films cure,brighter] [--only track,faces] [--force merge] [--dry-run]
+"""
+import argparse
+import fcntl
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import instrument
+
+STAGE_ORDER = ["sample", "track", "faces", "emotion", "subtitles", "merge"]
+DEPS = {
+    "sample": [],
+    "track": ["sample"],
+    "faces": ["track"],
+    "emotion": ["faces"],
+    "subtitles": [],
+    "merge": ["track"],
+}
+OPTIONAL_DEPS = {"merge": ["emotion", "subtitles"]}  # 그래프에 있을 때만 기다린다
+NEEDS = {  # 영화 항목에 이 경로가 있어야 단계가 생긴다
+    "sample": ["video"],
+    "track": ["video", "weights"],
+    "faces": ["video", "gallery"],
+    "emotion": ["gallery"],
+    "subtitles": ["srt"],
+    "merge": [],
+}
+FILE_INPUTS = {  # 키에 내용 해시로 들어가는 영화 입력 (앞 단계 출력은 자동으로 들어간다)
+    "sample": ["video", "azure"],
+    "track": ["video", "weights"],
+    "faces": ["video", "gallery"],
+    "emotion": ["gallery"],
+    "subtitles": ["srt"],
+    "merge": ["azure"],
+}
+WINDOW_STAGES = {"sample", "faces", "subtitles"}  # start/end 가 결과를 바꾸는 단계
+OUTPUTS = {
+    "sample": {"plan": "plan.csv"},
+    "track": {"tracking": "tracking.csv"},
+    "faces": {"faces": "faces.csv"},
+    "emotion": {"labels": "track_labels.csv"},
+    "subtitles": {"subtitles": "subtitles_tagged.csv"},
+    "merge": {"master": "master.csv"},
+}
+STAGE_VERSION = {name: 1 for name in STAGE_ORDER}  # 단계 코드의 출력이 바뀌면 올린다
+RESOURCES = {  # (cpus, mem_gb)
+    "sample": (1, 1.0),
+    "track": (4, 4.0),
+    "faces": (2, 4.0),
+    "emotion": (2, 3.0),
+    "subtitles": (1, 0.5),
+    "merge": (1, 2.0),
+}
+PATH_KEYS = ("video", "srt", "azure", "gallery", "weights")
+# Azure 기준 감정 점수 (0608(2).emotion_analysis_groq.py 와 같은 값): 자막 태깅 라벨 목록이자 valence 표
+DEFAULT_VALENCE = {"happiness": 1.00, "surprise": 0.70, "neutral": 0.50, "contempt": 0.45,
+                   "disgust": 0.40, "sadness": 0.30, "anger": 0.25, "fear": 0.10}
+POLL_SEC = 0.2
+
+
+# --- 매니페스트 ---
+
+def _merge(defaults, film):
+    merged = dict(defaults)
+    for key, value in film.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = {**merged[key], **value}
+        else:
+            merged[key] = value
+    return merged
+
+
+def load_manifest(path, work_dir=None):
+    """Read a manifest; returns its settings with film entries merged over defaults and absolute paths.
+
+    Raises ValueError listing every input path that does not exist, before any stage runs.
+    """
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    base = os.path.dirname(os.path.abspath(path))
+
+    def resolve(p):
+        return os.path.normpath(os.path.join(base, p)) if p else p
+
+    films, names, missing = [], set(), []
+    for raw in data["films"]:
+        film = _merge(data.get("defaults", {}), raw)
+        for key in PATH_KEYS:
+            film[key] = resolve(film.get(key))
+        if not film.get("video") and not film.get("srt"):
+            raise ValueError(f"영화 항목에 video 나 srt 가 필요합니다: {raw}")
+        film.setdefault("name", os.path.splitext(os.path.basename(film.get("video") or film["srt"]))[0])
+        missing.extend(f"{film['name']}.{key}: {film[key]}" for key in PATH_KEYS
+                       if film.get(key) and not os.path.isfile(film[key]))
+        if film["name"] in names:
+            raise ValueError(f"매니페스트에 같은 이름의 영화가 두 번 있습니다: {film['name']}")
+        names.add(film["name"])
+        films.append(film)
+    if missing:
+        raise ValueError("매니페스트의 입력 파일이 없습니다:\n  " + "\n  ".join(missing))
+    return {
+        "work_dir": os.path.abspath(work_dir) if work_dir else resolve(data.get("work_dir", "catalogue")),
+        "frame_cache": resolve(data.get("frame_cache")),
+        "frame_cache_gb": data.get("frame_cache_gb"),
+        "resources": {**RESOURCES, **{k: tuple(v) for k, v in data.get("resources", {}).items()}},
+        "films": films,
+    }
+
+
+def film_stages(film):
+    """Stage name -> dependency list for one film, dropping stages whose inputs are missing."""
+    graph = {}
+    for stage in STAGE_ORDER:
+        if any(not film.get(key) for key in NEEDS[stage]) or any(dep not in graph for dep in DEPS[stage]):
+            continue
+        graph[stage] = DEPS[stage] + [dep for dep in OPTIONAL_DEPS.get(stage, []) if dep in graph]
+    return graph
+
+
+def film_paths(film, work_dir):
+    """Output paths of a film's stages inside <work_dir>/<name>/."""
+    film_dir = os.path.join(work_dir, film["name"])
+    paths = {name: os.path.join(film_dir, file) for outputs in OUTPUTS.values() for name, file in outputs.items()}
+    if film.get("merge", {}).get("format") == "parquet":
+        paths["master"] = os.path.join(film_dir, "master.parquet")
+    paths["crops"] = os.path.join(film_dir, "crops")
+    paths["label_cache"] = os.path.join(work_dir, "subtitle_labels.sqlite")
+    return paths
+
+
+def stage_params(film, stage):
+    """Settings that change a stage's output (part of its skip key)."""
+    params = dict(film.get(stage, {}))
+    if stage in WINDOW_STAGES:
+        params.update(start=film.get("start"), end=film.get("end"))
+    if stage in ("subtitles", "merge"):
+        params["valence"] = film.get("valence", DEFAULT_VALENCE)
+        params["subtitle_offset"] = film.get("subtitle_offset", 0)
+    if stage == "subtitles":
+        # 어느 키/주소로 보냈는지는 결과와 무관하다
+        params = {k: v for k, v in params.items() if k not in ("api_key_env", "api_base", "concurrency")}
+    return params
+
+
+# --- 상태 / 해시 ---
+
+def file_hash(path, work_dir):
+    """Content sha256 of a file, memoized in <work_dir>/hashes.json by size and mtime."""
+    from frame_cache import video_hash
+
+    return video_hash(path, root=work_dir)
+
+
+def stage_key(film, stage, dep_outputs, work_dir):
+    """Hash of a stage's version, settings, input file contents and upstream output contents."""
+    inputs = {key: file_hash(film[key], work_dir) for key in FILE_INPUTS[stage] if film.get(key)}
+    inputs.update(dep_outputs)
+    blob = json.dumps({"stage": stage, "version": STAGE_VERSION[stage], "params": stage_params(film, stage),
+                       "inputs": inputs}, sort_keys=True, default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def _state_path(work_dir, name):
+    return os.path.join(work_dir, name, "state.json")
+
+
+def load_state(work_dir, name):
+    try:
+        with open(_state_path(work_dir, name), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"film": name, "stages": {}}
+
+
+def save_state(work_dir, state):
+    """Write state.json through a temp file and rename so a crash never leaves it half written."""
+    path = _state_path(work_dir, state["film"])
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+
+def output_hashes(stage, paths, work_dir):
+    return {f"{stage}.{name}": file_hash(paths[name], work_dir) for name in OUTPUTS[stage]}
+
+
+def up_to_date(entry, key, stage, paths, work_dir):
+    """True if the recorded run has the same key and its outputs are still the files it produced."""
+    if not entry or entry.get("status") != "done" or entry.get("key") != key:
+        return False
+    if any(not os.path.exists(paths[name]) for name in OUTPUTS[stage]):
+        return False
+    return output_hashes(stage, paths, work_dir) == entry.get("outputs")
+
+
+# --- 단계 (자식 프로세스에서 실행) ---
+
+def _plan_times(plan_csv):
+    import pandas as pd
+
+    return pd.read_csv(plan_csv)["time_sec"].tolist()
+
+
+def run_sample(film, paths):
+    import numpy as np
+    import pandas as pd
+
+    from frame_source import FRAME_CACHE_DIR, video_info
+
+    cfg = film.get("sample", {})
+    start = film.get("start") or 0
+    end = film.get("end")
+    if end is None:
+        end = video_info(film["video"])["duration"]
+    if cfg.get("sampling", "uniform") == "shots":
+        from sampling_plan import build_plan
+
+        kwargs = {k: v for k, v in cfg.items() if k not in ("sampling", "frame_budget", "step")}
+        times, shot_ids, starts, _, source = build_plan(film["video"], start, end, cfg.get("frame_budget"),
+                                                        azure_json=film.get("azure"), **kwargs)
+        print(f"샷 {len(starts)}개 ({source}) → 샘플 {len(times)}프레임")
+    else:
+        times = np.arange(start, end, cfg.get("step", 1))
+        shot_ids = np.full(len(times), -1)
+        print(f"{cfg.get('step', 1)}초 간격 → 샘플 {len(times)}프레임")
+    pd.DataFrame({"time_sec": np.round(times, 3), "shot_id": shot_ids}).to_csv(paths["plan"], index=False)
+
+    if FRAME_CACHE_DIR:
+        from frame_cache import FrameCache
+
+        n = FrameCache(film["video"], FRAME_CACHE_DIR).fill(list(times))
+        print(f"프레임 캐시 {n}/{len(times)}프레임 → {FRAME_CACHE_DIR}")
+
+
+def run_track(film, paths):
+    from ultralytics import YOLO
+
+    from chunked_tracking import ROW_FIELDS
+    from frame_source import iter_frames
+    from pipeline import CsvRowWriter, background_iter
+    from tracking import DEFAULT_BATCH_SIZE, DEFAULT_TRACKER, result_boxes, track_batches
+
+    cfg = film.get("track", {})
+    times = _plan_times(paths["plan"])
+    model = YOLO(film["weights"], task=cfg.get("task", "jde"))
+    writer = CsvRowWriter(paths["tracking"], ROW_FIELDS)
+    stats, received = {}, 0
+    frames = background_iter(iter_frames(film["video"], times), maxsize=cfg.get("decode_queue_size", 16))
+    for sec, _, _, result in track_batches(model, frames, batch_size=cfg.get("batch_size", DEFAULT_BATCH_SIZE),
+                                           tracker=cfg.get("tracker", DEFAULT_TRACKER), stats=stats):
+        received += 1
+        if result is None:
+            continue
+        boxes, track_ids = result_boxes(result)
+        writer.write_rows([{"sec": int(sec), "time_sec": round(float(sec), 3), "track_id": int(track_id),
+                            "x": float(x), "y": float(y), "w": float(w), "h": float(h)}
+                           for (x, y, w, h), track_id in zip(boxes.tolist(), track_ids)])
+    writer.close()
+    if received < len(times):
+        print(f"[경고] {times[received]:.2f}초부터 프레임을 읽을 수 없음")
+    print(f"프레임 {received}개, 추론 {stats.get('infer_sec', 0.0):.1f}s → {paths['tracking']} "
+          f"({writer.rows_written}행)")
+
+
+def run_faces(film, paths):
+    import shutil
+
+    from face_pipeline import run_video
+
+    cfg = dict(film.get("faces", {}))
+    # 이전 실행의 크롭이 남아 있으면 emotion 단계가 섞어 읽는다
+    shutil.rmtree(paths["crops"], ignore_errors=True)
+    run_video(film["video"], paths["tracking"], film["gallery"], paths["faces"], save_crops=paths["crops"],
+              start=film.get("start"), end=film.get("end"), top_fraction=cfg.pop("top_fraction", None),
+              max_side=cfg.pop("max_side", None), **cfg)
+
+
+def run_emotion(film, paths):
+    from track_faces import analyze_tracks
+
+    analyze_tracks(paths["crops"], film["gallery"], paths["labels"], detect=False, **film.get("emotion", {}))
+
+
+def run_subtitles(film, paths):
+    import pandas as pd
+
+    from label_cache import LabelCache
+    from subtitle_tagger import DEFAULT_MODEL, AsyncSubtitleTagger, make_client, suggest_batch_size, tag_subtitles
+    from subtitles import load_srt
+
+    cfg = film.get("subtitles", {})
+    key_env = cfg.get("api_key_env", "GROQ_API_KEY")
+    api_key = os.environ.get(key_env)
+    if not api_key:
+        raise RuntimeError(f"환경 변수 {key_env} 에 API 키가 없습니다")
+
+    track = load_srt(film["srt"])
+    if film.get("start") is None and film.get("end") is None:
+        subs = track.records()
+    else:
+        # start/end 는 영상 시각이고 SRT 는 subtitle_offset 만큼 앞선 시각 (출력은 SRT 시각 그대로)
+        offset = film.get("subtitle_offset", 0)
+        end = film["end"] if film.get("end") is not None else float("inf")
+        subs = track.window((film.get("start") or 0) - offset, end - offset)
+    valence = film.get("valence", DEFAULT_VALENCE)
+    tagger = AsyncSubtitleTagger(make_client(api_key, cfg.get("api_base", "https://api.groq.com/openai/v1")),
+                                 list(valence), model=cfg.get("model", DEFAULT_MODEL), rpm=cfg.get("rpm", 30),
+                                 tpm=cfg.get("tpm"), concurrency=cfg.get("concurrency", 8),
+                                 cache=LabelCache(paths["label_cache"]))
+    size = cfg.get("batch_size") or suggest_batch_size([sub["text"] for sub in subs], tagger.emotion_labels,
+                                                       tpm=cfg.get("tpm"))
+    labeled = tag_subtitles(subs, tagger, batch_size=size)
+    print(f"자막 {len(subs)}줄, API 요청 {tagger.stats['requests']}회 (배치 {size}줄씩), "
+          f"캐시 적중 {tagger.cache.stats['hits']}줄")
+    tagger.cache.close()
+    columns = ["id", "start", "end", "text", "emotions", "situation", "situation_type"]
+    pd.DataFrame(labeled, columns=columns).to_csv(paths["subtitles"], index=False)
+
+
+def run_merge(film, paths, deps):
+    from master_table import build_master_table
+
+    rows = build_master_table(paths["tracking"], paths["master"],
+                              subtitles_csv=paths["subtitles"] if "subtitles" in deps else None,
+                              labels_csv=paths["labels"] if "emotion" in deps else None,
+                              azure_json=film.get("azure"), valence_map=film.get("valence", DEFAULT_VALENCE),
+                              subtitle_offset=film.get("subtitle_offset", 0))
+    print(f"마스터 테이블 {rows}행 → {paths['master']}")
+
+
+STAGE_FUNCS = {"sample": run_sample, "track": run_track, "faces": run_faces, "emotion": run_emotion,
+               "subtitles": run_subtitles}
+
+
+def _exit_with_parent(parent_pid):
+    # 오케스트레이터가 강제 종료되면 남은 단계도 끝낸다 (재실행한 오케스트레이터와 같은 출력을 쓰지 않게)
+    while os.getppid() == parent_pid:
+        time.sleep(1.0)
+    os._exit(1)
+
+
+def run_child(spec_path):
+    """Entry point of a stage subprocess: run one stage of one film from its spec file."""
+    import threading
+
+    threading.Thread(target=_exit_with_parent, args=(os.getppid(),), daemon=True).start()
+    with open(spec_path, encoding="utf-8") as f:
+        spec = json.load(f)
+    film, stage = spec["film"], spec["stage"]
+    instrument.start_run(f"{film['name']}_{stage}")
+    print(f"[{film['name']}] {stage} 시작 ({datetime.now().isoformat(timespec='seconds')})", flush=True)
+    if stage == "merge":
+        run_merge(film, spec["paths"], spec["deps"])
+    else:
+        STAGE_FUNCS[stage](film, spec["paths"])
+
+
+# --- 스케줄러 ---
+
+def _log_tail(path, n=5):
+    try:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            return "".join(f.readlines()[-n:]).strip()
+    except OSError:
+        return ""
+
+
+class Scheduler:
+    """Run the stage graphs of several films with CPU/memory admission and content-hash skipping."""
+
+    def __init__(self, manifest, max_cpus=None, max_mem_gb=None, only=None, force=(), dry_run=False):
+        self.manifest = manifest
+        self.work_dir = manifest["work_dir"]
+        self.max_cpus = max_cpus or os.cpu_count() or 1
+        self.max_mem_gb = max_mem_gb or _default_mem_gb()
+        self.only = set(only) if only else None
+        self.force = set(force)
+        self.dry_run = dry_run
+        self.films = {film["name"]: film for film in manifest["films"]}
+        self.graphs = {name: film_stages(film) for name, film in self.films.items()}
+        self.paths = {name: film_paths(film, self.work_dir) for name, film in self.films.items()}
+        self.states = {name: load_state(self.work_dir, name) for name in self.films}
+        self.status = {(name, stage): "waiting" for name, graph in self.graphs.items() for stage in graph}
+        self.reasons = {}
+        self.keys = {}
+        self.running = {}
+
+    def _env(self, cpus):
+        env = dict(os.environ)
+        if self.manifest["frame_cache"]:
+            env["CINEMA_FRAME_CACHE"] = self.manifest["frame_cache"]
+        if self.manifest["frame_cache_gb"] is not None:
+            env["CINEMA_FRAME_CACHE_GB"] = str(self.manifest["frame_cache_gb"])
+        # 단계가 자기 몫보다 많은 스레드를 잡지 않게 한다
+        for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+            env.setdefault(var, str(int(cpus)))
+        return env
+
+    def _dep_outputs(self, name, stage):
+        outputs = {}
+        for dep in self.graphs[name][stage]:
+            outputs.update(self.states[name]["stages"][dep]["outputs"])
+        return outputs
+
+    def _resources(self, stage):
+        cpus, mem_gb = self.manifest["resources"][stage]
+        # 한도보다 큰 단계도 혼자서는 돌 수 있게 한다
+        return min(cpus, self.max_cpus), min(mem_gb, self.max_mem_gb)
+
+    def _resolve(self, task):
+        """Move a waiting task to blocked/skipped/ready once its dependencies have finished."""
+        name, stage = task
+        deps = self.graphs[name][stage]
+        dep_status = [self.status[(name, dep)] for dep in deps]
+        if any(s in ("failed", "blocked") for s in dep_status):
+            self.status[task] = "blocked"
+            self.reasons[task] = "앞 단계 실패"
+            return
+        if self.dry_run and "planned" in dep_status:
+            self.status[task] = "planned"
+            self.reasons[task] = "앞 단계를 다시 돌림"
+            return
+        if any(s not in ("done", "skipped") for s in dep_status):
+            return
+        entry = self.states[name]["stages"].get(stage)
+        try:
+            key = stage_key(self.films[name], stage, self._dep_outputs(name, stage), self.work_dir)
+            current = up_to_date(entry, key, stage, self.paths[name], self.work_dir)
+        except OSError as e:
+            # 실행 중에 입력이 사라지거나 읽을 수 없게 돼도 이 영화의 뒤 단계만 막는다
+            self.status[task] = "failed"
+            self.reasons[task] = f"입력을 읽을 수 없음: {e.filename or e}"
+            print(f"[{name}] {stage} 실패 — {self.reasons[task]}")
+            if not self.dry_run:
+                self.states[name]["stages"][stage] = {"status": "failed", "error": self.reasons[task],
+                                                      "finished": datetime.now().isoformat(timespec="seconds")}
+                save_state(self.work_dir, self.states[name])
+            return
+        if stage not in self.force and current:
+            self.status[task] = "skipped"
+        elif self.only is not None and stage not in self.only:
+            self.status[task] = "blocked"
+            self.reasons[task] = "입력이 바뀌었지만 --only 에 없음"
+        elif self.dry_run:
+            self.status[task] = "planned"
+            self.reasons[task] = "처음 실행" if not entry else "입력/설정 변경" if entry.get("key") != key else "다시 실행"
+        else:
+            self.status[task] = "ready"
+            self.keys[task] = key
+
+    def _launch(self, task):
+        name, stage = task
+        cpus, mem_gb = self._resources(stage)
+        log_dir = os.path.join(self.work_dir, name, "logs")
+        os.makedirs(log_dir, exist_ok=True)
+        spec_path = os.path.join(log_dir, f"{stage}.spec.json")
+        with open(spec_path, "w", encoding="utf-8") as f:
+            json.dump({"film": self.films[name], "stage": stage, "paths": self.paths[name],
+                       "deps": self.graphs[name][stage]}, f, ensure_ascii=False, indent=2)
+        log_path = os.path.join(log_dir, f"{stage}.log")
+        with open(log_path, "w", encoding="utf-8") as log:
+            proc = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--child", spec_path],
+                                    stdout=log, stderr=subprocess.STDOUT, env=self._env(cpus),
+                                    cwd=self.work_dir)
+        self.running[task] = {"proc": proc, "key": self.keys.pop(task), "cpus": cpus, "mem_gb": mem_gb,
+                              "t0": time.perf_counter(), "log": log_path}
+        self.status[task] = "running"
+        print(f"[{name}] {stage} 시작 (cpus {cpus}, mem {mem_gb:g}GB) → {log_path}")
+
+    def _finish(self, task, returncode):
+        name, stage = task
+        run = self.running.pop(task)
+        elapsed = time.perf_counter() - run["t0"]
+        paths = self.paths[name]
+        entry = {"key": run["key"], "finished": datetime.now().isoformat(timespec="seconds"),
+                 "elapsed_sec": round(elapsed, 2), "log": run["log"]}
+        if returncode == 0 and all(os.path.exists(paths[n]) for n in OUTPUTS[stage]):
+            entry.update(status="done", outputs=output_hashes(stage, paths, self.work_dir))
+            self.status[task] = "done"
+            print(f"[{name}] {stage} 완료 ({elapsed:.1f}s)")
+        else:
+            entry.update(status="failed", returncode=returncode, error=_log_tail(run["log"]))
+            self.status[task] = "failed"
+            print(f"[{name}] {stage} 실패 (종료 코드 {returncode}, {elapsed:.1f}s) — {run['log']}")
+        self.states[name]["stages"][stage] = entry
+        save_state(self.work_dir, self.states[name])
+
+    def _fits(self, stage):
+        if not self.running:
+            return True
+        cpus, mem_gb = self._resources(stage)
+        used_cpus = sum(r["cpus"] for r in self.running.values())
+        used_mem = sum(r["mem_gb"] for r in self.running.values())
+        return used_cpus + cpus <= self.max_cpus and used_mem + mem_gb <= self.max_mem_gb
+
+    def run(self):
+        """Run until every stage is done, skipped, failed or blocked; returns the status map."""
+        try:
+            while True:
+                for task, run in list(self.running.items()):
+                    returncode = run["proc"].poll()
+                    if returncode is not None:
+                        self._finish(task, returncode)
+                # 영화마다 단계 순서대로 해소하므로 한 번의 순회로 의존이 끝난 단계까지 풀린다
+                for task, status in list(self.status.items()):
+                    if status == "waiting":
+                        self._resolve(task)
+                for task, status in list(self.status.items()):
+                    if status == "ready" and self._fits(task[1]):
+                        self._launch(task)
+                if not self.running:
+                    break
+                time.sleep(POLL_SEC)
+        except KeyboardInterrupt:
+            print("중단: 실행 중인 단계를 종료합니다 (다시 실행하면 끝난 단계는 건너뜀)")
+            for run in self.running.values():
+                run["proc"].terminate()
+            for run in self.running.values():
+                run["proc"].wait()
+            raise
+        return self.status
+
+    def summary(self):
+        """Print one line per film with the outcome of each stage."""
+        for name, graph in self.graphs.items():
+            parts = []
+            for stage in graph:
+                status = self.status[(name, stage)]
+                reason = self.reasons.get((name, stage)) if status in ("blocked", "planned", "failed") else None
+                parts.append(f"{stage}={status}" + (f" ({reason})" if reason else ""))
+            print(f"  {name}: " + ", ".join(parts))
+
+
+def _default_mem_gb():
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") / 2 ** 30 * 0.75
+    except (ValueError, OSError, AttributeError):
+        return 8.0
+
+
+def _split(value):
+    return [v for v in value.split(",") if v] if value else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="매니페스트의 영화들을 단계 의존 그래프로 처리하는 배치 오케스트레이터")
+    parser.add_argument("manifest", nargs="?")
+    parser.add_argument("--work-dir", default=None, help="결과/상태 폴더 (기본: 매니페스트의 work_dir)")
+    parser.add_argument("--max-cpus", type=float, default=None, help="동시에 쓸 CPU 수 (기본: 코어 수)")
+    parser.add_argument("--max-mem-gb", type=float, default=None, help="동시에 쓸 메모리 (기본: 물리 메모리의 75%%)")
+    parser.add_argument("--films", default=None, help="처리할 영화 이름 (쉼표 구분)")
+    parser.add_argument("--only", default=None, help="돌릴 단계 (쉼표 구분, 나머지는 최신일 때만 통과)")
+    parser.add_argument("--force", default=None, help="해시가 같아도 다시 돌릴 단계 (쉼표 구분)")
+    parser.add_argument("--dry-run", action="store_true", help="실행하지 않고 단계별로 건너뛸지/돌릴지만 출력")
+    parser.add_argument("--child", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child)
+        return
+    if not args.manifest:
+        parser.error("매니페스트 경로가 필요합니다")
+
+    try:
+        manifest = load_manifest(args.manifest, args.work_dir)
+    except ValueError as e:
+        sys.exit(str(e))
+    films = _split(args.films)
+    if films:
+        unknown = set(films) - {film["name"] for film in manifest["films"]}
+        if unknown:
+            parser.error(f"매니페스트에 없는 영화: {', '.join(sorted(unknown))}")
+        manifest["films"] = [film for film in manifest["films"] if film["name"] in films]
+    for stages in (_split(args.only), _split(args.force)):
+        if stages and set(stages) - set(STAGE_ORDER):
+            parser.error(f"단계 이름은 {', '.join(STAGE_ORDER)} 중 하나여야 합니다")
+
+    os.makedirs(manifest["work_dir"], exist_ok=True)
+    lock = open(os.path.join(manifest["work_dir"], ".orchestrator.lock"), "w")
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        sys.exit(f"다른 오케스트레이터가 {manifest['work_dir']} 를 쓰고 있습니다")
+
+    scheduler = Scheduler(manifest, args.max_cpus, args.max_mem_gb, only=_split(args.only),
+                          force=_split(args.force) or (), dry_run=args.dry_run)
+    print(f"영화 {len(scheduler.films)}편, 단계 {len(scheduler.status)}개 "
+          f"(CPU {scheduler.max_cpus:g}, 메모리 {scheduler.max_mem_gb:.1f}GB) → {manifest['work_dir']}")
+    t0 = time.perf_counter()
+    status = scheduler.run()
+    print(f"{'계획' if args.dry_run else '완료'} ({time.perf_counter() - t0:.1f}s)")
+    scheduler.summary()
+    if any(s in ("failed", "blocked") for s in status.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
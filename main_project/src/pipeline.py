@@ -0,0 +1,136 @@
+"""단계별 파이프라인 보조: 크기가 제한된 큐로 연결된 읽기 스레드와 쓰기 스레드 풀
+
+디코딩(읽기 스레드) → 추론(메인 루프) → JPEG 인코딩/CSV 기록(쓰기 풀) 순서로 나누고,
+각 단계 사이의 큐 크기를 제한해 앞 단계가 너무 앞서 나가면 멈추도록(backpressure) 한다.
+"""
+import csv
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+
+import instrument
+
+_DONE = object()
+
+
+class _ReaderError:
+    def __init__(self, exc):
+        self.exc = exc
+
+
+def background_iter(iterable, maxsize=16):
+    """Consume iterable in a reader thread and yield its items through a bounded queue.
+
+    The reader blocks while the queue is full. Exceptions raised by the iterable
+    are re-raised in the consumer; closing the generator stops the reader.
+    """
+    q = queue.Queue(maxsize=maxsize)
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def reader():
+        try:
+            for item in iterable:
+                if not put(item):
+                    return
+        except BaseException as e:
+            put(_ReaderError(e))
+        finally:
+            put(_DONE)
+
+    thread = threading.Thread(target=reader, name="frame-reader", daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = q.get()
+            if item is _DONE:
+                break
+            if isinstance(item, _ReaderError):
+                raise item.exc
+            yield item
+    finally:
+        stop.set()
+        thread.join()
+
+
+class WriterPool:
+    """Thread pool whose submit() blocks once max_pending tasks are outstanding."""
+
+    def __init__(self, max_workers=4, max_pending=64, name="writer"):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._errors = []
+
+    def submit(self, fn, *args, **kwargs):
+        self._slots.acquire()
+        try:
+            future = self._executor.submit(fn, *args, **kwargs)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(self._on_done)
+        return future
+
+    def _on_done(self, future):
+        self._slots.release()
+        if future.exception() is not None:
+            self._errors.append(future.exception())
+
+    def close(self):
+        """Wait for pending tasks and re-raise the first task error, if any."""
+        self._executor.shutdown(wait=True)
+        if self._errors:
+            raise self._errors[0]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self._executor.shutdown(wait=True)
+            return False
+        self.close()
+        return False
+
+
+@instrument.timed("jpg_encode_ms")
+def encode_jpg(img):
+    """Encode a BGR image to JPEG bytes (same default quality as cv2.imwrite)."""
+    success, buf = cv2.imencode(".jpg", img)
+    if not success:
+        raise ValueError("JPEG 인코딩 실패")
+    return buf.tobytes()
+
+
+@instrument.timed("crop_write_ms")
+def write_bytes(path, data):
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+class CsvRowWriter:
+    """Append dict rows to a CSV file as they are produced."""
+
+    def __init__(self, path, fieldnames):
+        self._file = open(path, "w", newline="", encoding="utf-8")
+        self._writer = csv.DictWriter(self._file, fieldnames=fieldnames)
+        self._writer.writeheader()
+        self.rows_written = 0
+
+    @instrument.timed("csv_write_ms")
+    def write_rows(self, rows):
+        self._writer.writerows(rows)
+        self.rows_written += len(rows)
+
+    def close(self):
+        self._file.close()
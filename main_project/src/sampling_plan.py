@@ -0,0 +1,200 @@
+"""샷 단위 적응형 샘플링 계획
+
+1초마다 한 프레임씩 뽑으면 40초짜리 정적인 롱테이크는 40번 추론하고, 0.5초 컷이 이어지는
+구간은 샷을 통째로 놓친다. 여기서는 영화의 샷 경계를 먼저 구한 뒤
+- 모든 샷에서 최소 한 프레임 (짧은 샷도 빠지지 않게),
+- 움직임이 많은 샷은 촘촘하게(min_gap), 정적인 샷은 듬성듬성(max_gap),
+- 샷 안에서는 컷 직후/직전이 더 촘촘한 코사인 간격
+으로 시각을 고르고, 전체 프레임 수가 budget 을 넘지 않도록 밀도를 한 번에 줄인다.
+
+샷 경계와 움직임 정도는 azure.json 이 있으면 Azure 샷/키프레임(키프레임이 많은 샷 = 변화가 많은
+샷)에서, 없으면 저해상도 그래디언트 해시로 영상을 훑는 간단한 컷 검출기에서 얻는다.
+시각은 실수 초로 다루므로 결과 CSV 에는 time_sec 열을 함께 남긴다.
+
+사용법:
+    python sampling_plan.py <영상> [--azure azure.json] [--start 0] [--end 초] [--budget 프레임 수]
+        [--out plan.csv]
+"""
+import argparse
+import math
+import os
+
+import numpy as np
+
+from frame_source import iter_frames, video_info
+from leading_lines_dedup import frame_signature, signature_distance
+
+DEFAULT_MIN_GAP = 0.25   # 움직임이 가장 많은 샷의 샘플 간격(초)
+DEFAULT_MAX_GAP = 8.0    # 정적인 샷의 최대 샘플 간격(초)
+CUT_OFFSET = 0.2         # 컷 바로 위(디졸브/모션 블러)를 피해 샷 시작에서 띄우는 시간(초)
+DEFAULT_PROBE_FPS = 2.0
+DEFAULT_CUT_THRESHOLD = 0.3
+PROBE_WIDTH = 320        # 컷 검출은 축소 프레임으로 충분 (프레임 캐시를 켜면 w320 tier 로 공유)
+
+
+def shots_from_azure(azure_json, start=0.0, end=None):
+    """(starts, ends, motion in [0, 1]) of the Azure shots overlapping [start, end)."""
+    from azure_index import AzureIndex
+
+    index = AzureIndex.load(azure_json)
+    shots = index["shots"]
+    end = shots.ends.max() if end is None else end
+    keep = (shots.ends > start) & (shots.starts < end)
+    starts = np.maximum(shots.starts[keep], start)
+    ends = np.minimum(shots.ends[keep], end)
+    # 키프레임이 많이 뽑힌 샷일수록 화면 변화가 크다고 보고 초당 키프레임 수를 움직임 지표로 쓴다
+    per_shot = index.keyframes_per_shot()
+    counts = np.array([per_shot.get(int(i), 0) for i in shots.owners[keep]], dtype=np.float64)
+    rate = counts / np.maximum(shots.ends[keep] - shots.starts[keep], 1e-3)
+    motion = rate / rate.max() if len(rate) and rate.max() > 0 else np.zeros(len(rate))
+    return starts, ends, motion
+
+
+def detect_shots(video_path, start, end, probe_fps=DEFAULT_PROBE_FPS, cut_threshold=DEFAULT_CUT_THRESHOLD):
+    """Cheap local cut detector: gradient-hash distance between probes spaced 1/probe_fps apart.
+
+    Returns (starts, ends, motion) like shots_from_azure; motion is the mean probe-to-probe
+    distance inside the shot relative to the cut threshold. A run of consecutive large
+    distances (fast motion or rapid cuts) becomes one high-motion segment.
+    """
+    times = np.arange(start, end, 1.0 / probe_fps)
+    probe_times, dists = [], []
+    prev = None
+    for sec, _, frame in iter_frames(video_path, times.tolist(), width=PROBE_WIDTH):
+        signature = frame_signature(frame)
+        probe_times.append(sec)
+        dists.append(0.0 if prev is None else signature_distance(signature, prev))
+        prev = signature
+    if not probe_times:
+        return np.array([start]), np.array([end]), np.zeros(1)
+
+    probe_times, dists = np.asarray(probe_times), np.asarray(dists)
+    # 연속으로 큰 차이가 나는 구간(빠른 팬/연속 컷)은 컷 여러 개가 아니라 움직임이 큰 구간 하나로:
+    # 그 구간의 처음과 끝만 경계로 둔다
+    high = dists > cut_threshold
+    prev_high = np.concatenate([[False], high[:-1]])
+    next_high = np.concatenate([high[1:], [False]])
+    cut_at = np.union1d(np.flatnonzero(high & ~prev_high), np.flatnonzero(high & ~next_high))
+    # 컷은 두 탐침 사이 어딘가: 가운데를 경계로 둔다
+    bounds = np.concatenate([[start], (probe_times[cut_at - 1] + probe_times[cut_at]) / 2, [end]])
+    starts, ends = bounds[:-1], bounds[1:]
+    shot_of = np.searchsorted(bounds, probe_times, side="right") - 1
+    inside = np.ones(len(dists), dtype=bool)
+    inside[cut_at] = False
+    inside[0] = False
+    sums = np.bincount(shot_of[inside], dists[inside], minlength=len(starts))
+    counts = np.bincount(shot_of[inside], minlength=len(starts))
+    motion = np.clip(sums / np.maximum(counts, 1) / cut_threshold, 0.0, 1.0)
+    return starts, ends, motion
+
+
+def _shot_times(start, end, n, cut_offset=CUT_OFFSET):
+    """n sample times in [start, end): the middle for n == 1, else cosine spacing (denser near the cuts)."""
+    duration = end - start
+    if n == 1:
+        return np.array([start + duration / 2])
+    offset = min(cut_offset, duration / 4)
+    u = 0.5 - 0.5 * np.cos(np.pi * np.arange(n) / (n - 1))
+    return start + offset + u * (duration - 2 * offset)
+
+
+def plan_samples(starts, ends, motion, budget, min_gap=DEFAULT_MIN_GAP, max_gap=DEFAULT_MAX_GAP,
+                 fps=None):
+    """Sample times (sorted float seconds) and the shot position of each, within the frame budget."""
+    starts, ends = np.asarray(starts, dtype=np.float64), np.asarray(ends, dtype=np.float64)
+    motion = np.clip(np.asarray(motion, dtype=np.float64), 0.0, 1.0)
+    durations = np.maximum(ends - starts, 1e-6)
+    # 움직임 0 → max_gap, 1 → min_gap (로그 스케일 보간)
+    gaps = np.exp(np.log(max_gap) + motion * (np.log(min_gap) - np.log(max_gap)))
+    cap = np.floor(durations / min_gap).astype(np.int64) + 1
+
+    def counts(scale):
+        return np.minimum(cap, np.maximum(1, np.ceil(durations / gaps * scale).astype(np.int64)))
+
+    budget = int(budget)
+    if len(starts) > budget:
+        # 샷 수가 예산보다 많으면 길고 움직임이 많은 샷부터 한 프레임씩
+        chosen = np.sort(np.argsort(-(durations * (1 + motion)), kind="stable")[:budget])
+        n = np.zeros(len(starts), dtype=np.int64)
+        n[chosen] = 1
+    elif counts(1.0).sum() <= budget:
+        n = counts(1.0)
+    else:
+        lo, hi = 0.0, 1.0
+        for _ in range(40):
+            mid = (lo + hi) / 2
+            lo, hi = (mid, hi) if counts(mid).sum() <= budget else (lo, mid)
+        n = counts(lo)
+
+    times, shot_ids = [], []
+    for i in np.flatnonzero(n):
+        t = _shot_times(starts[i], ends[i], int(n[i]))
+        times.append(t)
+        shot_ids.append(np.full(len(t), i))
+    if not times:
+        return np.empty(0), np.empty(0, dtype=np.int64)
+    times, shot_ids = np.concatenate(times), np.concatenate(shot_ids)
+    if fps:
+        # 같은 프레임으로 떨어지는 시각은 하나만 남기고 프레임 시각으로 맞춘다
+        frames, first = np.unique(np.round(times * fps).astype(np.int64), return_index=True)
+        times, shot_ids = frames / fps, shot_ids[first]
+    order = np.argsort(times, kind="stable")
+    return times[order], shot_ids[order]
+
+
+def build_plan(video_path, start=0.0, end=None, budget=None, azure_json=None, **kwargs):
+    """Plan for [start, end) of a video: (times, shot position per time, shot starts, shot ends, source)."""
+    info = video_info(video_path) if os.path.exists(video_path) else {"fps": None, "duration": None}
+    end = info["duration"] if end is None else end
+    if azure_json and os.path.exists(azure_json):
+        starts, ends, motion = shots_from_azure(azure_json, start, end)
+        source = "azure"
+    else:
+        starts, ends, motion = detect_shots(video_path, start, end)
+        source = "local"
+    end = ends.max() if end is None else end
+    budget = int(math.ceil(end - start)) if budget is None else budget  # 기본: 1초 1프레임과 같은 비용
+    times, shot_ids = plan_samples(starts, ends, motion, budget, fps=info["fps"], **kwargs)
+    return times, shot_ids, starts, ends, source
+
+
+def uniform_coverage(starts, ends, step=1.0):
+    """Shots that an every-`step`-seconds sampler would hit at least once."""
+    if not len(starts):
+        return 0
+    times = np.arange(np.floor(starts.min()), ends.max(), step)
+    hit = np.searchsorted(times, starts, side="left") < np.searchsorted(times, ends, side="left")
+    return int(hit.sum())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="샷 단위 적응형 샘플링 계획")
+    parser.add_argument("video_path")
+    parser.add_argument("--azure", default=None, help="azure.json (없으면 로컬 컷 검출)")
+    parser.add_argument("--start", type=float, default=0.0)
+    parser.add_argument("--end", type=float, default=None)
+    parser.add_argument("--budget", type=int, default=None, help="전체 프레임 수 (기본: 구간 길이(초))")
+    parser.add_argument("--min-gap", type=float, default=DEFAULT_MIN_GAP)
+    parser.add_argument("--max-gap", type=float, default=DEFAULT_MAX_GAP)
+    parser.add_argument("--out", default=None, help="계획 CSV (time_sec, frame_index, shot)")
+    args = parser.parse_args()
+
+    times, shot_ids, starts, ends, source = build_plan(args.video_path, args.start, args.end, args.budget,
+                                                       azure_json=args.azure, min_gap=args.min_gap,
+                                                       max_gap=args.max_gap)
+    print(f"샷 {len(starts)}개 ({source}), 계획 프레임 {len(times)}개 → 샷 {len(np.unique(shot_ids))}개 포함 "
+          f"(1초 간격 샘플링: {int(np.ceil(ends.max() - starts.min()))}프레임, 샷 {uniform_coverage(starts, ends)}개)")
+    if args.out:
+        import pandas as pd
+
+        fps = video_info(args.video_path)["fps"] if os.path.exists(args.video_path) else None
+        pd.DataFrame({
+            "time_sec": np.round(times, 3),
+            "frame_index": np.round(times * fps).astype(np.int64) if fps else -1,
+            "shot": shot_ids,
+        }).to_csv(args.out, index=False)
+        print(f"계획 저장: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,427 @@
+"""자막 감정/상황 태깅 엔진: asyncio + 토큰 버킷 속도 제한
+
+자막 한 줄마다 요청하고 time.sleep(2.1)로 기다리는 대신, 분당 요청 수(RPM)와 분당
+토큰 수(TPM)를 함께 추적하는 토큰 버킷으로 허용량만큼 동시에 요청한다. 429 응답을
+받으면 retry-after 만큼 전체 요청을 멈추고 속도를 낮췄다가 성공이 이어지면 다시 올린다.
+결과는 입력 순서대로 돌려준다.
+
+batch_size > 1 이면 여러 줄을 {"id", "text"} 목록으로 한 요청에 묶고 id별 JSON 배열로
+답을 받는다. 답에서 빠지거나 형식이 깨진 id만 한 줄씩 다시 보낸다.
+같은 대사는 한 번만 요청하고, LabelCache 를 넘기면 이미 태깅한 줄은 요청하지 않는다.
+"""
+import asyncio
+import json
+import random
+import re
+import time
+
+import instrument
+
+DEFAULT_MODEL = "llama3-70b-8192"
+DEFAULT_RESULT = {"emotions": [], "situation": "unknown", "situation_type": "unknown"}
+
+
+# --- 프롬프트 / 응답 파싱 ---
+def build_prompt(text, emotion_labels):
+    """Single-line tagging prompt (same wording as the Groq script)."""
+    return f"""You are a JSON-only tagging assistant for movie subtitle analysis.
+
+You will be given one subtitle line. Your task is to return exactly one JSON object with the following structure.
+
+**JSON Structure:**
+{{
+  "emotions": [list of up to 2 emotions, ordered by relevance],
+  "situation": "1–5 word phrase summarizing the scene",
+  "situation_type": "brief category of situation"
+}}
+
+**Rules:**
+1.  Choose up to two emotions from the allowed list below. The most relevant emotion comes first.
+2.  The output MUST be a single, valid JSON object. Do not add explanations or any text outside the JSON structure.
+3.  Ensure all keys and string values are in double quotes. Ensure commas are correctly placed.
+
+**Allowed Emotions:**
+{emotion_labels}
+
+**Example:**
+Subtitle: "Get away from me! It's going to explode!"
+{{
+  "emotions": ["fear", "surprise"],
+  "situation": "escaping an explosion",
+  "situation_type": "action"
+}}
+
+---
+**Subtitle to Analyze:**
+"{text}"
+"""
+
+
+def build_batch_prompt(items, emotion_labels):
+    """Multi-line prompt: instructions once, then one {"id", "text"} JSON line per subtitle."""
+    lines = ",\n".join(json.dumps({"id": sub_id, "text": text}, ensure_ascii=False) for sub_id, text in items)
+    return f"""You are a JSON-only tagging assistant for movie subtitle analysis.
+
+You will be given a list of subtitle lines, each with an "id". Return exactly one JSON array with one object per subtitle, in the same order, with the following structure.
+
+**JSON Structure (one per subtitle):**
+{{
+  "id": <the subtitle id>,
+  "emotions": [list of up to 2 emotions, ordered by relevance],
+  "situation": "1–5 word phrase summarizing the scene",
+  "situation_type": "brief category of situation"
+}}
+
+**Rules:**
+1.  Choose up to two emotions from the allowed list below. The most relevant emotion comes first.
+2.  Every id from the input MUST appear exactly once in the output array.
+3.  The output MUST be a single, valid JSON array. Do not add explanations or any text outside the JSON structure.
+4.  Ensure all keys and string values are in double quotes. Ensure commas are correctly placed.
+
+**Allowed Emotions:**
+{emotion_labels}
+
+**Example:**
+Subtitles: [{{"id": 1, "text": "Get away from me! It's going to explode!"}}]
+[{{"id": 1, "emotions": ["fear", "surprise"], "situation": "escaping an explosion", "situation_type": "action"}}]
+
+---
+**Subtitles to Analyze:**
+[
+{lines}
+]
+"""
+
+
+def parse_response(content):
+    """Extract the JSON object from a model reply; None if it cannot be parsed."""
+    match = re.search(r"\{.*\}", content or "", re.DOTALL)
+    if match:
+        try:
+            return json.loads(match.group())
+        except ValueError:
+            pass
+    return None
+
+
+def _valid_result(item):
+    return (isinstance(item, dict) and isinstance(item.get("emotions"), list)
+            and "situation" in item and "situation_type" in item)
+
+
+def parse_batch_response(content, ids):
+    """Map id -> result for every well-formed item of a batch reply; unknown ids are ignored."""
+    match = re.search(r"\[.*\]", content or "", re.DOTALL)
+    try:
+        items = json.loads(match.group()) if match else None
+    except ValueError:
+        items = None
+    if items is None:
+        # 잘린 응답: 완결된 {...} 객체만 건져낸다
+        items = []
+        for obj in re.findall(r"\{[^{}]*\}", content or ""):
+            try:
+                items.append(json.loads(obj))
+            except ValueError:
+                pass
+    wanted = set(ids)
+    results = {}
+    for item in items if isinstance(items, list) else []:
+        if not _valid_result(item):
+            continue
+        try:
+            sub_id = int(item["id"])
+        except (KeyError, TypeError, ValueError):
+            continue
+        if sub_id in wanted and sub_id not in results:
+            results[sub_id] = {k: v for k, v in item.items() if k != "id"}
+    return results
+
+
+def suggest_batch_size(texts, emotion_labels, context_tokens=8192, tpm=None,
+                       completion_per_item=80, headroom=0.8, max_batch=40, batch_prompt_builder=build_batch_prompt):
+    """Largest batch whose prompt + expected reply fits the model context and one minute of TPM."""
+    if not texts:
+        return 1
+    overhead = estimate_tokens(batch_prompt_builder([], emotion_labels))
+    per_item = sum(estimate_tokens(t) + 12 for t in texts) / len(texts) + completion_per_item
+    budget = context_tokens * headroom
+    if tpm:
+        budget = min(budget, tpm * headroom)
+    return int(max(1, min(max_batch, (budget - overhead) // per_item)))
+
+
+def estimate_tokens(text):
+    """Rough token count (about 4 characters per token) used for TPM budgeting."""
+    return max(1, len(text) // 4)
+
+
+# --- 속도 제한 ---
+class TokenBucketLimiter:
+    """Token bucket over both requests/min and tokens/min with 429-driven slowdown.
+
+    On a rate-limit response all callers pause until retry-after has passed and
+    the refill rate drops to `backoff_factor` of its value, once per blocked
+    window, and the bucket holds at most that reduced rate, so the end of a block
+    is not followed by a burst at the configured rate. Each success then recovers
+    a little of the configured rate (AIMD).
+    """
+
+    def __init__(self, rpm, tpm=None, backoff_factor=0.7, recovery=0.02, min_scale=0.1):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.backoff_factor = backoff_factor
+        self.recovery = recovery
+        self.min_scale = min_scale
+        self.scale = 1.0
+        self._requests = float(rpm)
+        self._tokens = float(tpm) if tpm else 0.0
+        self._last = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = None
+        self._lock_loop = None
+
+    def _refill(self, now):
+        elapsed = now - self._last
+        self._last = now
+        # 감속 중에는 버킷 크기도 줄여, 막힘이 풀릴 때 설정 한도만큼 몰아 보내지 않는다
+        capacity = max(1.0, self.rpm * self.scale)
+        self._requests = min(capacity, self._requests + elapsed * self.rpm * self.scale / 60.0)
+        if self.tpm:
+            self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm * self.scale / 60.0)
+
+    async def acquire(self, tokens=0):
+        """Wait until one request and `tokens` tokens are available, then take them."""
+        if self.tpm:
+            tokens = min(tokens, self.tpm)
+        loop = asyncio.get_running_loop()
+        if self._lock is None or self._lock_loop is not loop:
+            self._lock, self._lock_loop = asyncio.Lock(), loop
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._blocked_until:
+                    await asyncio.sleep(self._blocked_until - now)
+                    continue
+                self._refill(now)
+                need_req = 1.0 - self._requests
+                need_tok = (tokens - self._tokens) if self.tpm else 0.0
+                if need_req <= 0 and need_tok <= 0:
+                    self._requests -= 1.0
+                    if self.tpm:
+                        self._tokens -= tokens
+                    return
+                wait = max(need_req * 60.0 / (self.rpm * self.scale),
+                           need_tok * 60.0 / (self.tpm * self.scale) if self.tpm else 0.0)
+                await asyncio.sleep(wait)
+
+    def on_rate_limited(self, retry_after=None):
+        now = time.monotonic()
+        if now < self._blocked_until:
+            # 같은 버스트에서 함께 돌아온 429 는 한 번만 감속한다
+            return
+        # retry-after 가 없으면 현재 속도로 요청 한 번 간격만큼 막는다
+        self._blocked_until = now + (retry_after or 60.0 / (self.rpm * self.scale))
+        self.scale = max(self.min_scale, self.scale * self.backoff_factor)
+        self._requests = min(self._requests, 0.0)
+
+    def on_success(self):
+        self.scale = min(1.0, self.scale + self.recovery)
+
+    def adjust_tokens(self, delta):
+        """Correct the token bucket once the real usage of a request is known."""
+        if self.tpm:
+            self._tokens = min(self.tpm, self._tokens - delta)
+
+
+def _status_code(exc):
+    code = getattr(exc, "status_code", None)
+    if code is None:
+        code = getattr(getattr(exc, "response", None), "status_code", None)
+    return code
+
+
+def _retryable(exc):
+    """429, 408, 5xx and connection/timeout errors are worth retrying; other 4xx fail fast."""
+    code = _status_code(exc)
+    if code is not None:
+        return code in (408, 429) or code >= 500
+    if isinstance(exc, (ConnectionError, TimeoutError, asyncio.TimeoutError)):
+        return True
+    return any(cls.__name__ in ("APIConnectionError", "APITimeoutError") for cls in type(exc).__mro__)
+
+
+def _retry_after(exc):
+    """Seconds to wait from retry-after / retry-after-ms headers of an API error, if present."""
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000.0
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        pass
+    return None
+
+
+def make_client(api_key, base_url):
+    """AsyncOpenAI client with the SDK's own retries off (the tagger handles them)."""
+    from openai import AsyncOpenAI
+    return AsyncOpenAI(api_key=api_key, base_url=base_url, max_retries=0)
+
+
+# --- 태깅 엔진 ---
+class AsyncSubtitleTagger:
+    """Tag subtitle lines concurrently under RPM/TPM limits and return results in input order."""
+
+    def __init__(self, client, emotion_labels, model=DEFAULT_MODEL, rpm=30, tpm=None,
+                 concurrency=8, max_retries=6, base_delay=1.0, max_delay=60.0,
+                 temperature=0.7, max_tokens=250, expected_completion_tokens=80,
+                 prompt_builder=build_prompt, batch_prompt_builder=build_batch_prompt,
+                 context_tokens=8192, cache=None):
+        self.client = client
+        self.emotion_labels = list(emotion_labels)
+        self.model = model
+        self.limiter = TokenBucketLimiter(rpm, tpm)
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.expected_completion_tokens = expected_completion_tokens
+        self.prompt_builder = prompt_builder
+        # batch_size > 1 요청용 프롬프트. prompt_builder 를 바꾸면 같은 규칙으로 함께 바꿔야 한다
+        self.batch_prompt_builder = batch_prompt_builder
+        self.context_tokens = context_tokens
+        self.cache = cache
+        self.stats = {"requests": 0, "rate_limited": 0, "errors": 0, "failed": 0,
+                      "batches": 0, "resent": 0, "prompt_tokens": 0}
+
+    def _backoff(self, attempt):
+        # full jitter: [0, min(max_delay, base * 2^attempt)]
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    async def complete(self, prompt, n_items=1):
+        """Send one prompt with rate limiting and retries; returns the reply text or None."""
+        tokens = estimate_tokens(prompt) + self.expected_completion_tokens * n_items
+        # 배치 응답은 줄 수만큼 길어지지만 프롬프트와 합쳐 컨텍스트 길이를 넘을 수는 없다
+        max_tokens = max(1, min(self.max_tokens * n_items, self.context_tokens - estimate_tokens(prompt)))
+        for attempt in range(self.max_retries + 1):
+            with instrument.timer("rate_wait_ms"):
+                await self.limiter.acquire(tokens)
+            self.stats["requests"] += 1
+            self.stats["prompt_tokens"] += estimate_tokens(prompt)
+            instrument.count("api_requests")
+            try:
+                with instrument.timer("api_latency_ms"):
+                    response = await self.client.chat.completions.create(
+                        model=self.model,
+                        messages=[{"role": "user", "content": prompt}],
+                        temperature=self.temperature,
+                        max_tokens=max_tokens,
+                    )
+            except Exception as e:
+                if _status_code(e) == 429:
+                    self.stats["rate_limited"] += 1
+                    instrument.count("rate_limited")
+                    retry_after = _retry_after(e)
+                    self.limiter.on_rate_limited(retry_after)
+                    await asyncio.sleep(retry_after if retry_after else self._backoff(attempt))
+                elif not _retryable(e):
+                    self.stats["errors"] += 1
+                    print(f"[!] API 호출 실패 (재시도하지 않음): {e}")
+                    break
+                else:
+                    self.stats["errors"] += 1
+                    print(f"[!] API 호출 실패 (시도 {attempt + 1}/{self.max_retries + 1}): {e}")
+                    await asyncio.sleep(self._backoff(attempt))
+                continue
+            self.limiter.on_success()
+            usage = getattr(response, "usage", None)
+            if usage is not None and getattr(usage, "total_tokens", None):
+                self.limiter.adjust_tokens(usage.total_tokens - tokens)
+            return response.choices[0].message.content
+        self.stats["failed"] += 1
+        return None
+
+    async def tag_text(self, text):
+        content = await self.complete(self.prompt_builder(text, self.emotion_labels))
+        result = parse_response(content)
+        if result is None:
+            if content is not None:
+                print(f"[!] JSON 파싱 실패 | 원본 응답: {content}")
+            return dict(DEFAULT_RESULT)
+        return result
+
+    async def tag_batch(self, items):
+        """Tag [(id, text)] in one request; ids missing or malformed in the reply are re-sent alone."""
+        self.stats["batches"] += 1
+        content = await self.complete(self.batch_prompt_builder(items, self.emotion_labels), n_items=len(items))
+        parsed = parse_batch_response(content, [sub_id for sub_id, _ in items])
+        missing = [(sub_id, text) for sub_id, text in items if sub_id not in parsed]
+        if missing:
+            self.stats["resent"] += len(missing)
+            singles = await asyncio.gather(*(self.tag_text(text) for _, text in missing))
+            parsed.update({sub_id: res for (sub_id, _), res in zip(missing, singles)})
+        return [parsed[sub_id] for sub_id, _ in items]
+
+    def cache_namespace(self):
+        """Cache namespace of this tagger: model + rendered prompt templates + emotion vocabulary."""
+        template = (self.prompt_builder("{text}", self.emotion_labels)
+                    + self.batch_prompt_builder([], self.emotion_labels))
+        return self.cache.register(self.model, template, self.emotion_labels)
+
+    async def tag_all(self, texts, progress=None, batch_size=1):
+        """Tag every text with bounded concurrency; results keep the input order.
+
+        Identical texts are sent once. With batch_size > 1, batch_size lines are
+        packed into each request (see suggest_batch_size for a value that fits
+        the context and TPM). With a LabelCache, cached lines are skipped and new
+        labels are committed as each request finishes.
+        """
+        if batch_size > 1 and self.prompt_builder is not build_prompt and self.batch_prompt_builder is build_batch_prompt:
+            print("[경고] prompt_builder 만 바꾸고 batch_prompt_builder 는 기본값입니다. "
+                  "여러 줄 요청은 기본 배치 프롬프트의 규칙(감정 최대 2개)으로 태깅됩니다.")
+        semaphore = asyncio.Semaphore(self.concurrency)
+        results = [None] * len(texts)
+        positions = {}  # text -> 입력 위치들
+        for i, text in enumerate(texts):
+            positions.setdefault(text, []).append(i)
+
+        ns = self.cache_namespace() if self.cache is not None else None
+        cached = self.cache.get_many(ns, list(positions)) if ns else {}
+        for text, label in cached.items():
+            for i in positions[text]:
+                results[i] = dict(label)
+        pending = [text for text in positions if text not in cached]
+        done = len(texts) - sum(len(positions[text]) for text in pending)
+
+        async def worker(start, chunk):
+            nonlocal done
+            async with semaphore:
+                if len(chunk) == 1:
+                    out = [await self.tag_text(chunk[0])]
+                else:
+                    out = await self.tag_batch(list(enumerate(chunk, start=start)))
+            for text, label in zip(chunk, out):
+                for i in positions[text]:
+                    results[i] = dict(label)
+            if ns:
+                # 실패한 줄(DEFAULT_RESULT)은 저장하지 않아 다음 실행에서 다시 요청한다
+                self.cache.put_many(ns, [(t, label) for t, label in zip(chunk, out) if label != DEFAULT_RESULT])
+            done += sum(len(positions[text]) for text in chunk)
+            if progress:
+                progress(done, len(texts))
+
+        batch_size = max(1, batch_size)
+        await asyncio.gather(*(worker(i, pending[i:i + batch_size]) for i in range(0, len(pending), batch_size)))
+        return results
+
+
+def tag_subtitles(subs, tagger, batch_size=1):
+    """Synchronous helper: tag subtitle dicts in place (adds emotions/situation/situation_type)."""
+    results = asyncio.run(tagger.tag_all([sub["text"] for sub in subs], batch_size=batch_size))
+    for sub, res in zip(subs, results):
+        sub.update(res)
+    return subs
@@ -0,0 +1,174 @@
+"""SRT 자막 파서와 시간 인덱스
+
+SRT 파일을 한 줄씩 읽어 시작/끝(초)/텍스트 병렬 배열로 만든다. srt.Subtitle 이나
+timedelta 객체를 만들지 않고, 구간은 IntervalSet 으로 정렬해 두어 "t 초에 나오는 자막"과
+"[a, b] 사이 자막"을 이분 탐색으로 찾는다. 파싱 결과는 원본 옆의 .index.pkl (CINEMA_INDEX_CACHE=폴더
+면 그 폴더, 쓸 수 없으면 생략) 과 프로세스 메모리에 캐시해 두었다가 원본 크기/수정 시각이 같으면
+그대로 쓴다.
+
+    subs = load_srt("../data/raw/A.Brighter.Summer.Day.srt")
+    subs.active_at(9700.5)     # 그 시각에 보이는 자막 레코드들
+    subs.window(9657, 14207)   # 시작 시각이 구간 안인 자막 (기존 start_sec/end_sec 필터와 동일)
+
+사용법:
+    python subtitles.py <파일.srt> [--at 초] [--window 시작 끝]
+"""
+import argparse
+import os
+import pickle
+import re
+
+import numpy as np
+
+import instrument
+from intervals import IntervalSet, index_cache_path, write_index_cache
+
+CACHE_VERSION = 1
+TIMING = re.compile(r"(\d+):(\d{1,2}):(\d{1,2})[,.](\d+)\s*-->\s*(\d+):(\d{1,2}):(\d{1,2})[,.](\d+)")
+
+_memo = {}
+
+
+def _seconds(h, m, s, frac):
+    return int(h) * 3600 + int(m) * 60 + int(s) + int(frac) / 10 ** len(frac)
+
+
+def _cue(block):
+    """(start, end, text) from the non-blank lines of one cue, or None when it has no timing line."""
+    for i, line in enumerate(block[:2]):
+        match = TIMING.search(line)
+        if match:
+            g = match.groups()
+            return _seconds(*g[:4]), _seconds(*g[4:]), "\n".join(block[i + 1:]).strip()
+    return None
+
+
+def iter_cues(path):
+    """Stream (start, end, text) per cue in file order without reading the whole file."""
+    with open(path, "r", encoding="utf-8-sig") as f:
+        block = []
+        for line in f:
+            line = line.rstrip("\r\n")
+            if line.strip():
+                block.append(line)
+            elif block:
+                cue = _cue(block)
+                if cue is not None:
+                    yield cue
+                block = []
+        if block:
+            cue = _cue(block)
+            if cue is not None:
+                yield cue
+
+
+class SubtitleTrack:
+    """Cues of one subtitle file as sorted interval arrays; ids are 1-based positions in the file."""
+
+    def __init__(self, starts, ends, texts, ids=None):
+        ids = np.arange(1, len(starts) + 1) if ids is None else ids
+        self.intervals = IntervalSet(starts, ends, owners=np.asarray(ids, dtype=np.int64), names=texts)
+
+    @classmethod
+    def parse(cls, path):
+        starts, ends, texts = [], [], []
+        for start, end, text in iter_cues(path):
+            starts.append(start)
+            ends.append(end)
+            texts.append(text)
+        return cls(starts, ends, texts)
+
+    def __len__(self):
+        return len(self.intervals)
+
+    @property
+    def starts(self):
+        return self.intervals.starts
+
+    @property
+    def ends(self):
+        return self.intervals.ends
+
+    @property
+    def texts(self):
+        return self.intervals.names
+
+    @property
+    def ids(self):
+        return self.intervals.owners
+
+    def records(self, positions=None):
+        """[{'id', 'start', 'end', 'text'}] for the given positions (all cues by default)."""
+        s = self.intervals
+        positions = range(len(s)) if positions is None else positions
+        return [{"id": int(s.owners[p]), "start": float(s.starts[p]), "end": float(s.ends[p]),
+                 "text": s.names[p]} for p in positions]
+
+    def active_at(self, t):
+        """Cues on screen at t (start <= t < end)."""
+        return self.records(self.intervals.containing(t))
+
+    def window(self, start_sec, end_sec):
+        """Cues whose start lies in [start_sec, end_sec]."""
+        lo = np.searchsorted(self.starts, start_sec, side="left")
+        hi = np.searchsorted(self.starts, end_sec, side="right")
+        return self.records(range(lo, hi))
+
+    def overlapping(self, start_sec, end_sec):
+        """Cues on screen at any time in [start_sec, end_sec)."""
+        return self.records(self.intervals.overlapping(start_sec, end_sec))
+
+
+@instrument.timed("srt_load_ms")
+def load_srt(path, cache=True):
+    """Parsed SubtitleTrack, reused from memory or the .index.pkl cache while the file is unchanged."""
+    stat = os.stat(path)
+    signature = (CACHE_VERSION, stat.st_size, stat.st_mtime_ns)
+    key = os.path.abspath(path)
+    if cache and key in _memo and _memo[key][0] == signature:
+        return _memo[key][1]
+
+    track = None
+    cache_path = index_cache_path(path)
+    if cache and os.path.exists(cache_path):
+        try:
+            with open(cache_path, "rb") as f:
+                cached_signature, arrays = pickle.load(f)
+            if cached_signature == signature:
+                track = SubtitleTrack(arrays["starts"], arrays["ends"], arrays["names"], arrays["owners"])
+        except Exception:
+            pass
+    if track is None:
+        track = SubtitleTrack.parse(path)
+        if cache:
+            write_index_cache(cache_path, (signature, track.intervals.to_arrays()))
+    if cache:
+        _memo[key] = (signature, track)
+    return track
+
+
+def parse_srt_file(path):
+    """Drop-in for the old srt-based helper: [{'id', 'start', 'end', 'text'}] for every cue."""
+    return load_srt(path).records()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SRT 자막 조회")
+    parser.add_argument("srt_path")
+    parser.add_argument("--at", type=float, default=None, help="이 시각(초)에 보이는 자막")
+    parser.add_argument("--window", type=float, nargs=2, default=None, help="시작 시각이 이 구간 안인 자막")
+    parser.add_argument("--no-cache", action="store_true")
+    args = parser.parse_args()
+
+    subs = load_srt(args.srt_path, cache=not args.no_cache)
+    print(f"자막 {len(subs)}개 ({subs.starts[0]:.2f}s ~ {subs.ends.max():.2f}s)" if len(subs) else "자막 없음")
+    if args.at is not None:
+        for rec in subs.active_at(args.at):
+            print(f"  #{rec['id']} [{rec['start']:.2f}-{rec['end']:.2f}] {rec['text']}")
+    if args.window is not None:
+        for rec in subs.window(*args.window):
+            print(f"  #{rec['id']} [{rec['start']:.2f}-{rec['end']:.2f}] {rec['text']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+"""track 단위 인물/감정 집계
+
+크롭 이름(track_{id}_sample_{k}_sec_{s}[_face{i}].jpg)에서 이미 추적기가 묶어 둔
+track_id 를 읽어, 샘플마다 따로 인물/감정을 구하는 대신 track 마다 한 번만 구한다.
+
+- 인물: track 의 샘플 얼굴 중 품질(크기 × 선명도) 상위 pool_k 개의 ArcFace 임베딩을
+  품질 가중 평균해 갤러리와 한 번 매칭한다.
+- 감정: 품질이 가장 좋은 emotion_k 개 얼굴에만 감정 모델을 돌려 평균한다.
+- 결과를 추적 CSV(all_tracking_results.csv / brighter_bbx_tracking.csv)의 모든 행에
+  track_id 로 붙여 초 단위 인물 라벨을 만든다.
+- --video 를 주면 샘플 JPEG 를 읽는 대신 영상 프레임(iter_frames, CINEMA_FRAME_CACHE 면 프레임
+  캐시)에서 추적 박스를 잘라 쓴다. 폴더는 샘플 이름(track_id, 초)만 알려 주고 얼굴은 검출한다.
+
+사용법:
+    python track_faces.py <얼굴 크롭 폴더> <갤러리 .pkl> <track 결과 csv>
+        [--tracking 추적 csv --labeled 출력 csv] [--detect] [--pool-k 3] [--emotion-k 1]
+    python track_faces.py <후보 이미지 폴더> <갤러리 .pkl> <track 결과 csv> --video 영상 --tracking 추적 csv
+"""
+import argparse
+import os
+import re
+from collections import defaultdict
+
+import cv2
+import numpy as np
+
+from face_identity import (ARCFACE_COSINE_THRESHOLD, IMAGE_EXTS, ArcFaceEmbedder, IdentityIndex,
+                           l2_normalize, load_gallery, parse_thresholds)
+from face_pipeline import EMOTION_LABELS, EmotionClassifier, extract_aligned_faces
+
+CROP_NAME = re.compile(r"track_(\d+)_sample_(\d+)_sec_(\d+)(?:_face(\d+))?")
+TRACK_FIELDS = ["track_id", "identity", "score", "nearest_identity", "emotion", "emotion_score",
+                "crops", "first_sec", "last_sec", "best_image"]
+
+
+def parse_crop_name(name):
+    """'track_12_sample_2_sec_51_face0.jpg' -> (12, 2, 51, 0); face is None for person crops."""
+    match = CROP_NAME.search(name)
+    if not match:
+        return None
+    track_id, sample, sec, face = match.groups()
+    return int(track_id), int(sample), int(sec), None if face is None else int(face)
+
+
+def face_quality(face):
+    """Size x sharpness (variance of the Laplacian) of a BGR face crop."""
+    gray = cv2.cvtColor(face, cv2.COLOR_BGR2GRAY)
+    return float(face.shape[0] * face.shape[1] * cv2.Laplacian(gray, cv2.CV_64F).var())
+
+
+def group_by_track(files):
+    groups = defaultdict(list)
+    for name in files:
+        parsed = parse_crop_name(name)
+        if parsed is not None:
+            groups[parsed[0]].append((name, parsed[2]))
+    return groups
+
+
+def video_sample_images(video_path, tracking_csv, names):
+    """Person crops for sample names (track_{id}_sample_{k}_sec_{s}.jpg) cut from the video frames.
+
+    Frames come from frame_source.iter_frames, so they are shared through the frame
+    cache when it is enabled instead of decoding the sample JPEGs from disk.
+    """
+    from face_roi import read_tracking
+    from frame_source import iter_frames
+
+    wanted = defaultdict(dict)  # 초 -> {track_id: 이름}
+    for name in names:
+        track_id, _, sec, _ = parse_crop_name(name)
+        wanted[sec][track_id] = name
+    tracks = read_tracking(tracking_csv)
+    # 샘플 이름의 초는 정수이므로 그 초의 첫 추적 시각을 쓴다
+    times = {}
+    for t in tracks:
+        if int(t) in wanted and int(t) not in times:
+            times[int(t)] = t
+    images = {}
+    for t, _, frame in iter_frames(video_path, sorted(times.values())):
+        boxes, track_ids = tracks[float(t)]
+        for (x, y, w, h), track_id in zip(boxes, track_ids):
+            name = wanted[int(t)].get(int(track_id))
+            if name is None:
+                continue
+            l, t0 = max(0, int(x - w / 2)), max(0, int(y - h / 2))
+            crop = frame[t0:int(y + h / 2), l:int(x + w / 2)]
+            if crop.size > 0:
+                images[name] = crop.copy()  # 캐시 프레임은 읽기 전용 memory-map 이므로 복사
+    return images
+
+
+def _track_faces(folder, items, detect, detector_backend, images=None):
+    """Best face per sample image of one track: [(quality, name, sec, face)] sorted by quality."""
+    best = {}
+    for name, sec in items:
+        img = images.get(name) if images is not None else cv2.imread(os.path.join(folder, name))
+        if img is None:
+            continue
+        faces = [f for f, _, _ in extract_aligned_faces(img, detector_backend)] if detect else [img]
+        # 같은 샘플에서 나온 얼굴(face0, face1, ...) 중 품질이 가장 좋은 것을 그 샘플의 얼굴로 쓴다
+        key = CROP_NAME.search(name).group(0).split("_face")[0]
+        for face in faces:
+            q = face_quality(face)
+            if key not in best or q > best[key][0]:
+                best[key] = (q, name, sec, face)
+    return sorted(best.values(), key=lambda item: -item[0])
+
+
+def analyze_tracks(folder, pkl_path, out_csv, pool_k=3, emotion_k=1, detect=False,
+                   detector_backend="retinaface", thresholds=None,
+                   default_threshold=ARCFACE_COSINE_THRESHOLD, batch_size=64,
+                   embedder=None, emotion=None, video_path=None, tracking_csv=None):
+    """Resolve identity and emotion once per track; writes one row per track and returns the DataFrame.
+
+    With video_path and tracking_csv, sample images are cut from the video frames
+    (person boxes, faces detected) instead of read from the folder.
+    """
+    import pandas as pd
+
+    embeddings, names, _ = load_gallery(pkl_path)
+    index = IdentityIndex(embeddings, names, thresholds=thresholds, default_threshold=default_threshold)
+    embedder = embedder or ArcFaceEmbedder(batch_size=batch_size)
+    emotion = emotion or EmotionClassifier(batch_size=batch_size)
+
+    files = sorted(f for f in os.listdir(folder) if f.lower().endswith(IMAGE_EXTS))
+    images = None
+    if video_path is not None:
+        # 영상에서 자를 수 있는 것은 사람 박스뿐: 얼굴 크롭 이름은 빼고 얼굴은 검출한다
+        files = [f for f in files if parse_crop_name(f) is not None and parse_crop_name(f)[3] is None]
+        images = video_sample_images(video_path, tracking_csv, files)
+        detect = True
+    groups = group_by_track(files)
+    tracks, pooled_faces, pooled_weights, owners, emotion_faces, emotion_owners = [], [], [], [], [], []
+    for track_id in sorted(groups):
+        ranked = _track_faces(folder, groups[track_id], detect, detector_backend, images)
+        if not ranked:
+            continue
+        row = len(tracks)
+        secs = [sec for _, sec in groups[track_id]]
+        tracks.append({"track_id": track_id, "crops": len(groups[track_id]),
+                       "first_sec": min(secs), "last_sec": max(secs), "best_image": ranked[0][1]})
+        for q, _, _, face in ranked[:pool_k]:
+            pooled_faces.append(face)
+            pooled_weights.append(q)
+            owners.append(row)
+        for _, _, _, face in ranked[:emotion_k]:
+            emotion_faces.append(face)
+            emotion_owners.append(row)
+
+    if not tracks:
+        df = pd.DataFrame(columns=TRACK_FIELDS)
+        df.to_csv(out_csv, index=False)
+        return df
+
+    # 품질 가중 평균 임베딩 → track 당 매칭 1회
+    owners = np.asarray(owners)
+    emb = l2_normalize(embedder.embed(pooled_faces))
+    weights = np.asarray(pooled_weights, dtype=np.float32)
+    weights = weights / np.maximum(np.bincount(owners, weights)[owners], 1e-12)
+    pooled = np.zeros((len(tracks), emb.shape[1]), dtype=np.float32)
+    np.add.at(pooled, owners, emb * weights[:, None])
+    nearest, dist, accepted = index.search(pooled)
+
+    probs = emotion.predict(emotion_faces)
+    mean_probs = np.zeros((len(tracks), len(EMOTION_LABELS)), dtype=np.float32)
+    np.add.at(mean_probs, np.asarray(emotion_owners), probs)
+    mean_probs /= np.bincount(emotion_owners, minlength=len(tracks))[:, None]
+    top = mean_probs.argmax(axis=1)
+
+    df = pd.DataFrame(tracks)
+    df["identity"] = np.where(accepted, nearest, "none")
+    df["score"] = dist
+    df["nearest_identity"] = nearest
+    df["emotion"] = np.asarray(EMOTION_LABELS)[top]
+    df["emotion_score"] = mean_probs[np.arange(len(top)), top]
+    df = df[TRACK_FIELDS]
+    df.to_csv(out_csv, index=False)
+    print(f"track {len(tracks)}개 (이미지 {len(files)}개): 인물 매칭 {len(tracks)}회, "
+          f"임베딩 {len(pooled_faces)}회, 감정 추론 {len(emotion_faces)}회 "
+          f"(샘플별 방식: 각 {len(files)}회)")
+    return df
+
+
+def spread_to_tracking(track_df, tracking_csv, out_csv, chunksize=200_000):
+    """Attach per-track identity/emotion to every row of a tracking CSV (streamed in chunks)."""
+    import pandas as pd
+
+    labels = track_df[["track_id", "identity", "score", "emotion", "emotion_score"]]
+    rows = 0
+    for i, chunk in enumerate(pd.read_csv(tracking_csv, chunksize=chunksize)):
+        merged = chunk.merge(labels, on="track_id", how="left")
+        merged["identity"] = merged["identity"].fillna("unknown")
+        merged.to_csv(out_csv, mode="w" if i == 0 else "a", header=i == 0, index=False)
+        rows += len(merged)
+    print(f"추적 {rows}행에 track 라벨 적용 → {out_csv}")
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="track 단위 인물/감정 집계")
+    parser.add_argument("folder", help="얼굴 크롭 폴더 (faces_from_retina) 또는 --detect 와 함께 후보 이미지 폴더")
+    parser.add_argument("pkl_path", help="DeepFace 갤러리 ds_model_arcface_*.pkl")
+    parser.add_argument("out_csv", help="track 당 한 행 결과")
+    parser.add_argument("--tracking", default=None, help="라벨을 붙일 추적 CSV (track_id 열 필요)")
+    parser.add_argument("--labeled", default=None, help="--tracking 에 라벨을 붙여 저장할 경로")
+    parser.add_argument("--detect", action="store_true", help="입력이 사람 크롭이면 RetinaFace 로 얼굴 검출")
+    parser.add_argument("--video", default=None, help="샘플 JPEG 대신 이 영상 프레임에서 --tracking 박스를 잘라 사용")
+    parser.add_argument("--pool-k", type=int, default=3, help="인물 임베딩을 평균할 상위 품질 얼굴 수")
+    parser.add_argument("--emotion-k", type=int, default=1, help="감정 추론할 상위 품질 얼굴 수")
+    parser.add_argument("--threshold", type=float, default=ARCFACE_COSINE_THRESHOLD)
+    parser.add_argument("--thresholds", default="", help="인물별 임계값, 예: ming=0.6,xiao=0.65")
+    args = parser.parse_args()
+    if args.video and not args.tracking:
+        parser.error("--video 에는 박스를 읽을 --tracking 이 필요합니다")
+
+    df = analyze_tracks(args.folder, args.pkl_path, args.out_csv, pool_k=args.pool_k,
+                        emotion_k=args.emotion_k, detect=args.detect,
+                        thresholds=parse_thresholds(args.thresholds), default_threshold=args.threshold,
+                        video_path=args.video, tracking_csv=args.tracking)
+    if args.tracking:
+        spread_to_tracking(df, args.tracking, args.labeled or args.tracking.replace(".csv", "_labeled.csv"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""track 별 샘플 크롭 선택기 (메모리 제한)
+
+추적 루프가 끝날 때까지 track 마다 크롭 20개를 쥐고 있다가 3개만 저장하는 대신,
+아직 고를 가능성이 있는 후보만 남기고 선택이 확정되는 순간 바로 저장한다.
+
+- spread (기본): 처음 max_samples 개 샘플 중 [0, n//2, n-1] 번째 — 기존 extract_frames 와 같은
+  선택. n 이 늘어도 가운데 후보는 n//2 ~ max_samples//2 번째뿐이므로 그 구간과 첫/마지막만
+  보관하고, max_samples 개가 차면 그 자리에서 확정한다.
+- quality: track 전체에서 점수(예: 크기 × 선명도) 상위 k 개.
+- evict_after 초 동안 보이지 않은 track 은 지금까지의 샘플로 확정해 내보낸다. 추적기의
+  track_buffer(잃어버린 track 을 기다리는 시간)보다 길게 두면 같은 id 가 다시 나오지 않는다.
+
+확정된 track 은 on_final(track_id, [(번호, sec, payload), ...]) 로 넘겨지고 메모리에서 지워지므로,
+메모리는 전체 track 수가 아니라 동시에 활성인 track 수에 비례한다.
+"""
+import heapq
+
+DEFAULT_MAX_SAMPLES = 20
+
+
+def spread_indices(n):
+    """Positions chosen among n samples: first, middle, last."""
+    return [0, n // 2, n - 1] if n >= 3 else list(range(n))
+
+
+def sample_name(track_id, number, sec):
+    """Candidate image name used by extract_frames (number is 1-based)."""
+    return f"track_{track_id}_sample_{number}_sec_{int(sec)}.jpg"
+
+
+class _Track:
+    __slots__ = ("count", "last_sec", "kept")
+
+    def __init__(self):
+        self.count = 0
+        self.last_sec = None
+        self.kept = {}  # spread: 위치 -> (sec, payload) / quality: [(score, 순번, sec, payload)] 힙
+
+
+class TrackSampleSelector:
+    """Keep only the crops a track could still select and hand them to on_final once settled."""
+
+    def __init__(self, on_final, policy="spread", max_samples=DEFAULT_MAX_SAMPLES, k=3, evict_after=None):
+        if policy not in ("spread", "quality"):
+            raise ValueError(f"알 수 없는 policy: {policy}")
+        self.on_final = on_final
+        self.policy = policy
+        self.max_samples = max_samples
+        self.k = k
+        self.evict_after = evict_after
+        self.active = {}
+        self.finished = set()
+        self.stats = {"samples": 0, "kept_peak": 0, "finalized": 0, "evicted": 0, "late": 0}
+        self._kept = 0
+
+    def wants(self, track_id):
+        """False once the track is settled, so the caller can skip cropping/encoding."""
+        return track_id not in self.finished
+
+    def add(self, track_id, sec, payload, score=0.0):
+        if track_id in self.finished:
+            self.stats["late"] += 1
+            return
+        track = self.active.get(track_id)
+        if track is None:
+            track = self.active[track_id] = _Track()
+        pos = track.count
+        track.count += 1
+        track.last_sec = sec
+        self.stats["samples"] += 1
+        before = len(track.kept)
+
+        if self.policy == "spread":
+            track.kept[pos] = (sec, payload)
+            n, top_mid = track.count, self.max_samples // 2
+            # 앞으로도 고를 수 없는 후보 제거: 첫 번째, 이번(마지막), n//2 ~ max_samples//2 만 남김
+            for p in [p for p in track.kept if p != 0 and p != n - 1 and not (n // 2 <= p <= top_mid)]:
+                del track.kept[p]
+        else:
+            item = (score, pos, sec, payload)
+            if len(track.kept) < self.k:
+                heapq.heappush(track.kept, item)
+            elif item > track.kept[0]:
+                heapq.heapreplace(track.kept, item)
+        self._kept += len(track.kept) - before
+        self.stats["kept_peak"] = max(self.stats["kept_peak"], self._kept)
+
+        if self.policy == "spread" and track.count >= self.max_samples:
+            self._finalize(track_id)
+
+    def evict(self, now_sec):
+        """Finalize tracks not seen for evict_after seconds; returns how many were evicted."""
+        if self.evict_after is None:
+            return 0
+        stale = [tid for tid, t in self.active.items() if now_sec - t.last_sec > self.evict_after]
+        for track_id in stale:
+            self._finalize(track_id)
+        self.stats["evicted"] += len(stale)
+        return len(stale)
+
+    def close(self):
+        for track_id in list(self.active):
+            self._finalize(track_id)
+
+    def chosen(self, track):
+        if self.policy == "spread":
+            return [track.kept[p] for p in spread_indices(track.count)]
+        return [(sec, payload) for _, _, sec, payload in sorted(track.kept, key=lambda item: item[1])]
+
+    def _finalize(self, track_id):
+        track = self.active.pop(track_id)
+        self.finished.add(track_id)
+        self._kept -= len(track.kept)
+        self.stats["finalized"] += 1
+        self.on_final(track_id, [(i + 1, sec, payload) for i, (sec, payload) in enumerate(self.chosen(track))])
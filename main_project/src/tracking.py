@@ -0,0 +1,91 @@
+"""YOLO11-JDE 추적 보조 함수: 여러 프레임을 한 번에 추론하고 결과는 프레임 순서대로 연계
+
+ultralytics는 model.track()에 이미지 리스트를 넘기면 리스트 전체를 하나의 배치로
+검출/임베딩한 뒤, 스트림이 아닌 입력에 대해서는 같은 트래커 인스턴스로 이미지
+순서대로 association을 돌린다. 따라서 persist=True와 함께 쓰면 배치 크기 1일 때와
+같은 순서로 SMILEtrack이 갱신되어 track ID가 유지된다.
+"""
+import time
+
+import instrument
+
+DEFAULT_TRACKER = "smiletrack.yaml"
+DEFAULT_BATCH_SIZE = 8
+
+
+def iter_batches(items, batch_size):
+    """Group an iterable into lists of at most batch_size items."""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def result_boxes(result):
+    """Return (xywh boxes on CPU, list of int track ids) from one tracking result."""
+    boxes = result.boxes.xywh.cpu()
+    track_ids_raw = result.boxes.id
+    track_ids = track_ids_raw.int().cpu().tolist() if track_ids_raw is not None else []
+    return boxes, track_ids
+
+
+def tracker_frame_count(model):
+    """Frames the persisted tracker has associated so far (None if it isn't created or has no counter)."""
+    trackers = getattr(getattr(model, "predictor", None), "trackers", None)
+    if not trackers:
+        return None
+    return getattr(trackers[0], "frame_id", None)
+
+
+def track_batches(model, frames, batch_size=DEFAULT_BATCH_SIZE, tracker=DEFAULT_TRACKER, stats=None):
+    """Yield (sec, frame_index, frame, result) running model.track on batch_size frames at a time.
+
+    frames is an iterable of (sec, frame_index, frame) such as frame_source.iter_frames.
+    If a batch fails, frames the persisted tracker already associated are yielded with
+    result=None (re-feeding them would advance its Kalman state twice) and only the rest
+    are retried one by one; a frame that still fails is yielded with result=None.
+    stats (dict) receives frame count and inference time.
+    """
+    if stats is not None:
+        stats.setdefault("frames", 0)
+        stats.setdefault("infer_sec", 0.0)
+
+    for batch in iter_batches(frames, batch_size):
+        t0 = time.perf_counter()
+        before = tracker_frame_count(model)
+        try:
+            results = model.track(
+                [frame for _, _, frame in batch],
+                tracker=tracker,
+                persist=True,
+                verbose=False
+            )
+        except Exception as e:
+            after = tracker_frame_count(model)
+            if after is None and before is not None:
+                consumed = len(batch)  # 트래커 상태를 알 수 없으면 다시 넣지 않는다
+            else:
+                consumed = min(len(batch), (after or 0) - (before or 0))
+            print(f"[경고] 배치 추적 실패 ({len(batch)}프레임, 트래커가 이미 처리한 {consumed}프레임은 결과 없음), "
+                  f"나머지를 프레임 단위로 재시도: {e}")
+            results = [None] * consumed
+            for sec, _, frame in batch[consumed:]:
+                try:
+                    results.append(model.track(frame, tracker=tracker, persist=True, verbose=False)[0])
+                except Exception as e:
+                    print(f"[에러] YOLO 추적 실패 @ {sec}s: {e}")
+                    results.append(None)
+
+        elapsed = time.perf_counter() - t0
+        instrument.observe("infer_ms", elapsed * 1000)
+        instrument.count("frames", len(batch))
+        if stats is not None:
+            stats["frames"] += len(batch)
+            stats["infer_sec"] += elapsed
+
+        for (sec, frame_index, frame), result in zip(batch, results):
+            yield sec, frame_index, frame, result
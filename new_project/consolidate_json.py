@@ -1,33 +1,206 @@
+"""프레임별 *_leading_lines.json 결과 통합
+
+폴더의 프레임별 결과 파일을 스레드 풀로 읽어 파일 이름 순서대로 스트리밍 기록한다.
+전체 결과를 메모리 리스트에 모으지 않으므로 메모리는 (동시에 읽는 파일 수만큼의) 레코드
+몇 개로 제한된다.
+
+- 읽은 레코드는 압축 JSON 한 줄씩 consolidated_all_leading_lines.jsonl 에 저장하고,
+  파일별 크기/수정 시각/해시와 그 줄의 위치를 .consolidate_manifest.json 에 남긴다.
+- 다시 실행하면 새로 생기거나 바뀐 파일만 읽어 파싱하고, 나머지는 이전 .jsonl 에서
+  그대로 복사한다. 크기/수정 시각만 바뀌고 내용(해시)이 같으면 다시 파싱하지 않는다.
+- 출력 형식: json (기존과 같은 indent=2), compact (같은 구조, 공백 없음), jsonl (.jsonl 만)
+
+사용법:
+    python consolidate_json.py [결과 폴더] [--format json|compact|jsonl] [--workers 8] [--full]
+"""
+import argparse
+import hashlib
 import json
 import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
-def consolidate_json_files(directory):
-    consolidated = {
-        'analysis_info': {
-            'timestamp': datetime.now().isoformat(),
-            'total_images': 0,
-            'source_directory': 'data/processed/cure_frames_109_349'
-        },
-        'results': []
-    }
-
-    json_files = [f for f in os.listdir(directory) if f.endswith('_leading_lines.json')]
-    consolidated['analysis_info']['total_images'] = len(json_files)
-
-    for json_file in sorted(json_files):
-        filepath = os.path.join(directory, json_file)
-        with open(filepath, 'r') as f:
-            data = json.load(f)
-        consolidated['results'].append(data)
-
-    output_path = os.path.join(directory, 'consolidated_all_leading_lines.json')
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(consolidated, f, indent=2, ensure_ascii=False)
-
-    print(f'통합 완료: {len(json_files)}개 파일을 consolidated_all_leading_lines.json으로 병합')
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "main_project", "src"))
+import instrument
+
+SUFFIX = "_leading_lines.json"
+OUTPUT_NAME = "consolidated_all_leading_lines"
+MANIFEST_NAME = ".consolidate_manifest.json"
+MANIFEST_VERSION = 1
+
+
+def list_frame_files(directory):
+    # 통합 결과(consolidated_all_leading_lines.json)도 접미사가 같으므로 제외한다
+    return sorted(f for f in os.listdir(directory)
+                  if f.endswith(SUFFIX) and not f.startswith("consolidated_"))
+
+
+def load_manifest(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("version") == MANIFEST_VERSION:
+            return manifest
+    except (OSError, ValueError):
+        pass
+    return {"version": MANIFEST_VERSION, "files": {}, "output": None}
+
+
+@instrument.timed("file_read_ms")
+def _read_frame_file(path):
+    """(sha256, compact JSON line) of one per-frame result file."""
+    with open(path, "rb") as f:
+        raw = f.read()
+    record = json.loads(raw)
+    line = json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+    return hashlib.sha256(raw).hexdigest(), line.encode("utf-8")
+
+
+def _hash_file(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _ordered_map(pool, fn, items, window):
+    """pool.map that keeps at most `window` results in flight, yielding in input order."""
+    pending = deque()
+    for item in items:
+        pending.append(pool.submit(fn, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def update_store(directory, workers=8, full=False):
+    """Bring the .jsonl store and manifest up to date; returns (manifest, count of parsed files)."""
+    store_path = os.path.join(directory, OUTPUT_NAME + ".jsonl")
+    manifest_path = os.path.join(directory, MANIFEST_NAME)
+    manifest = load_manifest(manifest_path)
+    if full or not os.path.exists(store_path):
+        manifest["files"] = {}
+    old = manifest["files"]
+
+    names = list_frame_files(directory)
+    stats = {name: os.stat(os.path.join(directory, name)) for name in names}
+
+    def plan(name):
+        """(name, entry to reuse or None, hash if already computed)."""
+        st, entry = stats[name], old.get(name)
+        if entry is None:
+            return name, None, None
+        if entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns:
+            return name, entry, entry["hash"]
+        digest = _hash_file(os.path.join(directory, name))
+        return name, (entry if digest == entry["hash"] else None), digest
+
+    def work(name):
+        name, entry, digest = plan(name)
+        if entry is not None:
+            return name, entry, digest, None
+        digest, line = _read_frame_file(os.path.join(directory, name))
+        return name, None, digest, line
+
+    files = {}
+    parsed = 0
+    tmp_path = store_path + ".tmp"
+    old_store = open(store_path, "rb") if old else None
+    try:
+        with open(tmp_path, "wb") as out, ThreadPoolExecutor(max_workers=workers) as pool:
+            for name, entry, digest, line in _ordered_map(pool, work, names, window=workers * 4):
+                if line is None:
+                    # 바뀌지 않은 파일: 이전 저장소의 줄을 파싱 없이 복사
+                    old_store.seek(entry["offset"])
+                    line = old_store.read(entry["length"])
+                    instrument.count("files_reused")
+                else:
+                    parsed += 1
+                    instrument.count("files_parsed")
+                files[name] = {"size": stats[name].st_size, "mtime_ns": stats[name].st_mtime_ns,
+                               "hash": digest, "offset": out.tell(), "length": len(line)}
+                out.write(line)
+    finally:
+        if old_store is not None:
+            old_store.close()
+    os.replace(tmp_path, store_path)
+
+    changed = parsed > 0 or set(files) != set(old)
+    manifest["files"] = files
+    if changed:
+        manifest["output"] = None
+    return manifest, parsed
+
+
+def _indent_block(text, prefix):
+    return "\n".join(prefix + line for line in text.split("\n"))
+
+
+@instrument.timed("output_write_ms")
+def write_output(store_path, out_path, total, source_directory, compact=False):
+    """Stream the store into the consolidated {'analysis_info', 'results'} JSON (one record in memory)."""
+    info = {"timestamp": datetime.now().isoformat(), "total_images": total,
+            "source_directory": source_directory}
+    tmp_path = out_path + ".tmp"
+    with open(store_path, "rb") as store, open(tmp_path, "w", encoding="utf-8") as out:
+        if compact:
+            out.write('{"analysis_info":' + json.dumps(info, ensure_ascii=False, separators=(",", ":"))
+                      + ',"results":[')
+            for i, line in enumerate(store):
+                out.write(("," if i else "") + line.decode("utf-8").rstrip("\n"))
+            out.write("]}")
+        else:
+            info_text = json.dumps(info, indent=2, ensure_ascii=False)
+            out.write('{\n  "analysis_info": ' + _indent_block(info_text, "  ").lstrip() + ',\n  "results": [')
+            for i, line in enumerate(store):
+                text = json.dumps(json.loads(line), indent=2, ensure_ascii=False)
+                out.write(("," if i else "") + "\n" + _indent_block(text, "    "))
+            out.write(("\n  " if total else "") + "]\n}")
+    os.replace(tmp_path, out_path)
+
+
+def consolidate_json_files(directory, output_format="json", workers=8, full=False,
+                           source_directory="data/processed/cure_frames_109_349"):
+    start = time.perf_counter()
+    manifest, parsed = update_store(directory, workers=workers, full=full)
+    total = len(manifest["files"])
+    store_path = os.path.join(directory, OUTPUT_NAME + ".jsonl")
+
+    output_path = store_path
+    if output_format != "jsonl":
+        output_path = os.path.join(directory, OUTPUT_NAME + ".json")
+        wanted = {"format": output_format, "total": total}
+        current = manifest.get("output")
+        up_to_date = (current is not None and os.path.exists(output_path)
+                      and {k: current.get(k) for k in wanted} == wanted
+                      and current.get("mtime_ns") == os.stat(output_path).st_mtime_ns)
+        if not up_to_date:
+            write_output(store_path, output_path, total, source_directory, compact=output_format == "compact")
+            manifest["output"] = dict(wanted, mtime_ns=os.stat(output_path).st_mtime_ns)
+
+    manifest_path = os.path.join(directory, MANIFEST_NAME)
+    with open(manifest_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    os.replace(manifest_path + ".tmp", manifest_path)
+
+    print(f'통합 완료: {total}개 파일 (새로 읽음 {parsed}개, 재사용 {total - parsed}개)을 '
+          f'{os.path.basename(output_path)}으로 병합 ({time.perf_counter() - start:.2f}s)')
     return output_path
 
+
+def main():
+    parser = argparse.ArgumentParser(description="프레임별 리딩 라인 결과 통합")
+    parser.add_argument("directory", nargs="?", default="results/leading_lines_cure_frames")
+    parser.add_argument("--format", choices=["json", "compact", "jsonl"], default="json",
+                        help="json: indent=2 (기존 형식), compact: 공백 없는 JSON, jsonl: 한 줄에 한 프레임")
+    parser.add_argument("--workers", type=int, default=8, help="파일을 읽는 스레드 수")
+    parser.add_argument("--full", action="store_true", help="매니페스트를 무시하고 모든 파일을 다시 읽기")
+    args = parser.parse_args()
+    instrument.start_run("consolidate_json")
+    consolidate_json_files(args.directory, output_format=args.format, workers=args.workers, full=args.full)
+
+
 if __name__ == '__main__':
-    directory = 'results/leading_lines_cure_frames'
-    consolidate_json_files(directory) 
\ No newline at end of file
+    main()
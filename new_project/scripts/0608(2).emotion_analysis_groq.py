@@ -1,14 +1,28 @@
 from pathlib import Path
-import srt
-import json
+import os
+import sys
 import pandas as pd
-import time
-import re
-import openai
 
-# --- API 키 및 설정 ---
-openai.api_key = "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"
-openai.api_base = "https://api.groq.com/openai/v1"
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "main_project", "src"))
+import instrument
+from label_cache import LabelCache
+from subtitles import load_srt
+from subtitle_tagger import AsyncSubtitleTagger, make_client, suggest_batch_size, tag_subtitles
+
+# --- API 키 및 설정 (키는 코드에 두지 않고 GROQ_API_KEY 환경 변수에서 읽음) ---
+api_key = os.environ.get("GROQ_API_KEY")
+if not api_key:
+    sys.exit("[오류] GROQ_API_KEY 환경 변수가 설정되지 않았습니다. 예: export GROQ_API_KEY=<Groq API 키>")
+api_base = "https://api.groq.com/openai/v1"
+
+# --- API 속도 제한 (Groq 무료 등급 기준, 계정 한도에 맞게 조정) ---
+rpm_limit = 30      # 분당 요청 수
+tpm_limit = 6000    # 분당 토큰 수
+concurrency = 8     # 동시에 진행할 최대 요청 수
+batch_size = None   # 요청당 자막 줄 수 (None이면 컨텍스트/TPM 한도에서 자동 계산, 1이면 한 줄씩)
+
+# --- 라벨 캐시: 중단 후 재실행 시 이미 태깅한 줄은 건너뜀 (프롬프트를 바꾸면 label_cache.py invalidate --stale) ---
+label_cache_path = "data/cache/subtitle_labels.sqlite"
 
 # --- 감정 점수 (Azure 기준) ---
 emotion_valence = {
@@ -22,68 +36,17 @@ emotion_valence = {
     "fear": 0.10
 }
 
-# --- 자막 파싱 함수 ---
-def parse_srt_file(filepath):
-    with open(filepath, 'r', encoding='utf-8') as f:
-        srt_text = f.read()
-    subtitles = list(srt.parse(srt_text))
-    return [
-        {
-            "id": i + 1,
-            "start": sub.start.total_seconds(),
-            "end": sub.end.total_seconds(),
-            "text": sub.content.strip()
-        }
-        for i, sub in enumerate(subtitles)
-    ]
-
 # --- LLM 분석 함수 ---
-def analyze_subtitle(text, emotion_valence, model="llama3-70b-8192"):
-    emotion_labels = list(emotion_valence.keys())
-    prompt = f"""You are a JSON-only tagging assistant for movie subtitle analysis.
-
-You will be given one subtitle line. Your task is to return exactly one JSON object with the following structure.
-
-**JSON Structure:**
-{{
-  "emotions": [list of up to 2 emotions, ordered by relevance],
-  "situation": "1–5 word phrase summarizing the scene",
-  "situation_type": "brief category of situation"
-}}
-
-**Rules:**
-1.  Choose up to two emotions from the allowed list below. The most relevant emotion comes first.
-2.  The output MUST be a single, valid JSON object. Do not add explanations or any text outside the JSON structure.
-3.  Ensure all keys and string values are in double quotes. Ensure commas are correctly placed.
-
-**Allowed Emotions:**
-{emotion_labels}
-
-**Example:**
-Subtitle: "Get away from me! It's going to explode!"
-{{
-  "emotions": ["fear", "surprise"],
-  "situation": "escaping an explosion",
-  "situation_type": "action"
-}}
-
----
-**Subtitle to Analyze:**
-"{text}"
-"""
-    response = openai.ChatCompletion.create(
+def make_tagger(emotion_valence, model="llama3-70b-8192"):
+    return AsyncSubtitleTagger(
+        make_client(api_key, api_base),
+        list(emotion_valence.keys()),
         model=model,
-        messages=[{"role": "user", "content": prompt}],
-        temperature=0.7,
-        max_tokens=250,
+        rpm=rpm_limit,
+        tpm=tpm_limit,
+        concurrency=concurrency,
+        cache=LabelCache(label_cache_path),
     )
-    match = re.search(r"\{.*\}", response.choices[0].message.content, re.DOTALL)
-    if match:
-        try:
-            return json.loads(match.group())
-        except Exception as e:
-            print(f"[!] JSON 파싱 실패: {e} | 원본 응답: {response.choices[0].message.content}")
-    return {"emotions": [], "situation": "unknown", "situation_type": "unknown"}
 
 # --- 감정 점수 계산 ---
 def calc_valence(emotions):
@@ -94,15 +57,17 @@ def calc_valence(emotions):
 
 # --- 전체 파이프라인 실행 ---
 def run_pipeline(srt_path, start_sec, end_sec, out_json, out_csv):
-    subs = parse_srt_file(srt_path)
-    subs = [sub for sub in subs if start_sec <= sub["start"] <= end_sec]
-
-    labeled = []
-    for sub in subs:
-        res = analyze_subtitle(sub["text"], emotion_valence)
-        sub.update(res)
-        labeled.append(sub)
-        time.sleep(2.1)  # API rate 제한
+    # 파싱 결과는 .index.pkl 에 캐시되고, 구간 자막은 이분 탐색으로 찾는다
+    subs = load_srt(srt_path).window(start_sec, end_sec)
+
+    # 속도 제한 안에서 동시에 요청하고, 결과는 자막 순서대로 붙인다
+    tagger = make_tagger(emotion_valence)
+    size = batch_size or suggest_batch_size([sub["text"] for sub in subs], tagger.emotion_labels, tpm=tpm_limit)
+    labeled = tag_subtitles(subs, tagger, batch_size=size)
+    print(f"API 요청 {tagger.stats['requests']}회 (배치 {size}줄씩, 재전송 {tagger.stats['resent']}줄), "
+          f"429 응답 {tagger.stats['rate_limited']}회")
+    print(f"캐시 적중 {tagger.cache.stats['hits']}줄, 새로 태깅 {tagger.cache.stats['misses']}줄")
+    tagger.cache.close()
 
     df = pd.DataFrame(labeled)
     df["valence"] = df["emotions"].apply(calc_valence)
@@ -122,4 +87,5 @@ end_time = 349    # 5분 49초
 out_json_path = "data/processed/cure_llm_labeled_sample.json"
 out_csv_path = "data/processed/cure_llm_labeled_sample.csv"
 
+instrument.start_run("emotion_analysis_groq")  # CINEMA_PROFILE=1 이면 API 지연/대기/캐시 적중 리포트
 run_pipeline(srt_path, start_time, end_time, out_json_path, out_csv_path)
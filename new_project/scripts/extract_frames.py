@@ -4,30 +4,50 @@ from collections import defaultdict
 from ultralytics import YOLO
 from tqdm import tqdm
 import os
-import pandas as pd
+import sys
+import time
 
 # 설정값
 start_time = 109  # seconds
 end_time = 349    # seconds
+batch_size = 8    # 한 번에 추론할 프레임 수 (1이면 기존처럼 프레임 단위)
+render_annotations = False  # True면 results.plot() + 궤적 그리기 (imshow 디버깅용)
+decode_queue_size = 32      # 디코딩 스레드가 미리 읽어둘 최대 프레임 수
+writer_workers = 4          # JPEG 인코딩/저장 스레드 수
+writer_queue_size = 64      # 쓰기 단계에 쌓일 수 있는 최대 작업 수
+sample_policy = "spread"    # "spread": 처음 20개 중 첫/가운데/마지막 (기존), "quality": 크기×선명도 상위 3개
+evict_after_sec = 60        # 이 시간(초) 동안 안 보인 track 은 샘플을 확정해 바로 저장 (None이면 끝에서 한 번에)
+sampling = "uniform"        # "uniform": 1초 단위 (기존), "shots": 샷 단위 적응형 (sampling_plan.py)
+frame_budget = None         # sampling="shots" 일 때 전체 프레임 수 (None이면 구간 길이(초)와 같은 비용)
 
 # 경로 설정
 script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(script_dir, "..", "..", "main_project", "src"))
+import instrument
+from frame_source import iter_frames, video_info
+from pipeline import CsvRowWriter, WriterPool, background_iter, encode_jpg, write_bytes
+from sampling_plan import build_plan
+from tracking import result_boxes, track_batches
+from track_samples import TrackSampleSelector, sample_name
+
 output_candidates_dir = os.path.join(script_dir, "..", "data", "results", "candidates")
 os.makedirs(output_candidates_dir, exist_ok=True)
-
-track_samples = defaultdict(list)
-results_data = []
+output_csv_path = os.path.join(script_dir, "..", "data", "results", "all_tracking_results_1.csv")
 
 weights_path = os.path.join(script_dir, "yolo11_jde/weights/YOLO11s_JDE-CHMOT17-64b-100e_TBHS_m075_1280px.pt")
 video_path_relative = os.path.join("..", "data", "raw", "Cure_1997.mp4")
 video_path_absolute = os.path.join(script_dir, video_path_relative)
+azure_json_path = os.path.join(script_dir, "..", "data", "raw", "azure.json")  # 없으면 로컬 컷 검출
+
+# CINEMA_PROFILE=1 이면 종료 시 decode/infer/jpg/crop_write/csv 단계별 시간 리포트
+instrument.start_run("extract_frames")
 
 model = YOLO(weights_path, task="jde")
-cap = cv2.VideoCapture(video_path_absolute)
 
-fps = cap.get(cv2.CAP_PROP_FPS)
-total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-duration = total_frames / fps
+info = video_info(video_path_absolute)
+fps = info["fps"]
+total_frames = info["total_frames"]
+duration = info["duration"]
 track_history = defaultdict(lambda: [])
 
 print(f"영상 FPS: {fps}, 총 프레임: {total_frames}, 총 길이: {duration:.2f}초")
@@ -35,58 +55,79 @@ print(f"영상 FPS: {fps}, 총 프레임: {total_frames}, 총 길이: {duration:
 # 유효 시간 범위 내에서만 처리
 assert 0 <= start_time < end_time <= duration, "시간 범위가 잘못되었습니다."
 
-with tqdm(total=(end_time - start_time), desc="1초 단위 샘플링", unit="sec") as pbar:
-    sec = start_time
-    while sec < end_time:
-        cap.set(cv2.CAP_PROP_POS_MSEC, sec * 1000)
-        success, frame = cap.read()
-        if not success:
-            print(f"[경고] {sec}초에서 프레임을 읽을 수 없음")
-            break
-
-        try:
-            results = model.track(
-                frame,
-                tracker="smiletrack.yaml",
-                persist=True,
-                verbose=False
-            )
-        except Exception as e:
-            print(f"[에러] YOLO 추적 실패 @ {sec}s: {e}")
-            sec += 1
+if sampling == "shots":
+    sample_times, _, shot_starts, _, shot_source = build_plan(
+        video_path_absolute, start_time, end_time, frame_budget, azure_json=azure_json_path)
+    sample_times = sample_times.tolist()
+    print(f"샷 {len(shot_starts)}개 ({shot_source}) → 샘플 {len(sample_times)}프레임")
+else:
+    sample_times = list(range(start_time, end_time))
+
+# 쓰기 단계: JPEG 인코딩은 스레드 풀, CSV 행은 순서 유지를 위해 단일 스레드
+csv_writer = CsvRowWriter(output_csv_path, ["sec", "time_sec", "track_id", "x", "y", "w", "h"])
+jpg_pool = WriterPool(max_workers=writer_workers, max_pending=writer_queue_size, name="jpg")
+csv_pool = WriterPool(max_workers=1, max_pending=writer_queue_size, name="csv")
+
+
+def save_track_samples(track_id, chosen):
+    # 선택이 확정된 track 의 샘플을 바로 저장 (중간에 멈춰도 이미 확정된 track 은 남는다)
+    for number, sec, encoded in chosen:
+        fname = os.path.join(output_candidates_dir, sample_name(track_id, number, sec))
+        jpg_pool.submit(write_bytes, fname, encoded.result())
+
+
+# track 마다 아직 고를 수 있는 후보 크롭(JPEG 바이트 Future)만 보관
+track_samples = TrackSampleSelector(save_track_samples, policy=sample_policy, evict_after=evict_after_sec)
+if sample_policy == "quality":
+    from track_faces import face_quality
+
+received = 0
+track_stats = {}
+loop_start = time.perf_counter()
+desc = "샷 단위 샘플링" if sampling == "shots" else "1초 단위 샘플링"
+with tqdm(total=len(sample_times), desc=desc, unit="frame") as pbar:
+    # 디코딩은 읽기 스레드에서 한 번의 순방향 패스로, 추론은 메인 루프에서 batch_size씩
+    frames = background_iter(iter_frames(video_path_absolute, sample_times), maxsize=decode_queue_size)
+    for sec, frame_index, frame, result in track_batches(
+            model, frames, batch_size=batch_size, tracker="smiletrack.yaml", stats=track_stats):
+        received += 1
+        if result is None:
             pbar.update(1)
             continue
 
-        boxes = results[0].boxes.xywh.cpu()
-        track_ids_raw = results[0].boxes.id
-        track_ids = track_ids_raw.int().cpu().tolist() if track_ids_raw is not None else []
+        boxes, track_ids = result_boxes(result)
 
-        annotated_frame = results[0].plot()
+        annotated_frame = result.plot() if render_annotations else None
 
+        rows = []
         for box, track_id in zip(boxes, track_ids):
             x, y, w, h = box
-            track = track_history[track_id]
-            track.append((float(x), float(y)))
-            if len(track) > 30:
-                track.pop(0)
 
             # 트랙 궤적 시각화 (선택)
-            try:
-                points = np.hstack(track).astype(np.int32).reshape((-1, 1, 2))
-                cv2.polylines(annotated_frame, [points], isClosed=False, color=(230, 230, 230), thickness=10)
-            except Exception:
-                pass  # 잘못된 좌표가 있을 경우 무시
+            if render_annotations:
+                track = track_history[track_id]
+                track.append((float(x), float(y)))
+                if len(track) > 30:
+                    track.pop(0)
+                try:
+                    points = np.hstack(track).astype(np.int32).reshape((-1, 1, 2))
+                    cv2.polylines(annotated_frame, [points], isClosed=False, color=(230, 230, 230), thickness=10)
+                except Exception:
+                    pass  # 잘못된 좌표가 있을 경우 무시
 
             # 크롭 영역
             l, t = int(x - w / 2), int(y - h / 2)
             r, b = int(x + w / 2), int(y + h / 2)
             crop = frame[t:b, l:r] if l >= 0 and t >= 0 and r > l and b > t else None
 
-            if crop is not None and crop.size > 0 and len(track_samples[track_id]) < 20:
-                track_samples[track_id].append((sec, crop))
+            if crop is not None and crop.size > 0 and track_samples.wants(track_id):
+                # 원본 픽셀 대신 JPEG 바이트만 보관 (인코딩은 쓰기 스레드에서)
+                score = face_quality(crop) if sample_policy == "quality" else 0.0
+                track_samples.add(track_id, sec, jpg_pool.submit(encode_jpg, crop), score=score)
 
-            results_data.append({
+            rows.append({
                 "sec": int(sec),
+                "time_sec": round(float(sec), 3),
                 "track_id": int(track_id),
                 "x": float(x),
                 "y": float(y),
@@ -94,30 +135,35 @@ with tqdm(total=(end_time - start_time), desc="1초 단위 샘플링", unit="sec
                 "h": float(h)
             })
 
-        # 실시간 디버깅용 화면 표시 (GUI 없는 서버에서는 주석)
+        if rows:
+            csv_pool.submit(csv_writer.write_rows, rows)
+        track_samples.evict(sec)
+
+        # 실시간 디버깅용 화면 표시 (GUI 없는 서버에서는 주석, render_annotations=True 필요)
         # cv2.imshow("YOLO11 Tracking", annotated_frame)
         # if cv2.waitKey(1) & 0xFF == ord("q"):
         #     break
 
-        sec += 1
         pbar.update(1)
 
-cap.release()
+if received < len(sample_times):
+    print(f"[경고] {sample_times[received]:.2f}초부터 프레임을 읽을 수 없음")
+
+loop_sec = time.perf_counter() - loop_start
+if track_stats.get("frames"):
+    print(f"처리 속도: {track_stats['frames'] / loop_sec:.2f} frames/sec "
+          f"(추론만: {track_stats['frames'] / track_stats['infer_sec']:.2f} frames/sec, batch_size={batch_size})")
+
 cv2.destroyAllWindows()
 
-# 샘플 이미지 저장
-for track_id, samples in track_samples.items():
-    n = len(samples)
-    if n == 0:
-        continue
-    indices = [0, n // 2, n - 1] if n >= 3 else list(range(n))
-    for i, idx in enumerate(indices):
-        sec, crop = samples[idx]
-        fname = os.path.join(output_candidates_dir, f"track_{track_id}_sample_{i+1}_sec_{int(sec)}.jpg")
-        cv2.imwrite(fname, crop)
-
-# 결과 CSV 저장
-df = pd.DataFrame(results_data)
-output_csv_path = os.path.join(script_dir, "..", "data", "results", "all_tracking_results_1.csv")
-df.to_csv(output_csv_path, index=False)
-print(f"전체 추적 결과 csv 저장 완료: {output_csv_path}")
+# 아직 활성인 track 의 샘플 저장
+track_samples.close()
+print(f"샘플 track {track_samples.stats['finalized']}개 (중간 확정 {track_samples.stats['evicted']}개), "
+      f"동시 보관 크롭 최대 {track_samples.stats['kept_peak']}개")
+
+jpg_pool.close()
+
+# 결과 CSV 저장 (행은 추적 중에 이미 기록됨)
+csv_pool.close()
+csv_writer.close()
+print(f"전체 추적 결과 csv 저장 완료: {output_csv_path} ({csv_writer.rows_written}행)")
@@ -0,0 +1,56 @@
+import os
+import sys
+
+import pandas as pd
+
+# 설정값
+start_time = 109  # seconds
+end_time = 349    # seconds
+num_workers = os.cpu_count() or 1  # 청크(=프로세스) 수
+overlap_sec = 10  # 청크 경계에서 ID를 이어 붙이기 위해 겹쳐 추적할 초
+batch_size = 8
+
+# 경로 설정
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(script_dir, "..", "..", "main_project", "src"))
+import instrument
+from chunked_tracking import ROW_FIELDS, run_chunked
+from frame_source import video_info
+from pipeline import write_bytes
+from track_samples import sample_name, spread_indices
+
+output_candidates_dir = os.path.join(script_dir, "..", "data", "results", "candidates")
+output_csv_path = os.path.join(script_dir, "..", "data", "results", "all_tracking_results_1.csv")
+weights_path = os.path.join(script_dir, "yolo11_jde/weights/YOLO11s_JDE-CHMOT17-64b-100e_TBHS_m075_1280px.pt")
+video_path_absolute = os.path.join(script_dir, "..", "data", "raw", "Cure_1997.mp4")
+
+
+def save_samples(track_samples, out_dir):
+    """Write first/middle/last crop of each track, same naming as extract_frames.py."""
+    os.makedirs(out_dir, exist_ok=True)
+    for track_id, samples in track_samples.items():
+        for i, idx in enumerate(spread_indices(len(samples))):
+            sec, encoded = samples[idx]
+            write_bytes(os.path.join(out_dir, sample_name(track_id, i + 1, sec)), encoded)
+
+
+def main():
+    instrument.start_run("extract_frames_parallel")
+    info = video_info(video_path_absolute)
+    print(f"영상 FPS: {info['fps']}, 총 프레임: {info['total_frames']}, 총 길이: {info['duration']:.2f}초")
+    assert 0 <= start_time < end_time <= info["duration"], "시간 범위가 잘못되었습니다."
+
+    print(f"{num_workers}개 프로세스로 청크 추적 (겹침 {overlap_sec}초)")
+    rows, track_samples, _, _ = run_chunked(
+        video_path_absolute, weights_path, start_time, end_time,
+        workers=num_workers, overlap=overlap_sec, batch_size=batch_size
+    )
+
+    with instrument.timer("sample_write_ms"):
+        save_samples(track_samples, output_candidates_dir)
+    pd.DataFrame(rows, columns=ROW_FIELDS).to_csv(output_csv_path, index=False)
+    print(f"전체 추적 결과 csv 저장 완료: {output_csv_path} ({len(rows)}행, 트랙 {len(track_samples)}개)")
+
+
+if __name__ == "__main__":
+    main()
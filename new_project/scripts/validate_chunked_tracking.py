@@ -0,0 +1,55 @@
+"""청크 병렬 추적 결과를 순차 추적 결과와 비교하는 검증 리포트
+
+샘플 구간을 한 번은 단일 청크(순차)로, 한 번은 여러 청크(병렬 + ID 이어붙이기)로
+추적해 박스 일치율과 track ID 일관성(purity/completeness)을 JSON으로 저장한다.
+"""
+import json
+import os
+import sys
+
+# 설정값
+sample_start = 109  # seconds
+sample_end = 229    # seconds
+num_workers = 4
+overlap_sec = 10
+batch_size = 8
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(script_dir, "..", "..", "main_project", "src"))
+import instrument
+from chunked_tracking import compare_tracking, run_chunked, split_chunks, stitch_chunks, track_chunk
+
+weights_path = os.path.join(script_dir, "yolo11_jde/weights/YOLO11s_JDE-CHMOT17-64b-100e_TBHS_m075_1280px.pt")
+video_path_absolute = os.path.join(script_dir, "..", "data", "raw", "Cure_1997.mp4")
+report_path = os.path.join(script_dir, "..", "data", "results", "chunked_tracking_validation.json")
+
+
+def main():
+    instrument.start_run("validate_chunked_tracking")
+    print(f"순차 추적: {sample_start}~{sample_end}s")
+    sequential = track_chunk(split_chunks(sample_start, sample_end, 1)[0],
+                             video_path_absolute, weights_path, batch_size=batch_size)
+    seq_rows, _, _, _ = stitch_chunks([sequential])
+
+    print(f"청크 추적: {num_workers}개 프로세스")
+    par_rows, _, _, stitch_mode = run_chunked(video_path_absolute, weights_path, sample_start, sample_end,
+                                 workers=num_workers, overlap=overlap_sec, batch_size=batch_size)
+
+    report = compare_tracking(seq_rows, par_rows)
+    report.update({
+        "sample_range": [sample_start, sample_end],
+        "workers": num_workers,
+        "overlap_sec": overlap_sec,
+        "stitch_mode": stitch_mode,  # iou+embedding / mixed / iou (임베딩 없이 IoU만)
+    })
+    os.makedirs(os.path.dirname(report_path), exist_ok=True)
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+    for key, value in report.items():
+        print(f"  {key}: {value}")
+    print(f"검증 리포트 저장 완료: {report_path}")
+
+
+if __name__ == "__main__":
+    main()
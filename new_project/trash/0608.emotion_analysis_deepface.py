@@ -2,10 +2,17 @@ import cv2
 import numpy as np
 import os
 import json
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+import sys
 import warnings
 warnings.filterwarnings('ignore')
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "main_project", "src"))
+import instrument
+from face_roi import person_rois
+
 class EmotionAnalyzerWithMemory:
     def __init__(self):
         self.setup_models()
@@ -16,8 +23,10 @@ class EmotionAnalyzerWithMemory:
     def setup_models(self):
         try:
             from deepface import DeepFace
+            self.DeepFace = DeepFace
             self.deepface_available = True
         except ImportError:
+            self.DeepFace = None
             self.deepface_available = False
 
         try:
@@ -30,12 +39,22 @@ class EmotionAnalyzerWithMemory:
         except Exception:
             pass
 
-    def detect_faces(self, img):
+    @instrument.timed("face_detect_ms")
+    def detect_faces(self, img, roi=True):
         gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        x0 = y0 = 0
+        if roi:
+            # 후보 이미지는 인물 박스 크롭이므로 머리가 있을 윗부분만 훑는다
+            h, w = gray.shape
+            rois, keep = person_rois([(w / 2, h / 2, w, h)], gray.shape, side_pad=0, top_pad=0, min_side=30)
+            if keep[0]:
+                x0, y0, x1, y1 = rois[0]
+                gray = gray[y0:y1, x0:x1]
         faces = self.face_cascade.detectMultiScale(
             gray, scaleFactor=1.1, minNeighbors=5, minSize=(30, 30))
-        return faces
+        return [(x + x0, y + y0, w, h) for x, y, w, h in faces]
 
+    @instrument.timed("features_ms")
     def extract_features(self, img, faces):
         gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
         features = {}
@@ -52,10 +71,11 @@ class EmotionAnalyzerWithMemory:
             features[f'face_{i}_smiles_detected'] = len(smiles)
         return features
 
+    @instrument.timed("deepface_ms")
     def analyze_deepface(self, image_path, fallback_img=None):
         if not self.deepface_available:
             return None
-        from deepface import DeepFace
+        DeepFace = self.DeepFace
         try:
             result = DeepFace.analyze(
                 img_path=image_path,
@@ -70,12 +90,11 @@ class EmotionAnalyzerWithMemory:
         except:
             if fallback_img is not None:
                 try:
-                    temp_path = "/tmp/cropped_face.jpg"
-                    cv2.imwrite(temp_path, fallback_img)
+                    # 이미 잘라낸 얼굴이므로 파일로 저장해 다시 검출하지 않고 배열을 그대로 넘긴다
                     result = DeepFace.analyze(
-                        img_path=temp_path,
+                        img_path=fallback_img,
                         actions=['emotion'],
-                        detector_backend='retinaface',
+                        detector_backend='skip',
                         enforce_detection=False,
                         silent=True
                     )
@@ -117,30 +136,56 @@ class EmotionAnalyzerWithMemory:
             'note': reason
         }
 
-    def analyze_image(self, image_path, image_name):
-        img = cv2.imread(image_path)
+    def load_and_detect(self, image_path):
+        with instrument.timer("image_load_ms"):
+            img = cv2.imread(image_path)
         if img is None:
-            result = self.default_result(image_name, "Image load failed")
-            self.results.append(result)
-            return result
-
+            return None, []
         faces = self.detect_faces(img)
-
         if len(faces) > 1:
             faces = sorted(faces, key=lambda b: b[2] * b[3], reverse=True)
             faces = [faces[0]]
+        return img, faces
+
+    def carry_over(self, image_name):
+        instrument.count("carried_over")
+        copied = self.last_valid_result.copy()
+        copied.update({
+            'image_name': image_name,
+            'timestamp': datetime.now().isoformat(),
+            'faces_detected': 0,
+            'note': 'Face not detected, previous emotion carried over'
+        })
+        return copied
+
+    def analyze_image(self, image_path, image_name):
+        img, faces = self.load_and_detect(image_path)
+        if img is None:
+            result = self.default_result(image_name, "Image load failed")
+            self.results.append(result)
+            return result
 
         if len(faces) == 0 and self.last_valid_result:
-            copied = self.last_valid_result.copy()
-            copied.update({
-                'image_name': image_name,
-                'timestamp': datetime.now().isoformat(),
-                'faces_detected': 0,
-                'note': 'Face not detected, previous emotion carried over'
-            })
+            copied = self.carry_over(image_name)
             self.results.append(copied)
             return copied
 
+        result = self.full_result(img, faces, image_path, image_name)
+        self.last_valid_result = result
+        self.results.append(result)
+        return result
+
+    def analyze_image_detached(self, image_path, image_name):
+        # 워커용: carry-over 상태 없이 분석. 얼굴이 없으면 ("no_face", None) 을 돌려주고
+        # 순서대로 훑는 resolve_in_order 에서 처리한다
+        img, faces = self.load_and_detect(image_path)
+        if img is None:
+            return "load_failed", self.default_result(image_name, "Image load failed")
+        if len(faces) == 0:
+            return "no_face", None
+        return "ok", self.full_result(img, faces, image_path, image_name)
+
+    def full_result(self, img, faces, image_path, image_name):
         features = self.extract_features(img, faces)
 
         fallback_crop = None
@@ -152,7 +197,7 @@ class EmotionAnalyzerWithMemory:
         scores = self.infer_emotion(features, deepface_result)
         predicted = max(scores.items(), key=lambda x: x[1])
 
-        result = {
+        return {
             'image_name': image_name,
             'predicted_emotion': predicted[0],
             'confidence': predicted[1],
@@ -161,11 +206,22 @@ class EmotionAnalyzerWithMemory:
             'timestamp': datetime.now().isoformat()
         }
 
-        self.last_valid_result = result
-        self.results.append(result)
-        return result
+    def resolve_in_order(self, folder_path, files, outcomes):
+        # 병렬 결과를 정렬 순서대로 훑으며 순차 버전과 같은 carry-over 를 적용
+        for f, (status, result) in zip(files, outcomes):
+            if status == "no_face":
+                if self.last_valid_result:
+                    result = self.carry_over(f)
+                else:
+                    # 첫 유효 결과 이전의 얼굴 없는 이미지는 순차 버전처럼 전체 분석
+                    self.analyze_image(os.path.join(folder_path, f), f)
+                    continue
+            elif status == "ok":
+                self.last_valid_result = result
+            self.results.append(result)
+        return self.results
 
-    def analyze_folder(self, folder):
+    def analyze_folder(self, folder, workers=1):
         try:
             current_script_path = os.path.abspath(__file__)
         except NameError:
@@ -183,7 +239,17 @@ class EmotionAnalyzerWithMemory:
                 self.results = []
                 return self.results
 
-            for f in sorted(files):
+            files = sorted(files)
+            if workers > 1:
+                paths = [os.path.join(folder_path, f) for f in files]
+                # 워커마다 initializer 에서 모델을 한 번만 로드 (TensorFlow 때문에 spawn)
+                with ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn"),
+                                         initializer=_init_worker) as pool:
+                    outcomes = list(pool.map(_analyze_in_worker, paths, files,
+                                             chunksize=max(1, len(files) // (workers * 8))))
+                return self.resolve_in_order(folder_path, files, outcomes)
+
+            for f in files:
                 path = os.path.join(folder_path, f)
                 self.analyze_image(path, f)
             return self.results
@@ -195,9 +261,24 @@ class EmotionAnalyzerWithMemory:
         with open(os.path.join(out_path, 'emotion_results.json'), 'w') as f:
             json.dump(self.results, f, indent=2)
 
+_worker_analyzer = None
+
+
+def _init_worker():
+    global _worker_analyzer
+    instrument.start_run("emotion_analysis_deepface_worker")  # 워커마다 자기 pid 로 리포트
+    _worker_analyzer = EmotionAnalyzerWithMemory()
+
+
+def _analyze_in_worker(image_path, image_name):
+    return _worker_analyzer.analyze_image_detached(image_path, image_name)
+
+
 def main():
     input_folder_name = "../data/results/candidates_1"
     relative_output_folder = "../data/results/emotion_with_memory_candidates_1"
+    workers = os.cpu_count() or 1  # 1이면 기존 순차 실행
+    instrument.start_run("emotion_analysis_deepface")
 
     try:
         current_script_path = os.path.abspath(__file__)
@@ -210,7 +291,7 @@ def main():
     output_file_path = os.path.join(absolute_output_folder, 'emotion_results.json')
 
     analyzer = EmotionAnalyzerWithMemory()
-    analyzer.analyze_folder(input_folder_name)
+    analyzer.analyze_folder(input_folder_name, workers=workers)
     print(f"Attempting to save results to: {output_file_path}")
     analyzer.save_results(absolute_output_folder)
     print(f"Results should be saved in: {output_file_path}")